@@ -5,7 +5,6 @@ r"""
   python examples/example_with_formatter.py "data/AWS  P1-P3.pdf"
 """
 import sys
-import io
 import os
 
 # 將 pdf-cleaning 加入路徑
@@ -22,12 +21,9 @@ def main():
 
     pdf_path = sys.argv[1]
 
-    # 讀取 PDF
-    with open(pdf_path, "rb") as f:
-        pdf_bytes = io.BytesIO(f.read())
-
     # 執行完整流程：讀取 → 清洗 → 解析（使用原始格式）
-    questions = run_pipeline(pdf_bytes, verbose=False, format_output=False)
+    # 直接傳入檔案路徑，由 PyMuPDF 開啟，不需先讀成 BytesIO
+    questions = run_pipeline(pdf_path, verbose=False, format_output=False)
 
     # 轉換為扁平化格式
     rows = format_questions_to_rows(questions)
@@ -46,13 +42,12 @@ def main():
         print(f"答案: {row['answer']}")
         print("-" * 80)
 
-    # 若需要輸出為 CSV，可取消下面註解
-    # import csv
-    # with open("output.csv", "w", encoding="utf-8", newline="") as f:
-    #     writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-    #     writer.writeheader()
-    #     writer.writerows(rows)
+    # 若需要輸出為 CSV，可取消下面註解（亦可改用 "jsonl"、"parquet"）
+    # from src.sinks import open_sink
+    # with open_sink("csv", "output.csv") as sink:
+    #     sink.write_all(rows)
     # print("\n已輸出至 output.csv")
+    # 命令列等效用法：python pdf-cleaning/run.py <pdf_path> --output output.csv
 
 
 if __name__ == "__main__":
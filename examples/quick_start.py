@@ -4,14 +4,11 @@ Keep this minimal and portable (no Colab-specific code, no !pip lines).
 """
 import re
 import fitz
-import io
 
 
 def extract_text_from_file(path: str) -> str:
-    with open(path, "rb") as f:
-        pdf_bytes = io.BytesIO(f.read())
-
-    doc = fitz.open(stream=pdf_bytes.read(), filetype="pdf")
+    # Open by path so PyMuPDF reads the file itself (no extra in-memory copies).
+    doc = fitz.open(path)
     text = []
     for page in doc:
         t = page.get_text()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# bench_extraction.py - 提取設定基準測試：比較各 ExtractionProfile 與預設設定的提取速度與解析結果
+r"""
+使用範例：
+  python benchmarks/bench_extraction.py                  # 預設 3,000 題的合成 PDF
+  python benchmarks/bench_extraction.py --pdf exam.pdf   # 以既有 PDF 量測
+  python benchmarks/bench_extraction.py --questions 500 --repeat 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.cleaner import iter_clean_pages
+from src.formatter import format_questions_to_rows
+from src.parser import parse_questions
+from src.pdf_reader import EXTRACTION_PROFILES, iter_pages
+from src.textbuffer import PageBuffer
+from synth import write_exam_pdf
+
+
+def best_time(path: str, extraction, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    pages = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = list(iter_pages(path, extraction=extraction))
+        best = min(best, time.perf_counter() - start)
+    return best, pages
+
+
+def parse_rows(pages: list) -> list:
+    return format_questions_to_rows(parse_questions(PageBuffer.from_pages(iter_clean_pages(pages))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較各提取設定的速度與解析結果")
+    parser.add_argument("--pdf", default=None, help="量測的 PDF（預設產生合成 PDF）")
+    parser.add_argument("--questions", type=int, default=3000, help="合成 PDF 的題目數量（預設 3,000）")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數，取最佳值（預設 3）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.pdf
+        if path is None:
+            path = os.path.join(tmp_dir, "exam.pdf")
+            write_exam_pdf(path, args.questions)
+
+        # 先全部提取一輪讓檔案進入 OS 快取，避免第一個設定吃虧
+        list(iter_pages(path))
+        results = {name: best_time(path, name, args.repeat) for name in EXTRACTION_PROFILES}
+
+    base_seconds, base_pages = results["default"]
+    base_rows = parse_rows(base_pages)
+    print(f"輸入: {len(base_pages):,} 頁，{len(base_rows):,} 題")
+    for name, (seconds, pages) in results.items():
+        rows = parse_rows(pages)
+        same_text = "相同" if pages == base_pages else "不同"
+        same_rows = "相同" if rows == base_rows else f"不同（{len(rows):,} 題）"
+        print(f"{name:<8} {len(pages) / seconds:>8,.0f} pages/s  ({seconds:.3f} s, "
+              f"{base_seconds / seconds:.2f}x)  文字: {same_text}  題目: {same_rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# bench_parser.py - 解析器微基準測試：比較逐條 re.match 與單次分類器的每秒行數
+r"""
+使用範例：
+  python benchmarks/bench_parser.py               # 預設 1,000,000 行
+  python benchmarks/bench_parser.py --lines 200000 --repeat 5
+  python benchmarks/bench_parser.py --workers 4   # 另外量測 4 個行程的平行解析
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.parser import parse_questions
+from synth import make_exam_text_lines
+
+
+def legacy_parse_questions(cleaned_text: str) -> list:
+    """改版前的解析迴圈（每行最多五次 re.match，外加 re.sub），作為比較基準"""
+    lines = cleaned_text.splitlines()
+    questions = []
+    current = None
+    collecting_question = False
+    collecting_choices = False
+    pending_topic = None
+    last_key = None
+    ignore_until_next_question = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        t = re.match(r"^Topic\s*(\d+)", line)
+        if t:
+            pending_topic = f"Topic {t.group(1)}"
+            continue
+        q = re.match(r"^Question\s*#\s*(\d+)", line)
+        if q:
+            if current:
+                questions.append(current)
+            if pending_topic is None:
+                pending_topic = "Topic NaN"
+            current = {"id": f"{pending_topic} Question #{q.group(1)}",
+                       "question": "", "choices": {}, "answer": ""}
+            pending_topic = None
+            collecting_question = True
+            collecting_choices = False
+            ignore_until_next_question = False
+            last_key = None
+            continue
+        if not current:
+            continue
+        ans = re.match(r"^Correct Answer\s*:?\s*([A-F]+)", line)
+        if ans:
+            current["answer"] = ans.group(1)
+            collecting_question = False
+            collecting_choices = False
+            ignore_until_next_question = True
+            last_key = None
+            continue
+        if ignore_until_next_question:
+            continue
+        opt = re.match(r"^([A-F])\.\s+(.*)", line)
+        if opt and collecting_question:
+            clean_choice = re.sub(r"\s*Most Voted.*$", "", opt.group(2)).strip()
+            last_key = opt.group(1)
+            current["choices"][last_key] = clean_choice
+            collecting_choices = True
+            continue
+        if collecting_choices and last_key and not re.match(r"^[A-F]\.\s+", line):
+            current["choices"][last_key] += " " + line
+            continue
+        if collecting_question and not collecting_choices:
+            current["question"] += line + " "
+            continue
+
+    if current:
+        questions.append(current)
+    return questions
+
+
+def best_time(func, text: str, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析器每秒行數微基準測試")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="合成輸入的行數（預設 1,000,000）")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數，取最佳值（預設 3）")
+    parser.add_argument("--workers", type=int, default=1, help="平行解析的行程數（預設 1，不量測平行解析）")
+    args = parser.parse_args()
+
+    text = make_exam_text_lines(args.lines)
+    n_lines = text.count("\n")
+
+    before, expected = best_time(legacy_parse_questions, text, args.repeat)
+    after, got = best_time(parse_questions, text, args.repeat)
+    assert got == expected, "新版解析結果與舊版不一致"
+
+    print(f"輸入: {n_lines:,} 行，{len(got):,} 題")
+    print(f"before (re.match x5): {n_lines / before:>12,.0f} lines/s  ({before:.3f} s)")
+    print(f"after  (classifier):  {n_lines / after:>12,.0f} lines/s  ({after:.3f} s)")
+    print(f"speedup: {before / after:.2f}x")
+
+    if args.workers > 1:
+        parallel, got = best_time(lambda t: parse_questions(t, workers=args.workers), text, args.repeat)
+        assert got == expected, "平行解析結果與單行程不一致"
+        print(f"parallel ({args.workers} workers): {n_lines / parallel:>8,.0f} lines/s  ({parallel:.3f} s)")
+        print(f"speedup vs serial: {after / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
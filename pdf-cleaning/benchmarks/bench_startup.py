@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# bench_startup.py - 啟動時間量測：以 -X importtime 量測匯入成本，並檢查文字輸入不會載入 PyMuPDF
+r"""
+使用範例：
+  python benchmarks/bench_startup.py                    # 預設預算 src.pipeline 匯入 50 ms
+  python benchmarks/bench_startup.py --budget-ms 30 --repeat 10
+
+每次量測都在新的直譯器中進行；結果取最佳值以排除磁碟快取與排程的雜訊。
+超過預算或文字輸入載入了 PyMuPDF 時以結束碼 1 結束，可直接放進 CI。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from synth import make_exam_text
+
+# 檢查文字輸入流程載入了哪些重量級模組
+_HEAVY_MODULES = ("fitz", "pymupdf", "numpy", "pandas", "pyarrow", "multiprocessing")
+
+
+def import_time(module: str, repeat: int) -> tuple[float, list]:
+    """以 -X importtime 量測匯入 module 的累計時間
+
+    Returns:
+        tuple[float, list]: (最佳毫秒數, 最後一次量測中自身耗時最多的前 10 個模組 (ms, 名稱))
+    """
+    best = float("inf")
+    top = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=ROOT, capture_output=True, text=True, check=True)
+        entries = []
+        for line in proc.stderr.splitlines():
+            # 格式：import time: self [us] | cumulative | imported package
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative, name = line[len("import time:"):].split("|")
+            entries.append((int(self_us) / 1000, int(cumulative) / 1000, name.strip()))
+        total = next(cum for _, cum, name in entries if name == module)
+        best = min(best, total)
+        top = sorted(((ms, name) for ms, _, name in entries), reverse=True)[:10]
+    return best, top
+
+
+def wall_time(args: list, repeat: int) -> float:
+    """在新的直譯器中執行 args，回傳最佳秒數"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def loaded_modules(txt_path: str) -> list:
+    """處理文字輸入後已載入的重量級模組"""
+    script = (
+        "import sys\n"
+        "from src.pipeline import run_pipeline\n"
+        f"run_pipeline({txt_path!r})\n"
+        f"print(','.join(m for m in {_HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return [m for m in proc.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測 CLI 啟動與匯入時間")
+    parser.add_argument("--repeat", type=int, default=5, help="每項量測的重複次數，取最佳值")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="匯入 src.pipeline 的時間預算（毫秒，預設 50）")
+    args = parser.parse_args()
+
+    failures = []
+
+    pipeline_ms, top = import_time("src.pipeline", args.repeat)
+    print(f"import src.pipeline        {pipeline_ms:8.1f} ms（預算 {args.budget_ms:.0f} ms）")
+    for ms, name in top:
+        print(f"    {ms:8.2f} ms  {name}")
+    if pipeline_ms > args.budget_ms:
+        failures.append(f"匯入 src.pipeline 需要 {pipeline_ms:.1f} ms，超過預算 {args.budget_ms:.0f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        txt_path = os.path.join(tmp, "exam.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(make_exam_text(20))
+
+        bare = wall_time(["-c", "pass"], args.repeat)
+        cli = wall_time(["run.py", txt_path, "--format", "jsonl", "--output", os.path.join(tmp, "out.jsonl")],
+                        args.repeat)
+        print(f"python -c pass             {bare * 1000:8.1f} ms")
+        print(f"run.py exam.txt（20 題）   {cli * 1000:8.1f} ms（扣除直譯器啟動 {(cli - bare) * 1000:.1f} ms）")
+
+        heavy = loaded_modules(txt_path)
+        print(f"文字輸入載入的重量級模組：{', '.join(heavy) or '無'}")
+        if heavy:
+            failures.append(f"文字輸入不應載入：{', '.join(heavy)}")
+
+    if failures:
+        for item in failures:
+            print("  -", item)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# run_benchmarks.py - 端對端基準測試：量測各階段吞吐量與記憶體峰值，並與基準線比較
+r"""
+使用範例：
+  python benchmarks/run_benchmarks.py                                  # 預設 10,100,1000 題
+  python benchmarks/run_benchmarks.py --sizes 10,1000,50000 --save benchmarks/baseline.json
+  python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.25
+
+合成 PDF 會存放在 --workdir（預設 benchmarks/.data），相同題數與種子只產生一次。
+記憶體峰值以 tracemalloc 量測，只包含 Python 物件配置（不含 PyMuPDF 的 C 層配置）。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, "..")))
+sys.path.insert(0, BENCH_DIR)
+
+from src.cleaner import clean_text
+from src.formatter import format_questions_to_rows
+from src.parser import parse_questions
+from src.pdf_reader import read_pdf
+from src.pipeline import run_pipeline
+from synth import write_exam_pdf
+
+
+def measure(func, repeat: int) -> tuple[float, int, object]:
+    """執行 func，回傳 (最佳秒數, tracemalloc 記憶體峰值, 最後一次結果)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    # 計時與記憶體量測分開進行，避免 tracemalloc 的額外成本影響計時
+    del result
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def bench_size(pdf_path: str, repeat: int) -> dict:
+    """量測單一合成 PDF 的各階段表現"""
+    stages = {}
+
+    def record(name, seconds, peak, items, unit, **extra):
+        stages[name] = {
+            "seconds": seconds,
+            "peak_bytes": peak,
+            "unit": unit,
+            "items": items,
+            "items_per_sec": items / seconds if seconds > 0 else 0.0,
+            **extra,
+        }
+
+    seconds, peak, raw_text = measure(lambda: read_pdf(pdf_path), repeat)
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        pages = doc.page_count
+    record("read_pdf", seconds, peak, pages, "pages", chars=len(raw_text))
+
+    seconds, peak, cleaned = measure(lambda: clean_text(raw_text), repeat)
+    record("clean_text", seconds, peak, len(raw_text), "chars")
+
+    n_lines = cleaned.count("\n")
+    seconds, peak, questions = measure(lambda: parse_questions(cleaned), repeat)
+    record("parse_questions", seconds, peak, n_lines, "lines", questions=len(questions))
+
+    seconds, peak, rows = measure(lambda: format_questions_to_rows(questions), repeat)
+    record("format_questions_to_rows", seconds, peak, len(rows), "questions")
+
+    seconds, peak, rows = measure(lambda: run_pipeline(pdf_path), repeat)
+    record("run_pipeline", seconds, peak, pages, "pages")
+
+    seconds, peak, _ = measure(lambda: sum(1 for _ in run_pipeline(pdf_path, stream=True)), repeat)
+    record("run_pipeline_stream", seconds, peak, pages, "pages")
+
+    return stages
+
+
+# 低於此絕對差距的變化視為量測雜訊（秒數、位元組）
+_MIN_DELTA = {"seconds": 0.01, "peak_bytes": 1024 * 1024}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """比較目前結果與基準線，回傳退步項目的說明清單
+
+    秒數或記憶體峰值超過基準線 (1 + threshold) 倍，且絕對差距超過 _MIN_DELTA 時視為退步。
+    """
+    regressions = []
+    for size, stages in results["results"].items():
+        base_stages = baseline.get("results", {}).get(size)
+        if not base_stages:
+            continue
+        for stage, entry in stages.items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                old, new = base[metric], entry[metric]
+                if old > 0 and new > old * (1 + threshold) and new - old > _MIN_DELTA[metric]:
+                    regressions.append(
+                        f"{size} 題 / {stage} / {metric}: {old:.4g} → {new:.4g} (+{(new / old - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 清洗流程端對端基準測試")
+    parser.add_argument("--sizes", default="10,100,1000", help="以逗號分隔的題數（10 ~ 50000）")
+    parser.add_argument("--seed", type=int, default=0, help="合成資料亂數種子")
+    parser.add_argument("--repeat", type=int, default=3, help="每階段重複次數，取最佳值")
+    parser.add_argument("--workdir", default=os.path.join(BENCH_DIR, ".data"), help="合成 PDF 存放目錄")
+    parser.add_argument("--save", default=None, help="將結果寫成 JSON 基準線")
+    parser.add_argument("--compare", default=None, help="與既有 JSON 基準線比較")
+    parser.add_argument("--threshold", type=float, default=0.2, help="視為退步的增幅比例（預設 0.2）")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": metadata.version("PyMuPDF"),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    for size in sizes:
+        pdf_path = os.path.join(args.workdir, f"exam-{size}-seed{args.seed}.pdf")
+        if not os.path.exists(pdf_path):
+            start = time.perf_counter()
+            pages = write_exam_pdf(pdf_path, size, seed=args.seed)
+            print(f"[產生] {pdf_path}（{pages} 頁，{time.perf_counter() - start:.1f} s）")
+
+        stages = bench_size(pdf_path, args.repeat)
+        results["results"][str(size)] = stages
+
+        print(f"\n=== {size} 題 ===")
+        for stage, entry in stages.items():
+            print(f"{stage:<26} {entry['seconds']:>9.4f} s  {entry['items_per_sec']:>14,.0f} "
+                  f"{entry['unit'] + '/s':<10} peak {entry['peak_bytes'] / 1024 / 1024:>8.1f} MB")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n已寫入基準線：{args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n偵測到 {len(regressions)} 項退步（門檻 +{args.threshold * 100:.0f}%）：")
+            for item in regressions:
+                print("  -", item)
+            sys.exit(1)
+        print(f"\n與基準線相比沒有超過 +{args.threshold * 100:.0f}% 的退步")
+
+
+if __name__ == "__main__":
+    main()
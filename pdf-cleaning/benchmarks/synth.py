@@ -0,0 +1,135 @@
+# synth.py - 合成考題資料產生器：產生與真實題庫相同格式的測試文字與 PDF
+import random
+
+_WORDS = (
+    "data engineer AWS Glue job Amazon S3 bucket VPC gateway endpoint route table "
+    "security group IAM role policy Lambda function Kinesis stream Redshift cluster "
+    "Athena query partition schema crawler catalog solution requirement company "
+    "must configure which will meet these requirements with the LEAST operational overhead"
+).split()
+
+_COMMENTS = [
+    "Selected Answer: {answer}",
+    "I think {answer} is correct",
+    "upvoted {n} times",
+    "Community vote distribution",
+]
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def iter_exam_lines(n_questions: int, seed: int = 0):
+    """逐行產生合成考題文字
+
+    包含 Topic 標頭、Question #N、多行題目、A.–F. 選項（含跨行選項與 Most Voted 標記）、
+    Correct Answer、答案後的討論留言、店长微信廣告與不換行空白（\\xa0）。
+
+    Args:
+        n_questions: 題目數量
+        seed: 亂數種子（相同種子產生相同內容）
+
+    Yields:
+        str: 文字行（不含換行字元）
+    """
+    rng = random.Random(seed)
+    topic = 1
+
+    for number in range(1, n_questions + 1):
+        if number == 1 or rng.random() < 0.02:
+            if number > 1:
+                topic += 1
+            yield f"Topic {topic}"
+
+        yield f"Question #{number}"
+        for _ in range(rng.randint(1, 4)):
+            line = _sentence(rng, 8, 20)
+            if rng.random() < 0.1:
+                line = line.replace(" ", "\xa0", 1)
+            yield line
+
+        n_options = rng.choice((4, 4, 4, 5, 6))
+        keys = "ABCDEF"[:n_options]
+        answer = rng.choice(keys)
+        for key in keys:
+            text = _sentence(rng, 5, 15)
+            if key == answer and rng.random() < 0.5:
+                text += " Most Voted"
+            yield f"{key}. {text}"
+            if rng.random() < 0.15:
+                yield _sentence(rng, 3, 8)
+
+        yield f"Correct Answer: {answer}"
+        for _ in range(rng.randint(0, 4)):
+            yield rng.choice(_COMMENTS).format(answer=rng.choice(keys), n=rng.randint(1, 9))
+        if rng.random() < 0.1:
+            yield f"店长微信：wx{rng.randint(1000, 9999)}"
+
+
+def make_exam_text(n_questions: int, seed: int = 0) -> str:
+    """產生合成考題文字（見 iter_exam_lines()）"""
+    return "\n".join(iter_exam_lines(n_questions, seed)) + "\n"
+
+
+def make_exam_text_lines(n_lines: int, seed: int = 0) -> str:
+    """產生至少 n_lines 行的合成考題文字（以完整題目為單位）"""
+    lines = []
+    n_questions = max(1, n_lines // 12)
+    while len(lines) < n_lines:
+        lines = list(iter_exam_lines(n_questions, seed))
+        n_questions = int(n_questions * 1.2) + 1
+    return "\n".join(lines) + "\n"
+
+
+# 合成 PDF 的版面：A3 橫向、6pt 字，每行都能完整放進頁面寬度
+PAGE_WIDTH = 1190
+PAGE_HEIGHT = 842
+FONT_SIZE = 6
+LINE_HEIGHT = 7.5
+MARGIN = 20
+
+
+def write_exam_pdf(path: str, n_questions: int, seed: int = 0) -> int:
+    """以 PyMuPDF 將合成考題寫成 PDF（每行一個文字行，依序排入各頁）
+
+    使用 TextWriter 與內建 Helvetica 字型（中文字元自動以備援字型繪製），
+    提取時可還原 \xa0 與「店长微信」廣告，因此 PDF 內容與 make_exam_text() 的解析結果相同。
+
+    Args:
+        path: 輸出 PDF 路徑
+        n_questions: 題目數量
+        seed: 亂數種子
+
+    Returns:
+        int: PDF 頁數
+    """
+    import fitz
+
+    lines_per_page = int((PAGE_HEIGHT - 2 * MARGIN) / LINE_HEIGHT)
+    font = fitz.Font("helv")
+    doc = fitz.open()
+    page_lines = []
+
+    def flush():
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        writer = fitz.TextWriter(page.rect)
+        y = MARGIN + FONT_SIZE
+        for line in page_lines:
+            writer.append((MARGIN, y), line, font=font, fontsize=FONT_SIZE)
+            y += LINE_HEIGHT
+        writer.write_text(page)
+        page_lines.clear()
+
+    for line in iter_exam_lines(n_questions, seed):
+        page_lines.append(line)
+        if len(page_lines) >= lines_per_page:
+            flush()
+    if page_lines:
+        flush()
+
+    doc.save(path, garbage=3, deflate=True)
+    page_count = doc.page_count
+    doc.close()
+    return page_count
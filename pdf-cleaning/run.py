@@ -1,7 +1,8 @@
 # run.py - 命令列執行腳本：啟動 PDF 清洗流程的入口程式
+import os
 import sys
-import io
 import argparse
+from src.pdf_reader import EXTRACTION_PROFILES, with_margins
 from src.pipeline import run_pipeline
 
 
@@ -11,24 +12,434 @@ def main():
     使用方式：
         python run.py <pdf_path>              # 基本使用
         python run.py <pdf_path> --verbose    # 顯示清洗過程細節
+        python run.py pages.txt               # 已提取的文字（\f 分頁），不載入 PyMuPDF
+        pdftotext exam.pdf - | python run.py -   # 從標準輸入讀取文字
+        python run.py <pdf_path> --workers 8  # 以 8 個行程平行提取頁面文字
+        python run.py <pdf_path> --parse-workers 4   # 另以 4 個行程平行解析題目（文字很大時才划算）
+        python run.py data/ "dumps/**/*.pdf" --output-dir out/ --jobs 8
+                                              # 批次處理多個檔案、目錄與 glob
+        python run.py <pdf_path> --cache      # 使用頁面文字快取，重跑時略過 PDF 提取
+        python run.py <pdf_path> --rules rules.json   # 使用自訂清洗規則
+        python run.py <pdf_path> --extraction blocks  # 以文字區塊模式提取
+        python run.py <pdf_path> --clip-margins 0.05,0.05   # 提取時略過頁面上下各 5% 的頁首頁尾
+        python run.py <pdf_path> --format csv --output out.csv   # 串流寫出 CSV / JSONL / Parquet
+        python run.py <pdf_path> --output bank.sqlite            # 寫入 SQLite，重新載入改版 PDF 時就地更新
+        python run.py <pdf_path> --profile profile.json          # 記錄各階段時間與資料量
+        python run.py <pdf_path> --profile --profile-memory      # 另外記錄各階段記憶體峰值
+        python run.py --serve --port 8000 --jobs 4               # 以 HTTP 服務常駐執行
+        python run.py --watch inbox/ --output-dir out/ --jobs 4  # 監看投放目錄，自動處理新檔案
+        python run.py <pdf_path> --incremental state.json.gz --diff diff.json
+                                              # 增量處理改版 PDF，只重新處理變更的頁面
+        python run.py <pdf_path> --job ckpt/ --chunk-pages 200      # 分段處理並寫入檢查點，中斷後可續跑
+        python run.py <pdf_path> --dedup corpus.sqlite            # 略過與既有題庫重複的題目
+        python run.py <pdf_path> --index search.sqlite            # 將結果加入全文檢索索引
+        python run.py --index search.sqlite --search "glue crawler"   # 查詢全文檢索索引
     """
     # 設定命令列參數解析器
     parser = argparse.ArgumentParser(description="執行 PDF 資料清洗流程")
-    parser.add_argument("pdf_path", help="PDF 檔案路徑")
+    parser.add_argument("inputs", nargs="*", metavar="pdf_path",
+                        help="PDF 檔案路徑、目錄或 glob 樣式（可指定多個）；"
+                             ".txt 或 -（標準輸入）為已提取的文字，略過 PDF 提取")
     parser.add_argument("--verbose", action="store_true", help="顯示詳細的清洗過程資訊")
     parser.add_argument("--raw", action="store_true", help="輸出原始格式（不進行扁平化轉換）")
+    parser.add_argument("--workers", type=int, default=1, help="平行提取頁面文字的行程數（預設 1）")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="平行解析題目的行程數（預設單行程；只適用於未指定 --format / --output 的單檔模式，"
+                             "清洗後的文字需遠大於 1 MB 才可能比單行程快）")
+    parser.add_argument("--chunk-size", type=int, default=None, help="平行提取時每個工作分配的頁數（預設自動）")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet", "sqlite"], default=None,
+                        help="輸出格式（未指定 --output 時寫到標準輸出；批次模式預設 jsonl）")
+    parser.add_argument("--output", default=None, help="輸出檔路徑（未指定 --format 時依副檔名判斷）")
+    parser.add_argument("--output-dir", default=None, help="批次模式的輸出目錄，每個 PDF 輸出一個檔案")
+    parser.add_argument("--jobs", type=int, default=None, help="批次模式同時處理的檔案數（預設 CPU 核心數）")
+    parser.add_argument("--cache", action="store_true", help="使用頁面文字快取（也可設定 PDF_CLEANING_CACHE_DIR 啟用）")
+    parser.add_argument("--cache-dir", default=None, help="快取目錄（指定時自動啟用快取）")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="快取總大小上限 MB（預設 512）")
+    parser.add_argument("--no-cache", action="store_true", help="略過快取，一律重新提取")
+    parser.add_argument("--clear-cache", action="store_true", help="執行前清空快取")
+    parser.add_argument("--rules", default=None, help="清洗規則 JSON 設定檔（預設使用內建規則）")
+    parser.add_argument("--extraction", choices=list(EXTRACTION_PROFILES), default=None,
+                        help="PyMuPDF 提取設定：default 或 blocks（文字區塊模式），解析結果相同")
+    parser.add_argument("--clip-margins", default=None, metavar="TOP,BOTTOM",
+                        help="提取時略過頁面上方與下方的區域（頁面高度的比例，如 0.05,0.05）；"
+                             "區域內的文字會遺失，請先確認頁首頁尾與內文不重疊")
+    parser.add_argument("--profile", nargs="?", const="-", default=None, metavar="PATH",
+                        help="記錄各階段的時間與資料量，以 JSON 寫入 PATH（省略時輸出到 stderr）")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="--profile 另外以 tracemalloc 記錄各階段的記憶體峰值（單檔模式；執行會慢上數倍）")
+    parser.add_argument("--serve", action="store_true", help="以 HTTP 服務常駐執行（POST /parse 上傳 PDF）")
+    parser.add_argument("--host", default="127.0.0.1", help="服務監聽位址（預設 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8000, help="服務監聽埠號（預設 8000）")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="服務執行中與等待中請求數上限，超過時回應 503（預設 --jobs 的 4 倍）")
+    parser.add_argument("--max-upload-mb", type=int, default=256, help="服務單一上傳檔大小上限 MB（預設 256）")
+    parser.add_argument("--watch", default=None, metavar="DIR",
+                        help="常駐監看投放目錄 DIR，寫入完成的新 PDF 依大小排入佇列處理，結果寫到 --output-dir")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="--watch 判定檔案寫入完成前需靜止的秒數（預設 2）")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="--watch 輪詢目錄的間隔秒數（預設 1；有安裝 watchdog 時事件會提早喚醒）")
+    parser.add_argument("--largest-first", action="store_true", help="--watch 改為大檔優先（預設小檔優先）")
+    parser.add_argument("--incremental", default=None, metavar="STATE",
+                        help="增量處理：以 STATE 狀態檔記錄頁面雜湊與題目來源頁，改版時只重新處理變更的頁面")
+    parser.add_argument("--diff", default=None, metavar="PATH",
+                        help="增量處理時將新增、變更、刪除的題目以 JSON 寫入 PATH")
+    parser.add_argument("--job", default=None, metavar="DIR",
+                        help="分段處理並將每段結果寫入檢查點目錄 DIR，中斷後重新執行會從最後完成的段落繼續")
+    parser.add_argument("--chunk-pages", type=int, default=200, help="--job 每段的頁數（預設 200）")
+    parser.add_argument("--dedup", default=None, metavar="INDEX",
+                        help="以 INDEX（SQLite）比對既有題庫，略過重複與近似重複的題目並將新題目加入索引")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="近似重複的相似度門檻（0–1，預設 0.8）")
+    parser.add_argument("--index", default=None, metavar="INDEX",
+                        help="將結果加入 INDEX（SQLite FTS5 全文檢索索引），同一 PDF 重新加入時取代舊資料")
+    parser.add_argument("--search", default=None, metavar="QUERY",
+                        help="查詢 --index 指定的索引（每個詞都必須出現，\"片語\"、前綴*）後結束")
+    parser.add_argument("--limit", type=int, default=20, help="--search 最多顯示的筆數（預設 20）")
+    parser.add_argument("--max-ranked", type=int, default=None, metavar="N",
+                        help="--search 只對最近加入的 N 筆符合結果排序，換取常見詞的固定查詢時間（預設全部排序）")
     args = parser.parse_args()
 
-    # 讀取 PDF 檔案並轉換為二進位流
-    with open(args.pdf_path, "rb") as f:
-        pdf_bytes = io.BytesIO(f.read())
+    cache = make_cache(args)
+    if args.clear_cache:
+        from src.cache import PageCache
+        target = cache or PageCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        removed = target.clear()
+        print(f"[run] 已清除 {removed} 筆快取：{target.cache_dir}", file=sys.stderr)
+        if not args.inputs and not args.serve and not args.watch:
+            return
 
-    # 執行完整的處理流程（預設會格式化輸出）
-    results = run_pipeline(pdf_bytes, verbose=args.verbose, format_output=not args.raw)
+    if args.search is not None:
+        if not args.index:
+            parser.error("--search 需要以 --index 指定索引檔")
+        if args.inputs:
+            parser.error("--search 不處理 PDF，請分開執行")
+        run_search_mode(args)
+        return
 
-    # 輸出解析結果
+    if args.rules:
+        from src.cleaner import load_rules
+        args.rules = load_rules(args.rules)
+
+    if (args.extraction or args.clip_margins) and (args.serve or args.watch):
+        parser.error("--extraction 與 --clip-margins 不適用於 --serve 與 --watch")
+    if args.parse_workers and (args.serve or args.watch or args.job or args.incremental
+                               or args.output_dir or args.format or args.output):
+        parser.error("--parse-workers 只適用於未指定 --format / --output 的單檔模式")
+    if args.clip_margins:
+        try:
+            top, bottom = (float(value) for value in args.clip_margins.split(","))
+            args.extraction = with_margins(args.extraction, top, bottom)
+        except ValueError as e:
+            parser.error(f"--clip-margins 格式錯誤（應為 TOP,BOTTOM）：{e}")
+
+    if args.serve:
+        if args.inputs:
+            parser.error("--serve 模式不接受 PDF 路徑，請以 POST /parse 上傳")
+        from src.server import serve
+        serve(args.host, args.port, jobs=args.jobs, max_pending=args.max_pending,
+              max_upload_bytes=args.max_upload_mb * 1024 * 1024, workers=args.workers,
+              chunk_size=args.chunk_size, cache=cache, rules=args.rules)
+        return
+
+    if args.watch:
+        if args.inputs:
+            parser.error("--watch 模式不接受 PDF 路徑，請將檔案放入監看目錄")
+        if not args.output_dir:
+            parser.error("--watch 需要以 --output-dir 指定輸出目錄")
+        args.format = args.format or "jsonl"
+        if args.raw and args.format != "jsonl":
+            parser.error("--raw 的巢狀格式只能輸出為 jsonl")
+        from src.watch import watch
+        watch(args.watch, args.output_dir, jobs=args.jobs, output_format=args.format,
+              format_output=not args.raw, settle=args.settle, interval=args.poll_interval,
+              largest_first=args.largest_first, workers=args.workers, chunk_size=args.chunk_size,
+              cache=cache, rules=args.rules)
+        return
+
+    if not args.inputs:
+        parser.error("請指定至少一個 PDF 檔案")
+
+    from src.batch import expand_inputs
+    if args.inputs == ["-"]:
+        files, missing = ["-"], []
+    else:
+        files, missing = expand_inputs(args.inputs)
+    for item in missing:
+        print(f"[run] 找不到符合的 PDF：{item}", file=sys.stderr)
+    if not files:
+        parser.error("沒有可處理的 PDF 檔案")
+
+    # 多個檔案或指定輸出目錄時進入批次模式
+    if args.output_dir or len(files) > 1:
+        if args.job:
+            parser.error("--job 一次只能處理一個 PDF")
+        if args.profile_memory:
+            parser.error("--profile-memory 只適用於單檔模式")
+        if args.dedup:
+            parser.error("--dedup 需依序處理，請逐一對每個 PDF 執行（共用同一個索引檔）")
+        if not args.output_dir:
+            parser.error("處理多個檔案時必須指定 --output-dir")
+        if args.output:
+            parser.error("批次模式請使用 --output-dir，而非 --output")
+        args.format = args.format or "jsonl"
+        if args.raw and args.format != "jsonl":
+            parser.error("--raw 的巢狀格式只能輸出為 jsonl")
+        sys.exit(run_batch_mode(files, args, cache, index=open_index(args)))
+
+    if args.job:
+        from src.pdf_reader import is_text_input
+        if is_text_input(files[0]):
+            parser.error("--job 需要 PDF 輸入")
+        if args.incremental or args.dedup:
+            parser.error("--job 無法與 --incremental 或 --dedup 並用")
+        run_job_mode(files[0], args, parser, index=open_index(args))
+        return
+
+    if args.incremental:
+        from src.pdf_reader import is_text_input
+        if is_text_input(files[0]):
+            parser.error("--incremental 需要 PDF 輸入（以頁面內容串流判斷變更）")
+        if args.dedup:
+            parser.error("--dedup 無法與 --incremental 並用")
+        run_incremental_mode(files[0], args, parser, index=open_index(args))
+        return
+    if args.diff:
+        parser.error("--diff 需要搭配 --incremental")
+
+    collector = None
+    if args.profile:
+        from src.instrument import Collector
+        collector = Collector(memory=args.profile_memory)
+    elif args.profile_memory:
+        parser.error("--profile-memory 需要搭配 --profile")
+
+    dedup = None
+    if args.dedup:
+        from src.dedup import DedupIndex
+        dedup = DedupIndex(args.dedup, threshold=args.dedup_threshold)
+    index = open_index(args)
+
+    # 指定輸出格式或檔案時，以串流方式邊處理邊寫出
+    if args.format or args.output:
+        from src.sinks import guess_format, open_sink
+
+        fmt = args.format or guess_format(args.output)
+        if fmt is None:
+            parser.error(f"無法從副檔名判斷輸出格式，請指定 --format：{args.output}")
+        if args.raw and fmt != "jsonl":
+            parser.error("--raw 的巢狀格式只能輸出為 jsonl")
+
+        rows = run_pipeline(files[0], verbose=args.verbose, format_output=not args.raw,
+                            stream=True, workers=args.workers, chunk_size=args.chunk_size,
+                            cache=cache, rules=args.rules, collector=collector, dedup=dedup,
+                            extraction=args.extraction)
+        if index is not None:
+            rows = index.iter_add(rows, source=files[0])
+        with open_sink(fmt, args.output or "-", source=files[0]) as sink:
+            sink.write_all(rows)
+        report_dedup(dedup)
+        report_index(index)
+        write_profile(args.profile, collector)
+        return
+
+    # 執行完整的處理流程（預設會格式化輸出）；直接傳入路徑，由 PyMuPDF 開啟檔案，不先整檔讀入
+    results = run_pipeline(files[0], verbose=args.verbose, format_output=not args.raw,
+                           workers=args.workers, chunk_size=args.chunk_size, cache=cache,
+                           rules=args.rules, collector=collector, dedup=dedup,
+                           extraction=args.extraction, parse_workers=args.parse_workers)
+
+    if index is not None:
+        index.add(results, source=files[0])
+
+    # 輸出解析結果（原始格式的 Question 紀錄以 dict 形式顯示）
     for item in results:
-        print(item)
+        print(item.to_dict() if args.raw else item)
+    report_dedup(dedup)
+    report_index(index)
+    write_profile(args.profile, collector)
+
+
+def make_cache(args):
+    """依命令列參數建立頁面文字快取，未啟用時回傳 None"""
+    if args.no_cache:
+        return None
+    if not (args.cache or args.cache_dir or os.environ.get("PDF_CLEANING_CACHE_DIR")):
+        return None
+
+    from src.cache import PageCache
+    return PageCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def report_dedup(dedup) -> None:
+    """在 stderr 顯示去重結果並關閉索引"""
+    if dedup is None:
+        return
+    print(f"[dedup] 略過 {dedup.duplicates} 題重複（其中 {dedup.exact_duplicates} 題完全相同），"
+          f"索引共 {len(dedup)} 筆：{dedup.path}", file=sys.stderr)
+    dedup.close()
+
+
+def open_index(args):
+    """依 --index 開啟全文檢索索引，未指定時回傳 None"""
+    if not args.index:
+        return None
+    from src.search import SearchIndex
+    return SearchIndex(args.index)
+
+
+def report_index(index) -> None:
+    """在 stderr 顯示索引大小並關閉索引"""
+    if index is None:
+        return
+    print(f"[index] 索引共 {len(index)} 題：{index.path}", file=sys.stderr)
+    index.close()
+
+
+def run_search_mode(args) -> None:
+    """查詢全文檢索索引，依相關度輸出命中的題目與摘要"""
+    from src.search import SearchIndex
+
+    if not os.path.exists(args.index):
+        sys.exit(f"[search] 找不到索引檔：{args.index}")
+    with SearchIndex(args.index) as index:
+        try:
+            hits = index.search(args.search, limit=args.limit, max_ranked=args.max_ranked)
+        except ValueError as e:
+            sys.exit(f"[search] {e}")
+
+    for hit in hits:
+        print(f"{hit['source']}  Topic {hit['Topic']} Question #{hit['question_id']}"
+              f"  (answer: {hit['answer']})")
+        print(f"    {hit['snippet']}")
+    print(f"[search] {len(hits)} 筆", file=sys.stderr)
+
+
+def write_profile(path: str | None, report) -> None:
+    """將量測結果以 JSON 寫入檔案（path 為 "-" 時輸出到 stderr）"""
+    if not path or report is None:
+        return
+    import json
+
+    if not isinstance(report, dict):
+        report = report.report()
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text, file=sys.stderr)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+def run_incremental_mode(path: str, args, parser, index=None) -> None:
+    """增量處理單一 PDF：輸出更新後的完整結果，並在 stderr 顯示差異摘要"""
+    import json
+    from src.incremental import run_incremental
+
+    result = run_incremental(path, args.incremental, format_output=not args.raw, rules=args.rules,
+                             extraction=args.extraction)
+    diff = result["diff"]
+    if index is not None:
+        index.add(result["rows"], source=path)
+
+    if args.format or args.output:
+        from src.sinks import guess_format, open_sink
+
+        fmt = args.format or guess_format(args.output)
+        if fmt is None:
+            parser.error(f"無法從副檔名判斷輸出格式，請指定 --format：{args.output}")
+        with open_sink(fmt, args.output or "-", source=path) as sink:
+            sink.write_all(result["rows"])
+    else:
+        for item in result["rows"]:
+            print(item.to_dict() if args.raw else item)
+
+    mode = "完整處理" if result["full"] else "增量處理"
+    print(f"[incremental] {mode}：{result['pages']} 頁中重新提取 {result['extracted']} 頁、"
+          f"重新解析 {result['reparsed']} 頁；新增 {len(diff['added'])} 題、"
+          f"變更 {len(diff['changed'])} 題、刪除 {len(diff['removed'])} 題", file=sys.stderr)
+
+    if args.diff:
+        report = {
+            "added": [q.to_dict() for q in diff["added"]],
+            "changed": [{"before": c["before"].to_dict(), "after": c["after"].to_dict()}
+                        for c in diff["changed"]],
+            "removed": [q.to_dict() for q in diff["removed"]],
+        }
+        with open(args.diff, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+    report_index(index)
+
+
+def run_job_mode(path: str, args, parser, index=None) -> None:
+    """以可續跑的工作模式處理單一 PDF：輸出完整結果，並在 stderr 顯示進度與隔離的頁面"""
+    from src.jobs import run_job
+
+    def progress(chunk):
+        if args.verbose:
+            state = "已載入檢查點" if chunk["resumed"] else "完成"
+            print(f"[job] 第 {chunk['start'] + 1}–{chunk['end']} 頁{state}：{chunk['questions']} 題"
+                  + (f"，隔離 {chunk['quarantined']} 頁" if chunk["quarantined"] else ""), file=sys.stderr)
+
+    result = run_job(path, args.job, chunk_pages=args.chunk_pages, format_output=not args.raw,
+                     rules=args.rules, on_chunk=progress, extraction=args.extraction)
+    if index is not None:
+        index.add(result["rows"], source=path)
+
+    if args.format or args.output:
+        from src.sinks import guess_format, open_sink
+
+        fmt = args.format or guess_format(args.output)
+        if fmt is None:
+            parser.error(f"無法從副檔名判斷輸出格式，請指定 --format：{args.output}")
+        with open_sink(fmt, args.output or "-", source=path) as sink:
+            sink.write_all(result["rows"])
+    else:
+        for item in result["rows"]:
+            print(item.to_dict() if args.raw else item)
+
+    print(f"[job] {result['pages']} 頁、{result['chunks']} 段（{result['resumed']} 段沿用檢查點），"
+          f"{len(result['rows'])} 題", file=sys.stderr)
+    for item in result["quarantine"]:
+        print(f"[job] 隔離第 {item['page'] + 1} 頁：{item['error']}", file=sys.stderr)
+    report_index(index)
+
+
+def run_batch_mode(files: list, args, cache=None, index=None) -> int:
+    """批次處理多個 PDF，結束時輸出吞吐量摘要
+
+    指定 index 時，每個檔案完成後讀回其輸出檔加入全文檢索索引。
+
+    Returns:
+        int: 結束碼（有任一檔案失敗時為 1）
+    """
+    from src.batch import run_batch
+
+    def report(result):
+        if result["error"]:
+            print(f"[失敗] {result['path']}: {result['error']}", file=sys.stderr)
+            return
+        if index is not None:
+            from src.sinks import read_rows
+            index.add(read_rows(args.format, result["output"]), source=result["path"])
+        if args.verbose:
+            print(f"[完成] {result['path']} → {result['output']} "
+                  f"({result['pages']} 頁, {result['questions']} 題, {result['seconds']:.2f} s)")
+
+    summary = run_batch(files, args.output_dir, jobs=args.jobs, format_output=not args.raw,
+                        workers=args.workers, chunk_size=args.chunk_size, cache=cache,
+                        rules=args.rules, output_format=args.format, profile=bool(args.profile),
+                        on_result=report, extraction=args.extraction)
+
+    print("=== 批次處理摘要 ===")
+    print(f"檔案: {summary['files']}（失敗 {summary['failed']}）")
+    print(f"頁數: {summary['pages']}，題目: {summary['questions']}，耗時: {summary['seconds']:.2f} s")
+    print(f"吞吐量: {summary['pages_per_sec']:.1f} pages/s，{summary['questions_per_sec']:.1f} questions/s")
+
+    write_profile(args.profile, {r["path"]: r.get("profile") for r in summary["results"]})
+    report_index(index)
+
+    return 1 if summary["failed"] else 0
 
 
 if __name__ == "__main__":
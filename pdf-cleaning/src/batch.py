@@ -0,0 +1,207 @@
+# batch.py - 批次處理模組：將多個 PDF 分派到行程池並行執行清洗流程
+import glob
+import os
+import time
+
+from src.pipeline import run_pipeline
+from src.sinks import EXTENSIONS, open_sink
+
+
+def expand_inputs(inputs: list) -> tuple[list, list]:
+    """將檔案、目錄與 glob 樣式展開成 PDF 檔案清單
+
+    目錄只收集第一層的 *.pdf；glob 支援 ** 遞迴比對。重複的檔案只保留第一次出現。
+
+    Args:
+        inputs: 命令列提供的路徑、目錄或 glob 樣式
+
+    Returns:
+        tuple[list, list]: (PDF 檔案路徑清單, 找不到對應檔案的輸入)
+    """
+    files = []
+    missing = []
+    seen = set()
+
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(glob.escape(item), "*.pdf")))
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+
+        if not matches:
+            missing.append(item)
+            continue
+
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+
+    return files, missing
+
+
+def output_paths(files: list, output_dir: str, ext: str = ".jsonl") -> list:
+    """為每個輸入檔決定輸出路徑（同名檔案會加上 -2、-3... 避免互相覆寫）"""
+    used = {}
+    paths = []
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = used.get(stem, 0) + 1
+        used[stem] = count
+        name = stem if count == 1 else f"{stem}-{count}"
+        paths.append(os.path.join(output_dir, name + ext))
+    return paths
+
+
+def process_file(path: str, output_path: str, format_output: bool = True,
+                 workers: int | None = None, chunk_size: int | None = None,
+                 cache=None, rules=None, output_format: str = "jsonl",
+                 profile: bool = False, extraction=None) -> dict:
+    """處理單一 PDF 並將結果以串流方式寫出
+
+    任何例外都會被捕捉並記錄在回傳結果中，不會影響其他檔案。
+
+    Args:
+        path: PDF 檔案路徑
+        output_path: 輸出檔路徑（先寫入暫存檔，成功後才改名；SQLite 直接在既有資料庫中更新）
+        format_output: 是否輸出扁平化格式
+        workers: 單檔內平行提取頁面的行程數
+        chunk_size: 平行提取時每個工作分配的頁數
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        output_format: 輸出格式（"csv"、"jsonl"、"parquet" 或 "sqlite"）
+        profile: 是否記錄各階段效能指標（結果放在 profile 欄位）
+        extraction: PyMuPDF 提取設定（見 src.pipeline.run_pipeline()）
+
+    Returns:
+        dict: 處理結果，包含 path、output、pages、questions、seconds、error（與 profile）
+    """
+    result = {"path": path, "output": output_path, "pages": 0,
+              "questions": 0, "seconds": 0.0, "error": None}
+    start = time.perf_counter()
+    # SQLite 以來源為鍵就地 upsert，寫入暫存檔再改名會蓋掉資料庫中其他來源的資料
+    tmp_path = output_path if output_format == "sqlite" else output_path + ".tmp"
+
+    try:
+        collector = None
+        if profile:
+            from src.instrument import Collector
+            collector = Collector()
+        # 頁數取自流經流程的頁面，快取命中時不必為了計算頁數再開啟 PDF
+        counts = {}
+        rows = run_pipeline(path, format_output=format_output, stream=True,
+                            workers=workers, chunk_size=chunk_size, cache=cache,
+                            rules=rules, collector=collector, extraction=extraction,
+                            counts=counts)
+
+        with open_sink(output_format, tmp_path, source=path) as sink:
+            result["questions"] = sink.write_all(rows)
+        result["pages"] = counts["pages"]
+        if tmp_path != output_path:
+            os.replace(tmp_path, output_path)
+        if collector is not None:
+            result["profile"] = collector.report()
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        if tmp_path != output_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(files: list, output_dir: str, jobs: int | None = None,
+              format_output: bool = True, workers: int | None = None,
+              chunk_size: int | None = None, cache=None, rules=None,
+              output_format: str = "jsonl", profile: bool = False,
+              on_result=None, extraction=None) -> dict:
+    """以行程池並行處理多個 PDF，每個檔案的錯誤彼此獨立
+
+    Args:
+        files: PDF 檔案路徑清單
+        output_dir: 輸出目錄（不存在時自動建立）
+        jobs: 同時處理的檔案數（None 表示 CPU 核心數）
+        format_output: 是否輸出扁平化格式
+        workers: 單檔內平行提取頁面的行程數
+        chunk_size: 平行提取時每個工作分配的頁數
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        output_format: 每個檔案的輸出格式（"csv"、"jsonl" 或 "parquet"）
+        profile: 是否記錄每個檔案的各階段效能指標
+        on_result: 每完成一個檔案時呼叫的回呼函式，參數為該檔的處理結果
+        extraction: PyMuPDF 提取設定（見 src.pipeline.run_pipeline()）
+
+    Returns:
+        dict: 批次摘要（見 summarize()），results 欄位依輸入順序排列
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = output_paths(files, output_dir, EXTENSIONS[output_format])
+    results = [None] * len(files)
+    options = (format_output, workers, chunk_size, cache, rules, output_format, profile, extraction)
+
+    def record(i, result):
+        results[i] = result
+        if on_result:
+            on_result(result)
+
+    start = time.perf_counter()
+    # 子行程異常結束（例如 PyMuPDF 崩潰或被 OOM killer 終止）時，整個行程池的未完成工作都會失敗，
+    # 無法得知是哪個檔案造成的；這些檔案之後逐一在新的行程池中重試
+    suspects = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(process_file, path, out, *options): i
+            for i, (path, out) in enumerate(zip(files, outputs))
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                suspects.append(futures[future])
+                continue
+            record(futures[future], result)
+
+    # 每次只處理一個檔案，再次使行程池中止的檔案記為失敗，不影響其他檔案
+    for i in sorted(suspects):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                result = pool.submit(process_file, files[i], outputs[i], *options).result()
+            except BrokenProcessPool as e:
+                result = {"path": files[i], "output": outputs[i], "pages": 0, "questions": 0,
+                          "seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+        record(i, result)
+
+    return summarize(results, time.perf_counter() - start)
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """彙總批次處理結果並計算吞吐量
+
+    Args:
+        results: process_file() 回傳的結果清單
+        elapsed: 整體經過的秒數
+
+    Returns:
+        dict: 包含 files、failed、pages、questions、seconds、
+            pages_per_sec、questions_per_sec、results
+    """
+    ok = [r for r in results if r["error"] is None]
+    pages = sum(r["pages"] for r in ok)
+    questions = sum(r["questions"] for r in ok)
+
+    return {
+        "files": len(results),
+        "failed": len(results) - len(ok),
+        "pages": pages,
+        "questions": questions,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed if elapsed > 0 else 0.0,
+        "questions_per_sec": questions / elapsed if elapsed > 0 else 0.0,
+        "results": results,
+    }
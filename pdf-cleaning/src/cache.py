@@ -0,0 +1,268 @@
+# cache.py - 快取模組：以 PDF 內容雜湊為鍵，將提取出的頁面文字壓縮存放在磁碟上
+import hashlib
+import json
+import os
+import zlib
+
+from src.pdf_reader import DEFAULT_EXTRACTION, as_source, get_extraction, iter_pages
+
+# 快取格式版本，變更儲存格式時遞增即可讓舊快取自動失效
+CACHE_FORMAT = 1
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 預設快取上限 512 MB
+ENTRY_SUFFIX = ".pages.z"
+
+
+def default_cache_dir() -> str:
+    """回傳預設快取目錄（可用環境變數 PDF_CLEANING_CACHE_DIR 覆寫）"""
+    return os.environ.get("PDF_CLEANING_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "pdf-cleaning")
+
+
+def extractor_settings(extraction=None) -> dict:
+    """回傳影響提取結果的設定，會一併納入快取鍵
+
+    Args:
+        extraction: 提取設定（src.pdf_reader.ExtractionProfile 或其名稱），None 表示預設設定
+    """
+    from importlib import metadata   # 匯入成本約 10 ms，只在使用快取時才需要
+
+    try:
+        version = metadata.version("PyMuPDF")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    settings = {"format": CACHE_FORMAT, "extractor": "pymupdf.get_text", "pymupdf": version}
+    extraction = get_extraction(extraction)
+    if extraction is not DEFAULT_EXTRACTION:
+        # 預設設定不列入，既有的快取與工作檢查點仍然有效
+        settings["extraction"] = extraction.settings()
+    return settings
+
+
+def processing_settings(rules=None, extraction=None) -> dict:
+    """回傳影響清洗後頁面文字的設定：提取設定加上清洗規則
+
+    Args:
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        extraction: 提取設定（見 extractor_settings()）
+    """
+    from src.cleaner import DEFAULT_RULES
+
+    rules = rules or DEFAULT_RULES
+    return {
+        **extractor_settings(extraction),
+        "rules": [[r.name, r.pattern, r.replacement, r.literal, r.flags] for r in rules.rules],
+    }
+
+
+class PageCache:
+    """內容定址的頁面文字快取
+
+    每個項目以 sha256(PDF bytes + 提取設定) 為鍵，頁面文字以 JSON Lines 格式
+    經 zlib 串流壓縮後存放。讀取時會更新檔案 mtime，寫入後依總大小淘汰最久未用的項目（LRU）。
+
+    Args:
+        cache_dir: 快取目錄（None 表示使用 default_cache_dir()）
+        max_bytes: 快取總大小上限（位元組）
+    """
+
+    def __init__(self, cache_dir: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, pdf_data, settings: dict | None = None) -> str:
+        """計算快取鍵
+
+        Args:
+            pdf_data: PDF 內容（bytes 或支援 buffer protocol 的物件），
+                或檔案路徑（以串流方式雜湊，不會整檔讀入記憶體）
+            settings: 提取設定（None 表示使用 extractor_settings()）
+
+        Returns:
+            str: 十六進位的雜湊字串
+        """
+        if settings is None:
+            settings = extractor_settings()
+        if isinstance(pdf_data, (str, os.PathLike)):
+            with open(pdf_data, "rb") as f:
+                h = hashlib.file_digest(f, "sha256")
+        else:
+            h = hashlib.sha256(pdf_data)
+        h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        """回傳快取項目的檔案路徑（以鍵的前兩碼分目錄）"""
+        return os.path.join(self.cache_dir, key[:2], key + ENTRY_SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str):
+        """讀取快取的頁面文字
+
+        Returns:
+            list[str] | None: 各頁文字；快取不存在時回傳 None
+        """
+        pages = self.iter_get(key)
+        return None if pages is None else list(pages)
+
+    def iter_get(self, key: str):
+        """以串流方式讀取快取的頁面文字，解壓時一次只持有少量資料
+
+        Returns:
+            generator | None: 逐頁產出文字的 generator；快取不存在時回傳 None
+        """
+        path = self.path(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        self._touch(path)
+        return _iter_entry(f)
+
+    def put(self, key: str, pages) -> None:
+        """寫入頁面文字（整批寫入）"""
+        for _ in self.write_through(key, pages):
+            pass
+
+    def write_through(self, key: str, pages):
+        """邊產出頁面邊寫入快取，只有在全部頁面都產出後才會正式存檔
+
+        Args:
+            key: 快取鍵
+            pages: 可迭代的頁面文字
+
+        Yields:
+            str: 原樣轉交的頁面文字
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        compressor = zlib.compressobj(level=6)
+
+        try:
+            with open(tmp_path, "wb") as f:
+                for page in pages:
+                    f.write(compressor.compress((json.dumps(page, ensure_ascii=False) + "\n").encode("utf-8")))
+                    yield page
+                f.write(compressor.flush())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict()
+
+    def evict(self) -> int:
+        """依最後使用時間淘汰項目，直到總大小不超過 max_bytes
+
+        Returns:
+            int: 被刪除的項目數
+        """
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self) -> int:
+        """刪除所有快取項目
+
+        Returns:
+            int: 被刪除的項目數
+        """
+        removed = 0
+        for path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def size(self) -> int:
+        """回傳目前快取總大小（位元組）"""
+        total = 0
+        for path in self._entries():
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    yield entry.path
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+
+def _iter_entry(f, read_size: int = 1 << 16):
+    """逐塊解壓快取檔並逐行還原頁面文字"""
+    decompressor = zlib.decompressobj()
+    pending = b""
+    with f:
+        while True:
+            block = f.read(read_size)
+            data = decompressor.decompress(block) if block else decompressor.flush()
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield json.loads(line)
+            if not block:
+                break
+
+
+def iter_cached_pages(pdf_bytes, cache: PageCache, workers: int | None = None,
+                      chunk_size: int | None = None, extraction=None):
+    """帶快取的逐頁提取：命中時直接讀取快取，完全不會呼叫 PyMuPDF
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        cache: PageCache 實例
+        workers: 未命中時平行提取的行程數
+        chunk_size: 未命中時平行提取每個工作分配的頁數
+        extraction: 提取設定（見 src.pdf_reader.iter_pages()），不同設定的快取彼此獨立
+
+    Yields:
+        str: 單頁的原始文字
+    """
+    source = as_source(pdf_bytes)
+    key = cache.key(source, extractor_settings(extraction))
+
+    pages = cache.iter_get(key)
+    if pages is not None:
+        yield from pages
+        return
+
+    yield from cache.write_through(key, iter_pages(source, workers=workers, chunk_size=chunk_size,
+                                                   extraction=extraction))
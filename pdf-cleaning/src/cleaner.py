@@ -1,47 +1,210 @@
 # cleaner.py - 文字清洗模組：移除雜訊、標準化格式
+import json
 import re
 
-def clean_text(raw_text: str, verbose: bool = False) -> str:
+
+class CleaningRule:
+    """單一清洗規則
+
+    Args:
+        name: 統計名稱（同時作為 stats 的鍵）
+        pattern: 正規表示式，或 literal=True 時的純文字
+        replacement: 替換文字（純文字，不支援群組參照）
+        literal: pattern 是否為純文字
+        keep_values: 是否在 stats 中保留被替換的原始內容（鍵為 f"{name}_values"）
+        flags: 正規表示式旗標字元，例如 "i"（忽略大小寫）、"m"（多行 ^$）
+    """
+
+    def __init__(self, name: str, pattern: str, replacement: str = "",
+                 literal: bool = False, keep_values: bool = False, flags: str = ""):
+        self.name = name
+        self.pattern = pattern
+        self.replacement = replacement
+        self.literal = literal
+        self.keep_values = keep_values
+        self.flags = flags
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "CleaningRule":
+        """由設定字典建立規則（鍵同建構子參數）"""
+        return cls(
+            name=config["name"],
+            pattern=config["pattern"],
+            replacement=config.get("replacement", ""),
+            literal=config.get("literal", False),
+            keep_values=config.get("keep_values", False),
+            flags=config.get("flags", ""),
+        )
+
+    def regex(self) -> str:
+        """回傳可放進組合式樣的正規表示式片段"""
+        body = re.escape(self.pattern) if self.literal else self.pattern
+        # 以局部旗標包住，避免影響其他規則
+        return f"(?{self.flags}:{body})" if self.flags else f"(?:{body})"
+
+
+class RuleSet:
+    """將多條清洗規則編譯成單一交替式樣，一次掃描即可同時替換並計數
+
+    組合式樣不含捕獲群組，讓 re 模組能套用開頭字元的快速搜尋；
+    每次命中時再依序以各規則在命中位置嘗試比對，判斷是哪一條規則
+    （此成本只與命中次數相關，與文字長度無關）。
+    同一位置有多條規則可比對時，以清單中較前面的規則為準。
+    規則式樣內不可使用數字群組的反向參照（如 \\1）。
+
+    Args:
+        rules: CleaningRule 清單
+    """
+
+    def __init__(self, rules: list):
+        self.rules = list(rules)
+        self._matchers = [(re.compile(rule.regex()).match, rule) for rule in self.rules]
+        self._pattern = re.compile(
+            "|".join(rule.regex() for rule in self.rules)
+        ) if self.rules else None
+
+    def apply(self, text: str) -> tuple[str, dict]:
+        """套用所有規則
+
+        Args:
+            text: 原始文字
+
+        Returns:
+            tuple[str, dict]: (清洗後文字, 統計資訊)
+        """
+        stats = self.empty_stats()
+        if self._pattern is None:
+            return text, stats
+
+        matchers = self._matchers
+
+        def replace(m):
+            start = m.start()
+            for match, rule in matchers:
+                if match(text, start):
+                    break
+            stats[rule.name] += 1
+            if rule.keep_values:
+                stats[rule.name + "_values"].append(m.group())
+            return rule.replacement
+
+        return self._pattern.sub(replace, text), stats
+
+    def empty_stats(self) -> dict:
+        """回傳各規則計數皆為 0 的統計字典"""
+        stats = {}
+        for rule in self.rules:
+            stats[rule.name] = 0
+            if rule.keep_values:
+                stats[rule.name + "_values"] = []
+        return stats
+
+
+# 預設規則：移除「店长微信：xxxx」廣告，並將不換行空白 (\xa0) 換成一般空白
+DEFAULT_RULES = RuleSet([
+    CleaningRule("removed_wechat", r"店长微信：\S+", "", keep_values=True),
+    CleaningRule("replaced_nbsp", "\xa0", " ", literal=True),
+])
+
+
+def load_rules(path: str) -> RuleSet:
+    """從 JSON 設定檔載入清洗規則
+
+    設定檔為規則物件的陣列（或 {"rules": [...]}），每個物件的鍵同 CleaningRule 參數：
+        [{"name": "removed_watermark", "pattern": "ExamTopics\\\\.com", "flags": "i"},
+         {"name": "replaced_nbsp", "pattern": "\\u00a0", "replacement": " ", "literal": true}]
+
+    Args:
+        path: 設定檔路徑
+
+    Returns:
+        RuleSet: 編譯後的規則集
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if isinstance(config, dict):
+        config = config["rules"]
+    return RuleSet([CleaningRule.from_dict(item) for item in config])
+
+
+def clean_text(raw_text: str, verbose: bool = False, rules: RuleSet | None = None) -> str:
     """清洗原始文字，回傳處理後的乾淨文字
     
     Args:
         raw_text: 從 PDF 提取的原始文字
         verbose: 是否顯示清洗統計資訊
+        rules: 清洗規則集（None 表示使用 DEFAULT_RULES）
     
     Returns:
         str: 清洗後的文字
     """
-    text, _ = clean_text_with_stats(raw_text, verbose=verbose)
+    text, _ = clean_text_with_stats(raw_text, verbose=verbose, rules=rules)
     return text
 
 
-def clean_text_with_stats(raw_text: str, verbose: bool = False) -> tuple[str, dict]:
+def clean_text_with_stats(raw_text: str, verbose: bool = False,
+                          rules: RuleSet | None = None) -> tuple[str, dict]:
     """清理文字並回傳 (cleaned_text, stats) 統計資訊。
 
-    stats keys:
+    所有規則在同一次掃描中完成替換與計數。
+
+    stats keys（預設規則）:
       - removed_wechat: 移除的「店长微信：...」數量
+      - removed_wechat_values: 被移除的原始內容
       - replaced_nbsp: 被替換的不換行空白 (\xa0) 數量
     """
-    stats = {}
+    if rules is None:
+        rules = DEFAULT_RULES
+    text, stats = rules.apply(raw_text)
 
-    # 移除 店长微信：xxxx
-    wechat_pattern = re.compile(r"店长微信：\S+")
-    found = wechat_pattern.findall(raw_text)
-    stats["removed_wechat"] = len(found)
-    stats["removed_wechat_values"] = found
-    text = wechat_pattern.sub("", raw_text)
+    if verbose:
+      _print_stats(stats)
 
-    # 移除不正常空白 (non-breaking space)
-    nb_count = raw_text.count("\xa0")
-    stats["replaced_nbsp"] = nb_count
-    text = text.replace("\xa0", " ")
+    return text, stats
+
+
+def iter_clean_pages(pages, stats: dict | None = None, verbose: bool = False,
+                     rules: RuleSet | None = None):
+    """逐頁清洗文字（串流模式），每次只處理一頁
+
+    預設規則不會跨越換行，因此逐頁清洗與整份文字一次清洗的結果相同。
+
+    Args:
+        pages: 可迭代的頁面文字（例如 iter_pages() 的輸出）
+        stats: 可選的統計字典，會就地累加各頁的統計資訊
+        verbose: 是否在全部頁面處理完後顯示清洗統計資訊
+        rules: 清洗規則集（None 表示使用 DEFAULT_RULES）
+
+    Yields:
+        str: 清洗後的單頁文字
+    """
+    if rules is None:
+        rules = DEFAULT_RULES
+    if stats is None:
+        stats = {}
+    for key, value in rules.empty_stats().items():
+        stats.setdefault(key, value)
+
+    for page in pages:
+        text, page_stats = rules.apply(page)
+        for key, value in page_stats.items():
+            if isinstance(value, list):
+                stats[key].extend(value)
+            else:
+                stats[key] += value
+        yield text
 
     if verbose:
-      print("[clean_text_with_stats] removed_wechat:", stats["removed_wechat"])
-      if found:
-        print("[clean_text_with_stats] removed_wechat_values:")
-        for item in found:
-          print("  -", item)
-      print("[clean_text_with_stats] replaced_nbsp:", stats["replaced_nbsp"])
+      _print_stats(stats)
 
-    return text, stats
+
+def _print_stats(stats: dict) -> None:
+    """輸出清洗統計資訊"""
+    for key, value in stats.items():
+      if isinstance(value, list):
+        if value:
+          print(f"[clean_text_with_stats] {key}:")
+          for item in value:
+            print("  -", item)
+      else:
+        print(f"[clean_text_with_stats] {key}:", value)
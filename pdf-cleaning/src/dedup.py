@@ -0,0 +1,306 @@
+# dedup.py - 去重模組：以 MinHash + LSH 找出跨題庫的重複與近似重複題目，索引存放在 SQLite
+import hashlib
+import re
+import sqlite3
+
+import numpy as np
+
+from src.formatter import topic_and_number
+from src.question import Question
+
+DEFAULT_NUM_PERM = 120
+DEFAULT_BANDS = 20          # 20 個 band × 6 列：Jaccard 0.8 的題目成為候選的機率約 99.8%
+DEFAULT_SHINGLE = 2         # 每個 shingle 包含的詞數（題目多半很短，較長的 shingle 對改字太敏感）
+DEFAULT_THRESHOLD = 0.8     # 估計 Jaccard 相似度達此值視為近似重複
+
+_NON_WORD = re.compile(r"\W+")
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+_SHIFT32 = np.uint64(32)
+_SPACE = np.uint64(ord(" "))
+_BASE = 1_000_003                        # 詞雜湊的多項式底數（奇數，模 2^64 可逆）
+_BASE_INV = pow(_BASE, -1, 2 ** 64)
+_SHINGLE_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_text(q) -> str:
+    """組出比對用的文字：題目加上各選項，轉小寫，標點與連續空白合併為單一空白
+
+    中日文字沒有空白分詞，每個字各自視為一個詞。
+    """
+    if isinstance(q, Question):
+        choices = [c for c in q.choices if c]
+    else:
+        choices = [c for c in q["choices"].values() if c]
+    text = " ".join([q["question"], *choices]).lower()
+    if not text.isascii():
+        text = _CJK.sub(r" \g<0> ", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+class DedupIndex:
+    """磁碟上的近似重複題目索引
+
+    每題以正規化文字中連續 shingle 個詞（預設 2 個詞；中日文字每字一詞）為單位計算 MinHash 簽章，簽章切成數個 band，
+    相同 band 值的題目才會成為候選，再以簽章估計的 Jaccard 相似度確認，
+    因此比對成本與既有題目數量大致無關，不需兩兩比較。
+    完全相同的文字以內容雜湊直接比對。正規化後沒有文字的題目（例如只有圖片的題目）
+    無從比對，不寫入索引，一律視為非重複。
+    確認為重複的題目只在 docs 表記錄它重複的題目（duplicate_of），不寫入 band，
+    重複投放同一份題庫不會讓分桶越來越大。
+
+    索引存放在 SQLite，新的 PDF 可以隨時加入並與既有題庫比對；
+    MinHash 參數寫在索引中，重新開啟時沿用，確保簽章可以互相比較。
+
+    Args:
+        path: SQLite 檔案路徑（":memory:" 表示只在記憶體中）
+        threshold: 視為近似重複的相似度下限（0–1）
+        num_perm: MinHash 簽章長度（僅建立新索引時使用）
+        bands: LSH band 數，需整除 num_perm（僅建立新索引時使用）
+        shingle: 每個 shingle 的詞數（僅建立新索引時使用）
+    """
+
+    def __init__(self, path: str = ":memory:", threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS,
+                 shingle: int = DEFAULT_SHINGLE):
+        if num_perm % bands:
+            raise ValueError(f"bands（{bands}）必須整除 num_perm（{num_perm}）")
+        self.path = path
+        self.threshold = threshold
+        self.duplicates = 0         # iter_unique() 略過的題目數
+        self.exact_duplicates = 0   # 其中文字完全相同的題目數
+        self._conn = sqlite3.connect(path)
+        self._init_schema({"num_perm": num_perm, "bands": bands, "shingle": shingle, "seed": 1})
+
+        params = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self.num_perm = params["num_perm"]
+        self.bands = params["bands"]
+        self.shingle = params["shingle"]
+        self._rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(params["seed"])
+        self._a = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+        self._band_mult = rng.integers(1, 2 ** 63, self._rows, dtype=np.uint64) | np.uint64(1)
+        self._shingle_powers = _SHINGLE_BASE ** np.arange(self.shingle, dtype=np.uint64)
+        self._pow = np.ones(1, dtype=np.uint64)       # _BASE^i，依需要加長
+        self._inv_pow = np.ones(1, dtype=np.uint64)   # _BASE^-i
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def signature(self, text: str) -> np.ndarray:
+        """計算正規化文字（非空）的 MinHash 簽章（uint32 陣列）"""
+        shingles = np.unique(self._shingles(text))
+        # 每個排列以 multiply-shift 雜湊實作，取高 32 位元後求最小值
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> _SHIFT32
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        """以向量化的多項式雜湊（模 2^64）算出每個詞，再組成連續 k 個詞的 shingle 雜湊"""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        n = len(codes)
+        self._ensure_powers(n)
+
+        # 前綴和 S[i] = Σ_{j<i} codes[j]·B^-(j+1)，則區段 [s, e) 的雜湊為 (S[e] - S[s])·B^e
+        prefix = np.zeros(n + 1, dtype=np.uint64)
+        np.cumsum(codes * self._inv_pow[1:n + 1], out=prefix[1:])
+        spaces = np.flatnonzero(codes == _SPACE)
+        starts = np.concatenate(([0], spaces + 1))
+        ends = np.concatenate((spaces, [n]))
+        words = (prefix[ends] - prefix[starts]) * self._pow[ends]
+
+        k = min(self.shingle, len(words))
+        m = len(words) - k + 1
+        shingles = np.zeros(m, dtype=np.uint64)
+        for j in range(k):
+            shingles += words[j:j + m] * self._shingle_powers[j]
+        return shingles
+
+    def _ensure_powers(self, n: int) -> None:
+        if len(self._pow) > n:
+            return
+        size = max(n + 1, len(self._pow) * 2)
+        self._pow = np.ones(size, dtype=np.uint64)
+        self._pow[1:] = np.cumprod(np.full(size - 1, _BASE, dtype=np.uint64))
+        self._inv_pow = np.ones(size, dtype=np.uint64)
+        self._inv_pow[1:] = np.cumprod(np.full(size - 1, _BASE_INV, dtype=np.uint64))
+
+    def band_keys(self, signature: np.ndarray) -> list:
+        """將簽章切成 band，每個 band 壓成一個 64 位元的分桶鍵"""
+        rows = signature.reshape(self.bands, self._rows).astype(np.uint64)
+        keys = (rows * self._band_mult).sum(axis=1)
+        return keys.view(np.int64).tolist()
+
+    def add(self, questions, source: str = "") -> list:
+        """將一批題目加入索引，並回傳每題與索引中較早題目的比對結果
+
+        同一批內的題目也會互相比對（後面的題目與前面的比較）。
+
+        Args:
+            questions: Question 紀錄（或舊格式 dict）的序列
+            source: 來源名稱（例如 PDF 檔名），記錄在索引中方便回報
+
+        Returns:
+            list[dict | None]: 與 questions 對應；非重複（或沒有文字可比對）為 None，重複時為
+                {"id", "source", "topic", "number", "similarity", "exact"}（最相似的既有題目，
+                不會是另一個重複的題目）
+        """
+        conn = self._conn
+        first_id = (conn.execute("SELECT MAX(id) FROM docs").fetchone()[0] or 0) + 1
+        batch = []
+        doc_rows = []
+        band_rows = []
+        for doc_id, q in enumerate(questions, first_id):
+            text = normalize_text(q)
+            if not text:
+                batch.append((doc_id, None, None))
+                continue
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+            sig = self.signature(text)
+            batch.append((doc_id, digest, sig))
+            doc_rows.append((doc_id, source, *(topic_and_number(q) or (None, None)), digest, sig.tobytes()))
+            band_rows.extend((band, key, doc_id) for band, key in enumerate(self.band_keys(sig)))
+
+        with conn:
+            conn.executemany("INSERT INTO docs (id, source, topic, number, digest, signature) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", doc_rows)
+            # 新題目的 band 先寫入暫存的 probe 表，候選查詢只需掃描這一批
+            conn.executemany("INSERT INTO temp.probe (band, bucket, doc_id) VALUES (?, ?, ?)", band_rows)
+            candidates = self._candidates(first_id)
+            conn.execute("DELETE FROM temp.probe")
+
+            # 依序確認，同一批中已判定為重複的題目不再作為後面題目的比對對象
+            matches = []
+            duplicates = {}
+            for doc_id, digest, sig in batch:
+                if digest is None:
+                    matches.append(None)
+                    continue
+                match = self._best_match(doc_id, digest, sig,
+                                         candidates.get(doc_id, set()) - duplicates.keys())
+                if match is not None:
+                    duplicates[doc_id] = match["id"]
+                matches.append(match)
+
+            conn.executemany("INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                             [row for row in band_rows if row[2] not in duplicates])
+            conn.executemany("UPDATE docs SET duplicate_of = ?, signature = NULL WHERE id = ?",
+                             [(original, doc_id) for doc_id, original in duplicates.items()])
+        return matches
+
+    def iter_unique(self, questions, source: str = "", batch_size: int = 1000, on_duplicate=None):
+        """逐題過濾重複題目（串流模式）：每累積一批就加入索引並產出非重複的題目
+
+        Args:
+            questions: 可迭代的題目
+            source: 來源名稱
+            batch_size: 每批題目數
+            on_duplicate: 發現重複時呼叫的回呼函式，參數為 (題目, 比對結果)
+
+        Yields:
+            非重複的題目（原物件）
+        """
+        batch = []
+        for q in questions:
+            batch.append(q)
+            if len(batch) >= batch_size:
+                yield from self._filter(batch, source, on_duplicate)
+                batch = []
+        if batch:
+            yield from self._filter(batch, source, on_duplicate)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _filter(self, batch: list, source: str, on_duplicate):
+        for q, match in zip(batch, self.add(batch, source)):
+            if match is None:
+                yield q
+                continue
+            self.duplicates += 1
+            self.exact_duplicates += match["exact"]
+            if on_duplicate is not None:
+                on_duplicate(q, match)
+
+    def _init_schema(self, params: dict) -> None:
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    topic INTEGER,
+                    number INTEGER,
+                    digest BLOB NOT NULL,
+                    signature BLOB,
+                    duplicate_of INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS docs_digest ON docs (digest);
+                CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, bucket INTEGER NOT NULL,
+                                                  doc_id INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS bands_bucket ON bands (band, bucket);
+                CREATE TEMP TABLE IF NOT EXISTS probe (band INTEGER, bucket INTEGER, doc_id INTEGER);
+                CREATE INDEX IF NOT EXISTS temp.probe_bucket ON probe (band, bucket);
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(docs)")}
+            if "duplicate_of" not in columns:   # 舊版建立的索引
+                self._conn.execute("ALTER TABLE docs ADD COLUMN duplicate_of INTEGER")
+            self._conn.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                                   params.items())
+
+    def _candidates(self, first_id: int) -> dict:
+        """找出這一批新題目（id >= first_id）的候選：較早加入、內容雜湊相同或共用任一 band 的非重複題目
+
+        同一批中較早的題目也列為候選（尚未寫入 bands，以 probe 表互相比對），
+        是否為重複由呼叫端依序確認後排除。
+
+        Returns:
+            dict[int, set]: 新題目 id → 候選題目 id
+        """
+        candidates = {}
+        rows = self._conn.execute("""
+            SELECT new.doc_id, old.doc_id
+            FROM temp.probe AS new JOIN bands AS old
+              ON old.band = new.band AND old.bucket = new.bucket
+            UNION
+            SELECT new.doc_id, old.doc_id
+            FROM temp.probe AS new JOIN temp.probe AS old
+              ON old.band = new.band AND old.bucket = new.bucket AND old.doc_id < new.doc_id
+            UNION
+            SELECT new.id, old.id
+            FROM docs AS new JOIN docs AS old
+              ON old.digest = new.digest AND old.id < new.id AND old.duplicate_of IS NULL
+            WHERE new.id >= ?
+        """, (first_id,))
+        for new_id, old_id in rows:
+            candidates.setdefault(new_id, set()).add(old_id)
+        return candidates
+
+    def _best_match(self, doc_id: int, digest: bytes, sig, candidate_ids) -> dict | None:
+        """以簽章相似度確認候選，回傳最相似且達門檻的既有題目"""
+        best = None
+        for old_id in sorted(candidate_ids):
+            source, topic, number, old_digest, old_sig = self._conn.execute(
+                "SELECT source, topic, number, digest, signature FROM docs WHERE id = ?", (old_id,)
+            ).fetchone()
+            exact = old_digest == digest
+            if exact:
+                similarity = 1.0
+            elif old_sig is None:
+                continue
+            else:
+                similarity = float(np.mean(np.frombuffer(old_sig, dtype=np.uint32) == sig))
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]
+                                                 or exact and not best["exact"]):
+                best = {"id": old_id, "source": source, "topic": topic, "number": number,
+                        "similarity": similarity, "exact": exact}
+                if exact:
+                    break
+        return best
@@ -1,5 +1,8 @@
 # formatter.py - 資料格式轉換模組：將解析結果轉換為扁平化欄位格式
-import re
+from src.question import CHOICE_KEYS, Question, parse_id
+
+# 扁平化資料列的欄位順序
+COLUMNS = ["Topic", "question_id", "question", "A", "B", "C", "D", "E", "F", "answer"]
 
 
 def format_questions_to_rows(questions: list) -> list:
@@ -9,7 +12,7 @@ def format_questions_to_rows(questions: list) -> list:
     {Topic, question_id, question, A, B, C, D, E, F, answer}
     
     Args:
-        questions: parse_questions() 回傳的題目列表
+        questions: parse_questions() 回傳的題目列表（Question 紀錄，亦接受舊格式 dict）
     
     Returns:
         list[dict]: 轉換後的資料列，每列包含：
@@ -19,30 +22,32 @@ def format_questions_to_rows(questions: list) -> list:
             - A, B, C, D, E, F: 各選項內容（不存在時為空字串）
             - answer: 正確答案
     """
-    final_rows = []
+    return list(iter_format_rows(questions))
 
-    for q in questions:
-        # 從 id 欄位解析出 Topic 與 Question 編號
-        # 例如: "Topic 1 Question #1" 或 "Topic NaN Question #2"
-        m = re.match(r"^Topic\s+(\d+|NaN)\s+Question #(\d+)", q["id"])
 
-        if not m:
+def iter_format_rows(questions):
+    """逐題轉換為扁平化資料列（串流模式）
+
+    Args:
+        questions: 可迭代的題目（例如 iter_questions() 的輸出）
+
+    Yields:
+        dict: 扁平化資料列，欄位同 format_questions_to_rows()
+    """
+    for q in questions:
+        ids = topic_and_number(q)
+        if ids is None:
             # 若無法解析 id 格式，跳過此題
             continue
 
-        topic = m.group(1)        # Topic 編號（數字或 "NaN"）
-        qid = m.group(2)          # Question 編號
+        topic = "NaN" if ids[0] is None else str(ids[0])   # Topic 編號（數字或 "NaN"）
+        qid = str(ids[1])                                    # Question 編號
 
         # 提取各選項（若不存在則補空字串）
-        A = q["choices"].get("A", "")
-        B = q["choices"].get("B", "")
-        C = q["choices"].get("C", "")
-        D = q["choices"].get("D", "")
-        E = q["choices"].get("E", "")
-        F = q["choices"].get("F", "")
+        A, B, C, D, E, F = _choice_values(q)
 
         # 組裝成新的扁平化資料列
-        final_rows.append({
+        yield {
             "Topic": topic,
             "question_id": qid,
             "question": q["question"],
@@ -53,6 +58,94 @@ def format_questions_to_rows(questions: list) -> list:
             "E": E,
             "F": F,
             "answer": q["answer"]
+        }
+
+
+def format_questions_to_columns(questions, backend: str = "pandas"):
+    """將題目直接轉換為欄式資料（DataFrame 或 Arrow Table），不建立中間的 dict 資料列
+
+    欄位同 format_questions_to_rows()，但 Topic 與 question_id 為整數欄位：
+    Topic 為可為空的整數（"NaN" 主題為缺值），question_id 為 int64。
+
+    Args:
+        questions: 可迭代的題目（parse_questions() / iter_questions() 的輸出）
+        backend: "pandas"（回傳 pandas.DataFrame）或 "arrow"（回傳 pyarrow.Table）
+
+    Returns:
+        pandas.DataFrame | pyarrow.Table: 欄式資料
+    """
+    if backend not in ("pandas", "arrow"):
+        raise ValueError(f"不支援的 backend：{backend}（可用值：pandas、arrow）")
+
+    columns = build_columns(questions)
+
+    if backend == "arrow":
+        import pyarrow as pa
+
+        types = {"Topic": pa.int32(), "question_id": pa.int64()}
+        return pa.table({
+            name: pa.array(values, type=types.get(name, pa.string()))
+            for name, values in columns.items()
         })
 
-    return final_rows
+    import numpy as np
+    import pandas as pd
+
+    data = {}
+    for name, values in columns.items():
+        if name == "Topic":
+            data[name] = pd.array(values, dtype="Int32")
+        elif name == "question_id":
+            data[name] = np.array(values, dtype=np.int64)
+        else:
+            data[name] = values
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def build_columns(questions) -> dict:
+    """逐題將欄位值附加到各欄的 list 中
+
+    Returns:
+        dict[str, list]: 欄位名稱 → 值的 list；Topic 為 int 或 None，question_id 為 int
+    """
+    topics, qids, texts, answers = [], [], [], []
+    choices = {key: [] for key in CHOICE_KEYS}
+
+    for q in questions:
+        ids = topic_and_number(q)
+        if ids is None:
+            # 與 format_questions_to_rows() 相同，無法解析 id 的題目略過
+            continue
+
+        topics.append(ids[0])
+        qids.append(ids[1])
+        texts.append(q["question"])
+        answers.append(q["answer"])
+
+        for key, value in zip(CHOICE_KEYS, _choice_values(q)):
+            choices[key].append(value)
+
+    return {"Topic": topics, "question_id": qids, "question": texts, **choices, "answer": answers}
+
+
+def topic_and_number(q):
+    """取得 (topic, number)：Question 紀錄直接讀取整數欄位；dict 與 Question.from_dict() 相同，
+    有 number 欄位時使用 topic / number 欄位，否則解析 id 字串
+
+    Returns:
+        tuple | None: (topic, number)，topic 為 int 或 None（NaN 主題）；dict 的 id 無法解析時為 None
+    """
+    if isinstance(q, Question):
+        return q.topic, q.number
+    if "number" in q:
+        return q.get("topic"), q["number"]
+    # 例如: "Topic 1 Question #1" 或 "Topic NaN Question #2"
+    return parse_id(q["id"])
+
+
+def _choice_values(q) -> tuple:
+    """回傳 A–F 六個選項的文字（不存在時為空字串）"""
+    if isinstance(q, Question):
+        return tuple(c if c is not None else "" for c in q.choices)
+    q_choices = q["choices"]
+    return tuple(q_choices.get(key, "") for key in CHOICE_KEYS)
@@ -0,0 +1,270 @@
+# incremental.py - 增量處理模組：改版 PDF 只重新提取變更的頁面、只重新解析受影響的題目
+import difflib
+import gzip
+import json
+import os
+
+from src.cache import processing_settings
+from src.cleaner import iter_clean_pages
+from src.formatter import iter_format_rows
+from src.parser import QuestionParser
+from src.pdf_reader import as_source, extract_pages, page_fingerprints
+from src.question import Question
+
+# 狀態檔格式版本，變更儲存格式時遞增即可讓舊狀態自動失效
+STATE_FORMAT = 1
+
+
+def run_incremental(pdf_bytes, state_path: str, format_output: bool = True, rules=None,
+                    extraction=None) -> dict:
+    """以上一次執行的狀態為基準，增量處理改版後的 PDF
+
+    流程：
+        1. 計算每頁內容串流的雜湊，與狀態檔中的頁面雜湊序列比對（可處理頁面插入與刪除）
+        2. 只重新提取並清洗變更的頁面，其餘頁面沿用狀態檔中的清洗後文字
+        3. 依狀態檔記錄的「題目 → 來源頁」對應，找出與變更頁面重疊的題目，
+           只重新解析這些題目所在的連續頁面範圍；其餘題目直接沿用
+        4. 與上一次的題目比對，產生新增、變更、刪除的差異，並寫回新的狀態檔
+
+    狀態檔不存在、格式不符，或提取設定、清洗規則已變更時，會完整處理一次並建立狀態檔。
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        state_path: 狀態檔路徑（gzip 壓縮的 JSON）
+        format_output: rows 是否為扁平化格式（預設 True）
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        extraction: 提取設定（見 src.pdf_reader.iter_pages()）
+
+    Returns:
+        dict: 包含
+            - rows: 更新後的完整結果（格式同 run_pipeline()）
+            - diff: {"added": [...], "changed": [{"before", "after"}, ...], "removed": [...]}，
+              元素為 Question 紀錄，以 (topic, number) 比對
+            - pages: 總頁數
+            - extracted: 重新提取的頁數
+            - reparsed: 重新解析的頁數
+            - full: 是否為完整處理（沒有可用的先前狀態）
+    """
+    source = as_source(pdf_bytes)
+    settings = processing_settings(rules, extraction)
+    hashes = page_fingerprints(source)
+
+    state = load_state(state_path)
+    full = state is None or state["settings"] != settings
+    old_pages = [] if full else state["pages"]
+    old_questions = [] if full else [
+        (_question_from_state(item), tuple(item["pages"])) for item in state["questions"]
+    ]
+
+    # 1. 比對頁面雜湊序列，建立舊頁碼 → 新頁碼的對應與變更頁集合
+    mapping, changed, seams = _match_pages([page["hash"] for page in old_pages], hashes)
+
+    # 2. 只提取並清洗變更的頁面
+    texts = [None] * len(hashes)
+    carry = [False] * len(hashes)   # 每頁結束時解析器是否仍在處理題目（見 QuestionParser.busy）
+    for old, new in mapping.items():
+        texts[new] = old_pages[old]["text"]
+        carry[new] = old_pages[old]["carry"]
+    extracted = extract_pages(source, changed, extraction)
+    for i, text in zip(extracted, iter_clean_pages(extracted.values(), rules=rules)):
+        texts[i] = text
+
+    # 3. 找出受影響的題目與需要重新解析的頁面，其餘題目沿用
+    spans = [_map_span(span, mapping) for _, span in old_questions]
+    reparse = _close_over(set(changed) | seams, spans, old_questions, mapping)
+    new_questions = _reparse(texts, carry, reparse, spans, old_questions, mapping)
+
+    kept = [(span[0], q, span) for (q, _), span in zip(old_questions, spans)
+            if span is not None and not reparse.intersection(range(span[0], span[1] + 1))]
+    # 沿用的題目與重新解析的題目不會共用頁面，依起始頁排序即可還原原本的順序（sort 為穩定排序）
+    merged = sorted(kept + [(span[0], q, span) for q, span in new_questions], key=lambda item: item[0])
+    questions = [q for _, q, _ in merged]
+
+    save_state(state_path, settings, hashes, texts, carry, [(q, span) for _, q, span in merged])
+
+    return {
+        "rows": list(iter_format_rows(questions)) if format_output else questions,
+        "diff": diff_questions([q for q, _ in old_questions], questions),
+        "pages": len(hashes),
+        "extracted": len(extracted),
+        "reparsed": len(reparse),
+        "full": full,
+    }
+
+
+def diff_questions(old: list, new: list) -> dict:
+    """比對兩次的題目，以 (topic, number) 為鍵（同鍵重複出現時依出現順序配對）
+
+    Returns:
+        dict: {"added": [Question], "changed": [{"before": Question, "after": Question}],
+               "removed": [Question]}
+    """
+    old_by_key = _index_by_key(old)
+    new_by_key = _index_by_key(new)
+
+    added = [q for key, q in new_by_key.items() if key not in old_by_key]
+    removed = [q for key, q in old_by_key.items() if key not in new_by_key]
+    changed = [{"before": old_by_key[key], "after": q} for key, q in new_by_key.items()
+               if key in old_by_key and old_by_key[key] != q]
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def load_state(path: str):
+    """讀取狀態檔，不存在或格式不符時回傳 None"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("format") != STATE_FORMAT:
+        return None
+    return state
+
+
+def save_state(path: str, settings: dict, hashes: list, texts: list, carry: list,
+               questions: list) -> None:
+    """寫入狀態檔（先寫暫存檔再改名，中途失敗不會破壞舊狀態）
+
+    Args:
+        path: 狀態檔路徑
+        settings: 提取與清洗設定
+        hashes: 各頁內容雜湊
+        texts: 各頁清洗後文字
+        carry: 各頁結束時解析器是否仍在處理題目
+        questions: (Question, (first_page, last_page)) 清單
+    """
+    state = {
+        "format": STATE_FORMAT,
+        "settings": settings,
+        "pages": [{"hash": h, "text": t, "carry": c} for h, t, c in zip(hashes, texts, carry)],
+        "questions": [
+            {"topic": q.topic, "number": q.number, "question": q.question,
+             "choices": list(q.choices), "answer": q.answer, "pages": list(span)}
+            for q, span in questions
+        ],
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # json.dumps 走 C 編碼器，比 json.dump 逐段寫入快得多；
+        # 狀態檔每次執行都會整個重寫，使用最快的壓縮等級
+        with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+            f.write(json.dumps(state, ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _question_from_state(item: dict) -> Question:
+    return Question(item["topic"], item["number"], item["question"],
+                    tuple(item["choices"]), item["answer"])
+
+
+def _match_pages(old_hashes: list, new_hashes: list) -> tuple[dict, list]:
+    """比對新舊頁面雜湊序列
+
+    Returns:
+        tuple[dict, list, set]: (舊頁碼 → 新頁碼（內容未變的頁面）, 需要重新提取的新頁碼,
+            因頁面刪除而接在一起、需要重新解析（但不必重新提取）的新頁碼)
+    """
+    mapping = {}
+    changed = set()
+    seams = set()
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            mapping.update(zip(range(i1, i2), range(j1, j2)))
+        else:
+            changed.update(range(j1, j2))
+            if j1 == j2:
+                # 頁面被刪除：前一頁未完成的題目會接上後一頁的內容，兩頁都要重新解析
+                seams.update(p for p in (j1 - 1, j1) if 0 <= p < len(new_hashes))
+    return mapping, sorted(changed), seams
+
+
+def _map_span(span: tuple, mapping: dict):
+    """將舊題目的頁範圍換算成新頁碼；範圍內有頁面變更或不再連續時回傳 None"""
+    first, last = span
+    start = mapping.get(first)
+    if start is None:
+        return None
+    for offset, page in enumerate(range(first, last + 1)):
+        if mapping.get(page) != start + offset:
+            return None
+    return start, start + last - first
+
+
+def _close_over(pages: set, spans: list, old_questions: list, mapping: dict) -> set:
+    """擴充需要重新解析的頁面：與其重疊的舊題目整個範圍都要重新解析，直到不再擴大"""
+    by_page = {}
+    for i, span in enumerate(spans):
+        if span is None:
+            # 範圍內有頁面變更的題目：其餘仍存在的頁面也要重新解析
+            first, last = old_questions[i][1]
+            pages.update(mapping[p] for p in range(first, last + 1) if p in mapping)
+            continue
+        for p in range(span[0], span[1] + 1):
+            by_page.setdefault(p, []).append(span)
+
+    queue = list(pages)
+    while queue:
+        for first, last in by_page.pop(queue.pop(), ()):
+            for p in range(first, last + 1):
+                if p not in pages:
+                    pages.add(p)
+                    queue.append(p)
+    return pages
+
+
+def _reparse(texts: list, carry: list, pages: set, spans: list, old_questions: list,
+             mapping: dict) -> list:
+    """重新解析各段連續頁面（會就地更新 carry 與 pages）
+
+    每段以全新的解析器開始，因此若前一頁結束時解析器仍在處理題目，起點要往前移到
+    解析器閒置的位置。段落結束時若解析器仍有未完成的題目（或未使用的 Topic），
+    就繼續往後解析，並把該頁上的舊題目一併納入，直到解析器回到閒置狀態。
+
+    Returns:
+        list: (Question, (first_page, last_page)) 清單
+    """
+    results = []
+    p = 0
+    while p < len(texts):
+        if p not in pages:
+            p += 1
+            continue
+
+        if p > 0 and carry[p - 1]:
+            while p > 0 and carry[p - 1]:
+                p -= 1
+                pages.add(p)
+            _close_over(pages, spans, old_questions, mapping)
+
+        parser = QuestionParser(track_pages=True)
+        while p < len(texts) and (p in pages or parser.busy):
+            if p not in pages:
+                pages.add(p)
+                _close_over(pages, spans, old_questions, mapping)
+            parser.page = p
+            for line in texts[p].splitlines():
+                parser.feed_line(line)
+            carry[p] = parser.busy
+            results.extend(parser.iter_with_pages())
+            p += 1
+        parser.close()
+        results.extend(parser.iter_with_pages())
+    return results
+
+
+def _index_by_key(questions: list) -> dict:
+    index = {}
+    seen = {}
+    for q in questions:
+        key = (q.topic, q.number)
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        index[key + (n,)] = q
+    return index
@@ -0,0 +1,157 @@
+# instrument.py - 效能量測模組：記錄各處理階段的時間、資料量與記憶體峰值
+import json
+import time
+import tracemalloc
+
+
+class Collector:
+    """各階段效能指標收集器
+
+    以「目前執行中的階段」堆疊計算獨佔時間：串流模式下各階段交錯執行，
+    每次切換時把經過的時間記到堆疊頂端的階段，因此上游階段的時間不會重複算進下游。
+    CPU 時間以 time.process_time() 量測，只包含目前行程（平行提取的 worker 不計入）。
+
+    不傳入 collector 時，流程完全不會包裝任何 generator，關閉時幾乎沒有額外成本。
+
+    Args:
+        memory: 是否以 tracemalloc 記錄各階段的記憶體配置峰值（預設 False；會使執行慢上數倍）
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.stages = {}
+        self._stack = []
+        self._mark_wall = 0.0
+        self._mark_cpu = 0.0
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """開始量測（wrap() / stage() 第一次使用時會自動呼叫）"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        """停止量測，並關閉由本收集器啟動的 tracemalloc"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def add(self, stage: str, **counts) -> None:
+        """累加階段的計數（例如 pages=1、chars_out=1200）"""
+        stats = self._stats(stage)
+        for key, value in counts.items():
+            stats[key] = stats.get(key, 0) + value
+
+    def stage(self, name: str):
+        """以 with 區塊量測一段程式碼"""
+        return _StageContext(self, name)
+
+    def wrap(self, name: str, iterable, count: str = "items_out", size: str | None = None):
+        """包裝 generator，量測每次取值所花的時間並計數產出的項目
+
+        Args:
+            name: 階段名稱
+            iterable: 要包裝的可迭代物件
+            count: 產出項目數的計數鍵
+            size: 若指定，會以 len(item) 累加到此計數鍵（例如 "chars_out"）
+
+        Returns:
+            generator: 原樣轉交項目的 generator
+        """
+        # 先登記階段，讓報告依流程順序排列
+        stats = self._stats(name)
+        stats.setdefault(count, 0)
+        if size:
+            stats.setdefault(size, 0)
+        return self._wrap(name, stats, iter(iterable), count, size)
+
+    def _wrap(self, name: str, stats: dict, it, count: str, size: str | None):
+        while True:
+            self._enter(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                self._exit()
+                return
+            except BaseException:
+                self._exit()
+                raise
+            self._exit()
+
+            stats[count] += 1
+            if size:
+                stats[size] += len(item)
+            yield item
+
+    def report(self) -> dict:
+        """回傳各階段指標與總計
+
+        Returns:
+            dict: {"stages": {name: {...}}, "total": {"wall_s", "cpu_s"}}
+        """
+        stages = {}
+        for name, stats in self.stages.items():
+            entry = dict(stats)
+            if not self.memory:
+                entry.pop("peak_bytes", None)
+            stages[name] = entry
+        return {
+            "stages": stages,
+            "total": {
+                "wall_s": sum(s["wall_s"] for s in self.stages.values()),
+                "cpu_s": sum(s["cpu_s"] for s in self.stages.values()),
+            },
+        }
+
+    def to_json(self, indent: int | None = 2) -> str:
+        """以 JSON 字串回傳 report()"""
+        return json.dumps(self.report(), ensure_ascii=False, indent=indent)
+
+    def _stats(self, name: str) -> dict:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {"wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0}
+        return stats
+
+    def _switch(self) -> None:
+        """把上次切換後經過的時間與記憶體峰值記到目前的階段"""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if self._stack:
+            stats = self.stages[self._stack[-1]]
+            stats["wall_s"] += wall - self._mark_wall
+            stats["cpu_s"] += cpu - self._mark_cpu
+            if self.memory and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak > stats["peak_bytes"]:
+                    stats["peak_bytes"] = peak
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._mark_wall = wall
+        self._mark_cpu = cpu
+
+    def _enter(self, name: str) -> None:
+        if not self._stack:
+            self.start()
+        self._switch()
+        self._stack.append(name)
+
+    def _exit(self) -> None:
+        self._switch()
+        self._stack.pop()
+
+
+class _StageContext:
+    def __init__(self, collector: Collector, name: str):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self):
+        self.collector._stats(self.name)
+        self.collector._enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.collector._exit()
+        return False
@@ -0,0 +1,223 @@
+# jobs.py - 可續跑的工作模式：將大型 PDF 分段處理，每段完成後寫入檢查點，失敗的頁面隔離而不中斷
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+from src.cache import processing_settings
+from src.cleaner import iter_clean_pages
+from src.formatter import iter_format_rows
+from src.parser import QuestionParser
+from src.pdf_reader import as_source, count_pages, iter_page_range
+from src.question import Question
+
+# 檢查點格式版本，變更儲存格式時遞增即可讓舊檢查點自動失效
+JOB_FORMAT = 2
+DEFAULT_CHUNK_PAGES = 200
+
+_MANIFEST = "manifest.json"
+
+
+def run_job(pdf_bytes, checkpoint_dir: str, chunk_pages: int = DEFAULT_CHUNK_PAGES,
+            format_output: bool = True, rules=None, on_chunk=None, extraction=None) -> dict:
+    """分段處理 PDF，每段完成後寫入檢查點；中斷後再次執行會從最後完成的段落繼續
+
+    每段（chunk_pages 頁）依序提取、清洗、解析，完成時將該段的提取文字、解析出的題目、
+    隔離頁面與段落結束時的解析器狀態寫入 checkpoint_dir。題目可能跨段，
+    下一段會從上一段保存的解析器狀態繼續，因此結果與 run_pipeline() 相同
+    （隔離的頁面視為空白頁）。
+
+    單頁提取失敗時該頁被隔離（記錄頁碼與錯誤）並視為空白頁，不會中斷整個工作。
+    若行程在某段中途被終止（例如記憶體不足），重新執行時會改為逐頁記錄進度，
+    再次在同一頁中斷時，該頁會在下一次執行時被隔離。
+
+    PDF 內容、提取設定、清洗規則或 chunk_pages 與檢查點不符時，會清除舊檢查點重新開始。
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        checkpoint_dir: 檢查點目錄
+        chunk_pages: 每段的頁數
+        format_output: rows 是否為扁平化格式（預設 True）
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        on_chunk: 每段完成（或從檢查點載入）時呼叫的回呼函式，參數為段落摘要
+            {"chunk", "start", "end", "questions", "quarantined", "resumed"}
+        extraction: 提取設定（見 src.pdf_reader.iter_pages()）
+
+    Returns:
+        dict: 包含
+            - rows: 完整結果（格式同 run_pipeline()）
+            - pages: 總頁數
+            - chunks: 段落數
+            - resumed: 從檢查點載入（未重新處理）的段落數
+            - quarantine: 隔離頁面清單 [{"page", "error"}]
+    """
+    if chunk_pages < 1:
+        raise ValueError(f"chunk_pages 必須為正整數：{chunk_pages}")
+
+    source = as_source(pdf_bytes)
+    pages = count_pages(source)
+    manifest = {
+        "format": JOB_FORMAT,
+        "pdf": _fingerprint(source),
+        "pages": pages,
+        "chunk_pages": chunk_pages,
+        "settings": processing_settings(rules, extraction),
+    }
+    _prepare(checkpoint_dir, manifest)
+
+    parser = QuestionParser()
+    questions = []
+    quarantine = []
+    resumed = 0
+    starts = range(0, pages, chunk_pages)
+
+    for index, start in enumerate(starts):
+        end = min(start + chunk_pages, pages)
+        chunk = _load_chunk(checkpoint_dir, index)
+        loaded = chunk is not None
+        if loaded:
+            resumed += 1
+        else:
+            chunk = _process_chunk(source, checkpoint_dir, index, start, end, parser, rules,
+                                   extraction)
+        parser.set_state(chunk["parser"])
+        questions.extend(Question.from_dict(item) for item in chunk["questions"])
+        quarantine.extend(chunk["quarantine"])
+
+        if on_chunk is not None:
+            on_chunk({"chunk": index, "start": start, "end": end,
+                      "questions": len(chunk["questions"]),
+                      "quarantined": len(chunk["quarantine"]),
+                      "resumed": loaded})
+
+    # 最後一題沒有後續的 Question 行，需在結尾完成
+    parser.close()
+    questions.extend(parser)
+
+    return {
+        "rows": list(iter_format_rows(questions)) if format_output else questions,
+        "pages": pages,
+        "chunks": len(starts),
+        "resumed": resumed,
+        "quarantine": quarantine,
+    }
+
+
+def _process_chunk(source, checkpoint_dir: str, index: int, start: int, end: int,
+                   parser: QuestionParser, rules, extraction) -> dict:
+    """提取、清洗並解析一段頁面，寫入檢查點後回傳段落內容
+
+    parser 為上一段結束時的狀態，處理完成後停在本段結束時的狀態。
+    """
+    attempt_path = os.path.join(checkpoint_dir, f"chunk-{index:05d}.attempt")
+    attempt = _read_json(attempt_path) or {"attempts": 0, "page": None}
+    # 上一次執行在逐頁模式下於此頁中斷：這一頁直接隔離
+    crashed_page = attempt["page"]
+    attempt["attempts"] += 1
+    careful = attempt["attempts"] > 1
+    attempt["page"] = None
+    _write_json(attempt_path, attempt)
+
+    texts = []
+    quarantine = []
+    for page, text, error in _extract(source, start, end, careful, crashed_page, attempt, attempt_path,
+                                      extraction):
+        if error is not None:
+            quarantine.append({"page": page, "error": error})
+            text = ""
+        texts.append(text)
+
+    questions = []
+    for page, cleaned in enumerate(iter_clean_pages(texts, rules=rules), start):
+        parser.page = page
+        for line in cleaned.splitlines():
+            parser.feed_line(line)
+        questions.extend(parser)
+
+    chunk = {
+        "start": start,
+        "end": end,
+        "texts": texts,
+        "questions": [q.to_dict() for q in questions],
+        "quarantine": quarantine,
+        "parser": parser.get_state(),
+    }
+    _write_gzip_json(_chunk_path(checkpoint_dir, index), chunk)
+    os.remove(attempt_path)
+    return chunk
+
+
+def _extract(source, start: int, end: int, careful: bool, crashed_page, attempt: dict,
+             attempt_path: str, extraction):
+    """逐頁提取；careful 模式下每頁提取前先記錄頁碼，行程中斷時可得知是哪一頁"""
+    if not careful:
+        yield from iter_page_range(source, start, end, extraction=extraction)
+        return
+
+    for page in range(start, end):
+        if page == crashed_page:
+            yield page, None, "上一次處理此頁時行程中斷"
+            continue
+        attempt["page"] = page
+        _write_json(attempt_path, attempt)
+        yield from iter_page_range(source, page, page + 1, extraction=extraction)
+
+
+def _prepare(checkpoint_dir: str, manifest: dict) -> None:
+    """建立檢查點目錄；既有檢查點與本次工作不符時清除重來"""
+    path = os.path.join(checkpoint_dir, _MANIFEST)
+    if _read_json(path) == manifest:
+        return
+    if os.path.isdir(checkpoint_dir):
+        for entry in os.scandir(checkpoint_dir):
+            if entry.name == _MANIFEST or entry.name.startswith("chunk-"):
+                if entry.is_dir():
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _write_json(path, manifest)
+
+
+def _fingerprint(source) -> str:
+    """PDF 內容的 sha256（檔案路徑以串流方式雜湊）"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+def _chunk_path(checkpoint_dir: str, index: int) -> str:
+    return os.path.join(checkpoint_dir, f"chunk-{index:05d}.json.gz")
+
+
+def _load_chunk(checkpoint_dir: str, index: int):
+    try:
+        with gzip.open(_chunk_path(checkpoint_dir, index), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: str, data) -> None:
+    """先寫暫存檔再改名，中途失敗不會留下不完整的檔案"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _write_gzip_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+        f.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    os.replace(tmp_path, path)
@@ -1,102 +1,452 @@
 # parser.py - 文字解析模組：將清洗後的文字解析成結構化題目
 import re
+from collections import deque
 
-def parse_questions(cleaned_text: str) -> list:
+from src.question import CHOICE_INDEX, LazyQuestion, Question
+from src.textbuffer import PageBuffer
+
+# 行分類標籤
+TOPIC = "TOPIC"
+QUESTION = "QUESTION"
+ANSWER = "ANSWER"
+OPTION = "OPTION"
+TEXT = "TEXT"
+
+# 單一預先編譯的交替式樣，一次 match 即可判斷行的類型；
+# 各分支以最後結束的命名群組（lastgroup）區分
+_LINE_PATTERN = re.compile(
+    r"Topic\s*(?P<topic>\d+)"
+    r"|Question\s*#\s*(?P<number>\d+)"
+    r"|Correct Answer\s*:?\s*(?P<answer>[A-F]+)"
+    r"|(?P<key>[A-F])\.\s+(?P<text>.*)"
+)
+_KIND_BY_GROUP = {"topic": TOPIC, "number": QUESTION, "answer": ANSWER, "text": OPTION}
+# 平行解析的切點：Question 行的行首（只用於僅以 \n 斷行的文字，行內空白不可跨行）
+_SHARD_CUT = re.compile(r"^[^\S\n]*Question[^\S\n]*#[^\S\n]*\d", re.MULTILINE)
+# 平行解析時每個分片的最小字元數，文字較短時行程池的啟動成本不划算，直接單行程解析
+MIN_SHARD_SIZE = 1 << 20
+# 只有以這些字元開頭的行才可能不是一般文字，其餘行直接略過正規表示式
+_MARKER_CHARS = frozenset("TQCABDEF")
+
+# QuestionParser.get_state() 匯出的欄位（已完成的題目與 track_pages 設定除外）
+_STATE_FIELDS = (
+    "_partial", "page", "_pending_topic_page", "_first_page", "_last_page",
+    "_current_number", "_current_topic", "_question", "_choices", "_answer",
+    "_collecting_question", "_collecting_choices", "_pending_topic", "_last_key",
+)
+
+
+def parse_questions(cleaned_text, as_dict: bool = False, workers: int | None = None,
+                    shard_size: int | None = None) -> list:
     """解析清洗後的文字，提取題目、選項與答案
-    
+
+    題目與選項只記錄在文字中的位移範圍，文字在讀取欄位時才組出（見 LazyQuestion）。
+
+    平行模式下文字在 Question 行的行首切成分片，交給行程池分別解析後依序合併，
+    結果與單行程解析相同。
+
     Args:
-        cleaned_text: 已清洗的文字內容
-    
+        cleaned_text: 已清洗的文字內容（str 或 PageBuffer；PageBuffer 的題目帶有來源頁範圍 pages）
+        as_dict: 是否回傳舊格式的 dict（預設回傳 Question 紀錄）
+        workers: 平行解析的行程數（None 或 1 表示單行程解析）
+        shard_size: 平行模式下每個分片的約略字元數（None 表示自動計算，至少 MIN_SHARD_SIZE）
+
     Returns:
-        list[dict]: 題目列表，每題包含：
-            - id: 題目編號（如 "Topic 1 Question #1"）
+        list[Question]: 題目列表（as_dict=True 時為 list[dict]），每題包含：
+            - topic / number: 主題與題目編號（int；NaN 主題為 None，僅 Question 紀錄）
+            - id: 題目編號（如 "Topic 1 Question #1"，Question 紀錄由 topic / number 推導）
             - question: 題目文字
-            - choices: 選項字典 {'A': '選項內容', 'B': ...}
+            - choices: 選項（Question 為 A–F 六格 tuple；dict 為 {'A': '選項內容', ...}）
             - answer: 正確答案（如 'A'）
     """
-    lines = cleaned_text.splitlines()
+    buffer = cleaned_text if isinstance(cleaned_text, PageBuffer) else PageBuffer(cleaned_text)
+    shards = _shard_bounds(buffer, workers, shard_size) if workers and workers > 1 else []
+    if len(shards) > 1:
+        questions = _parse_shards(buffer, shards, workers)
+    else:
+        parser = QuestionParser()
+        parser.feed_buffer(buffer)
+        parser.close()
+        questions = list(parser)
+    if as_dict:
+        return [q.to_dict() for q in questions]
+    return questions
 
-    questions = []  # 儲存所有解析出的題目
-    current = None  # 目前正在處理的題目
 
-    # 狀態變數
-    collecting_question = False  # 是否正在收集題目文字
-    collecting_choices = False   # 是否正在收集選項
-    pending_topic = None         # 待處理的 Topic 編號
-    last_key = None              # 最後一個選項的標籤（用於跨行合併）
-    ignore_until_next_question = False  # 遇到 Correct Answer 後忽略後續內容
+def iter_questions(lines):
+    """逐行解析題目（串流模式），每完成一題就立即產出
 
+    Args:
+        lines: 可迭代的文字行（可跨頁連續提供）
+
+    Yields:
+        Question: 題目紀錄，格式同 parse_questions()
+    """
+    parser = QuestionParser()
     for line in lines:
+        parser.feed_line(line)
+        yield from parser
+    parser.close()
+    yield from parser
+
+
+def classify_line(line: str) -> tuple:
+    """判斷一行（已去除前後空白）的類型
+
+    Args:
+        line: 文字行
+
+    Returns:
+        tuple: (kind, match)，kind 為 TOPIC / QUESTION / ANSWER / OPTION / TEXT，
+            TEXT 時 match 為 None
+    """
+    if line[:1] in _MARKER_CHARS:
+        m = _LINE_PATTERN.match(line)
+        if m:
+            return _KIND_BY_GROUP[m.lastgroup], m
+    return TEXT, None
+
+
+class QuestionParser:
+    """增量式（push-based）題目解析器
+
+    解析狀態保存在物件中，因此可以跨頁、跨任意文字區塊持續餵入。
+    題目在讀到 Correct Answer 行時就會完成並可被取出，其餘題目在下一個
+    Question 行出現或呼叫 close() 時完成。
+
+    使用方式：
+        parser = QuestionParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+            for q in parser:      # 取出目前已完成的題目
+                ...
+        parser.close()
+        remaining = list(parser)
+
+    Args:
+        track_pages: 是否記錄每題的來源頁範圍（呼叫端在餵入每頁前設定 parser.page，
+            以 iter_with_pages() 取出題目與頁範圍）
+    """
+
+    def __init__(self, track_pages: bool = False):
+        self._ready = deque()   # 已完成、等待取出的題目
+        self._partial = ""      # feed() 中尚未遇到換行的行尾片段
+
+        # 來源頁追蹤：題目範圍從 Topic 行（若有）或 Question 行所在頁，到最後一行內容所在頁
+        self.page = 0
+        self._track_pages = track_pages
+        self._ready_pages = deque()
+        self._pending_topic_page = None
+        self._first_page = None
+        self._last_page = None
+
+        # 目前正在處理的題目（None 表示尚未遇到題目，或已讀到 Correct Answer）
+        self._current_number = None
+        self._current_topic = None
+        # 題目與選項以「行」為單位累積，完成時才接合；餵入 PageBuffer 時改為記錄位移範圍
+        # [start, end, start, end, ...]，相鄰的行合併成同一個範圍
+        self._question = []
+        self._choices = None    # 六格選項 list，每格為該選項各行的 list（不存在為 None）
+        self._answer = ""
+        self._buffer = None     # feed_buffer() 的緩衝區（None 表示逐行餵入字串）
+        self._start = None      # 目前題目在緩衝區中的起訖位移
+        self._end = None
+        self._pending_topic_start = None
+
+        # 狀態變數
+        self._collecting_question = False  # 是否正在收集題目文字
+        self._collecting_choices = False   # 是否正在收集選項
+        self._pending_topic = None         # 待處理的 Topic 編號（int；None 表示尚未出現）
+        self._last_key = None              # 最後一個選項的位置（用於跨行合併）
+
+    def feed(self, chunk: str) -> None:
+        """餵入一段文字（可包含多行）
+
+        區塊結尾若不是換行，最後的不完整行會暫存，與下一次 feed() 的內容接續。
+
+        Args:
+            chunk: 文字區塊
+        """
+        if self._partial:
+            chunk = self._partial + chunk
+            self._partial = ""
+
+        lines = chunk.splitlines(keepends=True)
+        if lines and lines[-1].splitlines()[0] == lines[-1]:
+            # 最後一行沒有換行字元，留待下次接續
+            self._partial = lines.pop()
+
+        feed = self._feed
+        for line in lines:
+            line = line.strip()
+            if line:
+                feed(line, 0)
+
+    def feed_buffer(self, buffer: PageBuffer, start: int = 0, end: int | None = None) -> None:
+        """餵入文字緩衝區（或其中的一段）
+
+        題目與選項只記錄在緩衝區中的位移範圍，完成的題目為 LazyQuestion：
+        文字在讀取欄位時才組出，來源頁範圍由位移推得。餵入緩衝區後不可再以 feed() /
+        feed_line() 餵入字串，也不可 get_state()。
+
+        Args:
+            buffer: 文字緩衝區（src.textbuffer.PageBuffer）
+            start: 起始位移（須為行首）
+            end: 結束位移（須為行首或文字結尾；None 表示到文字結尾）
+        """
+        self._buffer = buffer
+        feed = self._feed
+        if not buffer.simple_lines:
+            for line, offset in buffer.iter_lines(start, end):
+                feed(line, offset)
+            return
+
+        # 只以 \n 斷行時直接切行並累計位移（同 iter_lines()，省去每行一次 generator 往返）
+        offset = start
+        for line in buffer.text[start:end].split("\n"):
+            stripped = line.strip()
+            if stripped:
+                feed(stripped, offset if stripped is line else offset + line.find(stripped))
+            offset += len(line) + 1
+
+    def feed_line(self, line: str) -> None:
+        """餵入一行完整的文字（行尾換行字元可有可無）"""
         line = line.strip()
-        if not line:
-            continue
+        if line:
+            self._feed(line, 0)
+
+    def _feed(self, line: str, offset: int) -> None:
+        """處理一行已去除前後空白的非空白文字（offset 為該行在緩衝區中的起始位移）
+
+        題目與選項的每一行在逐行模式下保存字串；緩衝區模式下只保存位移範圍，
+        與上一個範圍只隔一個換行字元的行直接延伸該範圍（見 PageBuffer.join_lines()）。
+        """
+        # 同 classify_line()，內嵌以省去每行一次函式呼叫
+        m = None
+        if line[:1] in _MARKER_CHARS:
+            m = _LINE_PATTERN.match(line)
+        kind = _KIND_BY_GROUP[m.lastgroup] if m else TEXT
 
         # 偵測 Topic X（主題編號）
-        t = re.match(r"^Topic\s*(\d+)", line)
-        if t:
-            pending_topic = f"Topic {t.group(1)}"
-            continue
+        if kind is TOPIC:
+            self._pending_topic = int(m.group("topic"))
+            self._pending_topic_page = self.page
+            self._pending_topic_start = offset
+            return
 
         # 偵測 Question #Y（題目編號）
-        q = re.match(r"^Question\s*#\s*(\d+)", line)
-        if q:
-            if current:
-                questions.append(current)
-
-            if pending_topic is None:
-                pending_topic = "Topic NaN"
-
-            current = {
-                "id": f"{pending_topic} Question #{q.group(1)}",
-                "question": "",
-                "choices": {},
-                "answer": ""
-            }
-
-            pending_topic = None
-            collecting_question = True
-            collecting_choices = False
-            ignore_until_next_question = False
-            last_key = None
-            continue
-
-        if not current:
-            continue
-
-        # Correct Answer
-        ans = re.match(r"^Correct Answer\s*:?\s*([A-F]+)", line)
-        if ans:
-            current["answer"] = ans.group(1)
-            collecting_question = False
-            collecting_choices = False
-            ignore_until_next_question = True
-            last_key = None
-            continue
-
-        # Correct Answer 後全部忽略
-        if ignore_until_next_question:
-            continue
+        if kind is QUESTION:
+            self._finish()
+
+            # 沒有前置 Topic 行的題目屬於 NaN 主題（topic 為 None）
+            self._current_topic = self._pending_topic
+            self._first_page = self.page if self._pending_topic is None else self._pending_topic_page
+            self._last_page = self.page
+            self._start = offset if self._pending_topic is None else self._pending_topic_start
+            self._end = offset + len(line)
+            self._current_number = int(m.group("number"))
+            self._question = []
+            self._choices = [None] * 6
+            self._answer = ""
+
+            self._pending_topic = None
+            self._collecting_question = True
+            self._collecting_choices = False
+            self._last_key = None
+            return
+
+        # 尚未遇到題目，或 Correct Answer 後的內容全部忽略
+        if self._current_number is None:
+            return
+
+        # 以下各行都屬於目前的題目
+        self._last_page = self.page
+        self._end = offset + len(line)
+
+        # Correct Answer：題目已完整，立即輸出
+        if kind is ANSWER:
+            self._answer = m.group("answer")
+            self._finish()
+            return
 
         # 選項 A–F
-        opt = re.match(r"^([A-F])\.\s+(.*)", line)
-        if opt and collecting_question:
-            clean_choice = re.sub(r"\s*Most Voted.*$", "", opt.group(2)).strip()
-            last_key = opt.group(1)
-            current["choices"][last_key] = clean_choice
-            collecting_choices = True
-            continue
-
-        # 跨行選項
-        if collecting_choices and last_key and not re.match(r"^[A-F]\.\s+", line):
-            current["choices"][last_key] += " " + line
-            continue
-
-        # 跨行題目
-        if collecting_question and not collecting_choices:
-            current["question"] += line + " "
-            continue
-
-    if current:
-        questions.append(current)
+        if kind is OPTION:
+            # \s+ 已吃掉選項文字前的空白，行尾空白也已去除；
+            # 只需截掉第一個 Most Voted 標記（連同其前的空白）及其後的內容
+            start = m.start("text")
+            end = line.find("Most Voted", start)
+            if end < 0:
+                end = len(line)
+            else:
+                end = start + len(line[start:end].rstrip())
+            self._last_key = CHOICE_INDEX[m.group("key")]
+            if self._buffer is None:
+                self._choices[self._last_key] = [line[start:end]]
+            else:
+                self._choices[self._last_key] = [offset + start, offset + end]
+            self._collecting_choices = True
+            return
+
+        # 跨行選項與跨行題目
+        if self._collecting_choices:
+            pieces = self._choices[self._last_key]
+        elif self._collecting_question:
+            pieces = self._question
+        else:
+            return
+        if self._buffer is None:
+            pieces.append(line)
+        elif pieces and pieces[-1] + 1 == offset:
+            pieces[-1] = offset + len(line)
+        else:
+            pieces += (offset, offset + len(line))
+
+    def close(self) -> None:
+        """結束輸入：處理暫存的不完整行，並完成最後一題"""
+        if self._partial:
+            partial, self._partial = self._partial, ""
+            self.feed_line(partial)
+        self._finish()
+
+    @property
+    def busy(self) -> bool:
+        """是否有尚未完成的題目或尚未使用的 Topic（此時後續的行仍會影響結果）"""
+        return self._current_number is not None or self._pending_topic is not None
+
+    def get_state(self) -> dict:
+        """匯出解析狀態（可 JSON 序列化），供中斷後以 set_state() 從同一位置繼續解析
+
+        已完成的題目不包含在狀態中，必須先全部取出。
+
+        Returns:
+            dict: 解析狀態
+        """
+        if self._buffer is not None:
+            raise ValueError("餵入 PageBuffer 的解析器無法匯出狀態")
+        if self._ready:
+            raise ValueError("匯出狀態前必須先取出所有已完成的題目")
+        return {name: getattr(self, name) for name in _STATE_FIELDS}
+
+    def set_state(self, state: dict) -> None:
+        """還原 get_state() 匯出的解析狀態（已完成、尚未取出的題目會被捨棄）"""
+        for name in _STATE_FIELDS:
+            value = state[name]
+            setattr(self, name, list(value) if name == "_choices" and value is not None else value)
+        self._ready.clear()
+        self._ready_pages.clear()
+
+    def __iter__(self):
+        """依序取出目前已完成的題目（取出後即從解析器移除）"""
+        while self._ready:
+            yield self._ready.popleft()
+            if self._track_pages:
+                self._ready_pages.popleft()
+
+    def iter_with_pages(self):
+        """同 __iter__，但一併產出來源頁範圍（需以 track_pages=True 建立）
+
+        Yields:
+            tuple: (Question, (first_page, last_page))
+        """
+        while self._ready:
+            yield self._ready.popleft(), self._ready_pages.popleft()
 
+    def _finish(self) -> None:
+        """完成目前的題目並放入輸出佇列"""
+        if self._current_number is not None:
+            if self._buffer is None:
+                lines = self._question
+                question = Question(
+                    self._current_topic, self._current_number,
+                    " ".join(lines) + " " if lines else "",
+                    tuple([c if c is None else " ".join(c) for c in self._choices]),
+                    self._answer,
+                )
+            else:
+                # 每題都會重新建立範圍 list，直接交給 LazyQuestion 保存，不另外複製
+                question = LazyQuestion(
+                    self._buffer, self._current_topic, self._current_number, self._question,
+                    self._choices, self._answer, self._start, self._end,
+                )
+            self._ready.append(question)
+            if self._track_pages:
+                self._ready_pages.append((self._first_page, self._last_page))
+        self._current_number = None
+        self._collecting_question = False
+        self._collecting_choices = False
+        self._last_key = None
+
+
+def _shard_bounds(buffer: PageBuffer, workers: int, shard_size: int | None) -> list:
+    """在 Question 行的行首切分文字，回傳各分片的 (start, end) 位移
+
+    每個分片（第一個除外）都從一行 Question 開始，因此分片結尾的未完成題目
+    與單行程解析時一樣，會在下一個 Question 行（即分片結尾）完成。
+    含有 \n 以外斷行字元的文字不切分（回傳空 list）。
+    """
+    text = buffer.text
+    if not buffer.simple_lines:
+        return []
+    if not shard_size or shard_size < 1:
+        # 預設讓每個 worker 約分到 4 個分片，兼顧負載平衡與排程成本
+        shard_size = max(MIN_SHARD_SIZE, -(-len(text) // (workers * 4)))
+
+    cuts = [0]
+    target = shard_size
+    while target < len(text):
+        m = _SHARD_CUT.search(text, target)
+        if m is None:
+            break
+        cuts.append(m.start())
+        target = m.start() + shard_size
+    cuts.append(len(text))
+    return list(zip(cuts, cuts[1:]))
+
+
+def _parse_shards(buffer: PageBuffer, shards: list, workers: int) -> list:
+    """以行程池平行解析各分片，依序合併成與單行程解析相同的 LazyQuestion 列表
+
+    worker 只回傳題目的位移範圍（不組出文字），由主行程對同一個緩衝區建立 LazyQuestion。
+    分片結尾尚未被 Question 行使用的 Topic 屬於下一個分片的第一題，合併時補上。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    questions = []
+    pending = None
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker,
+                             initargs=(buffer.text,)) as pool:
+        for records, next_pending in pool.map(_parse_shard, *zip(*shards)):
+            if pending is not None:
+                topic, number, spans, choice_spans, answer, _, end = records[0]
+                records[0] = (pending[0], number, spans, choice_spans, answer, pending[1], end)
+            questions.extend(LazyQuestion(buffer, *record) for record in records)
+            pending = next_pending
     return questions
+
+
+# 平行解析時，每個 worker 行程各自持有的文字緩衝區
+_worker_buffer = None
+
+
+def _init_worker(text: str) -> None:
+    """worker 行程初始化：建立整份文字的緩衝區（fork 模式下與主行程共用記憶體）"""
+    global _worker_buffer
+    _worker_buffer = PageBuffer(text)
+
+
+def _parse_shard(start: int, end: int) -> tuple:
+    """在 worker 行程中解析 [start, end) 分片
+
+    Returns:
+        tuple: (題目紀錄 list, 分片結尾待處理的 (Topic 編號, 位移) 或 None)，
+            題目紀錄為 LazyQuestion 的建構參數（不含緩衝區）
+    """
+    parser = QuestionParser()
+    parser.feed_buffer(_worker_buffer, start, end)
+    pending = None
+    if parser._pending_topic is not None:
+        pending = (parser._pending_topic, parser._pending_topic_start)
+    parser.close()
+    records = [(q.topic, q.number, q._spans, q._choice_spans, q.answer, q._start, q._end)
+               for q in parser]
+    return records, pending
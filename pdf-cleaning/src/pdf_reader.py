@@ -1,24 +1,408 @@
 # pdf_reader.py - PDF 讀取模組：從 PDF 檔案中提取原始文字
-import fitz  # PyMuPDF 套件
+import hashlib
 import io
+import mmap
+import os
+import sys
+from collections import deque
 
-def read_pdf(pdf_bytes: io.BytesIO) -> str:
-    """從 PDF 二進位流中提取所有頁面的文字內容
+# PyMuPDF（fitz）與行程池只在實際開啟 PDF 時才匯入：匯入 fitz 約需 0.1 秒以上，
+# 只處理文字輸入或快取命中時完全不必載入
+
+# 文字輸入的副檔名；"-" 表示標準輸入
+TEXT_EXTENSIONS = (".txt",)
+# 文字輸入的分頁字元（與 pdftotext 的輸出相同），沒有分頁字元時整份視為一頁
+PAGE_SEPARATOR = "\f"
+
+# 平行模式下，每個 worker 行程各自持有的 PDF 來源、提取設定與已開啟的文件
+_worker_source = None
+_worker_extraction = None
+_worker_doc = None
+
+
+class ExtractionProfile:
+    """PyMuPDF 文字提取設定
+
+    旗標以 PyMuPDF 的 TEXT_* 常數名稱指定，在實際提取時才解析（不必為此匯入 fitz）。
+    clip 以頁面寬高的比例表示，同一設定可套用到不同尺寸的頁面，
+    例如 (0, 0.06, 1, 0.94) 略過頁面上下各 6% 的區域（見 with_margins()）。
+
+    Args:
+        name: 設定名稱
+        flags: TEXT_* 旗標名稱的序列（如 ("TEXT_MEDIABOX_CLIP",)），None 表示 PyMuPDF 的預設旗標
+        clip: 只提取頁面中的區域 (x0, y0, x1, y1)（頁面寬高的比例，0–1），None 表示整頁
+        mode: "text"（逐行文字）或 "blocks"（依文字區塊提取後接合，略過圖片區塊）
+    """
+
+    def __init__(self, name: str, flags=None, clip=None, mode: str = "text"):
+        if mode not in ("text", "blocks"):
+            raise ValueError(f"不支援的提取模式：{mode}")
+        self.name = name
+        self.flags = None if flags is None else tuple(flags)
+        self.clip = None if clip is None else tuple(clip)
+        self.mode = mode
+
+    def settings(self) -> dict:
+        """回傳影響提取結果的設定（可 JSON 序列化，用於快取鍵）"""
+        return {
+            "name": self.name,
+            "flags": None if self.flags is None else list(self.flags),
+            "clip": None if self.clip is None else list(self.clip),
+            "mode": self.mode,
+        }
+
+    def extract(self, page) -> str:
+        """提取單頁文字
+
+        Args:
+            page: PyMuPDF 的頁面物件
+
+        Returns:
+            str: 頁面文字
+        """
+        kwargs = {}
+        if self.flags is not None:
+            import fitz
+
+            flags = 0
+            for name in self.flags:
+                flags |= getattr(fitz, name)   # 部分名稱是同一個位元的別名，不能直接相加
+            kwargs["flags"] = flags
+        if self.clip is not None:
+            import fitz
+
+            rect = page.rect
+            x0, y0, x1, y1 = self.clip
+            kwargs["clip"] = fitz.Rect(rect.x0 + rect.width * x0, rect.y0 + rect.height * y0,
+                                       rect.x0 + rect.width * x1, rect.y0 + rect.height * y1)
+        if self.mode == "blocks":
+            # 區塊為 (x0, y0, x1, y1, 文字, 區塊編號, 類型)，類型 0 為文字區塊
+            return "".join(block[4] if block[4].endswith("\n") else block[4] + "\n"
+                           for block in page.get_text("blocks", **kwargs) if block[6] == 0)
+        return page.get_text(**kwargs)
+
+
+DEFAULT_EXTRACTION = ExtractionProfile("default")
+
+# 具名的提取設定（run.py --extraction）；每個設定解析出的題目都必須與預設設定相同，
+# 會改變內容的設定（例如 clip）只能由使用者明確指定
+EXTRACTION_PROFILES = {
+    profile.name: profile
+    for profile in (
+        DEFAULT_EXTRACTION,
+        # 依文字區塊提取，不輸出圖片區塊
+        ExtractionProfile("blocks", mode="blocks"),
+    )
+}
+
+
+def with_margins(extraction, top: float, bottom: float) -> ExtractionProfile:
+    """回傳略過頁面上下邊界區域（頁首、頁尾）的提取設定
+
+    邊界內的文字會整段遺失，只適用於頁首、頁尾與內文明確分開的 PDF。
+
+    Args:
+        extraction: 作為基礎的提取設定（見 get_extraction()）
+        top: 略過的頁面上方高度（頁面高度的比例，0–1）
+        bottom: 略過的頁面下方高度（頁面高度的比例，0–1）
+
+    Returns:
+        ExtractionProfile: 旗標與模式同基礎設定、加上 clip 的新設定
+    """
+    base = get_extraction(extraction)
+    if not (0 <= top and 0 <= bottom and top + bottom < 1):
+        raise ValueError(f"頁面邊界必須介於 0 與 1 之間且合計小於 1：{top}, {bottom}")
+    return ExtractionProfile(f"{base.name}+margins", flags=base.flags,
+                             clip=(0, top, 1, 1 - bottom), mode=base.mode)
+
+
+def get_extraction(extraction=None) -> ExtractionProfile:
+    """取得提取設定
+
+    Args:
+        extraction: ExtractionProfile、EXTRACTION_PROFILES 中的名稱，或 None（預設設定）
+
+    Returns:
+        ExtractionProfile: 提取設定
+    """
+    if extraction is None:
+        return DEFAULT_EXTRACTION
+    if isinstance(extraction, ExtractionProfile):
+        return extraction
+    try:
+        return EXTRACTION_PROFILES[extraction]
+    except KeyError:
+        raise ValueError(f"未知的提取設定：{extraction}（可用：{', '.join(EXTRACTION_PROFILES)}）") from None
+
+
+def iter_pages(pdf_bytes, workers: int | None = None, chunk_size: int | None = None,
+               extraction=None):
+    """逐頁產生 PDF 的文字內容（串流模式）
+
+    每次只持有一頁的文字，適合處理大型 PDF。
+
+    Args:
+        pdf_bytes: PDF 來源，可為檔案路徑（str / PathLike，由 PyMuPDF 直接開啟）、
+            io.BytesIO、bytes、memoryview 或 mmap（皆不另外複製資料）；
+            .txt 路徑或 "-"（標準輸入）則視為已提取的文字，見 iter_text_pages()
+        workers: 平行提取的行程數（None 或 1 表示單行程逐頁提取）
+        chunk_size: 平行模式下每個工作分配的頁數（None 表示自動計算）
+        extraction: 提取設定（ExtractionProfile 或 EXTRACTION_PROFILES 中的名稱，None 表示預設；
+            文字輸入不適用）
+
+    Yields:
+        str: 單頁的原始文字（空白頁為空字串，保留頁序）
+    """
+    extraction = get_extraction(extraction)
+    if is_text_input(pdf_bytes):
+        yield from iter_text_pages(pdf_bytes)
+        return
+
+    source = as_source(pdf_bytes)
+
+    if workers and workers > 1:
+        yield from _iter_pages_parallel(source, workers, chunk_size, extraction)
+        return
+
+    # 使用 PyMuPDF (fitz) 開啟 PDF 文件
+    doc = _open_document(source)
+    try:
+        # 逐頁提取文字
+        for page in doc:
+            yield extraction.extract(page)
+    finally:
+        doc.close()
+
+
+def read_pdf(pdf_bytes, workers: int | None = None, chunk_size: int | None = None,
+             extraction=None) -> str:
+    """從 PDF 中提取所有頁面的文字內容
     
     Args:
-        pdf_bytes: PDF 檔案的二進位流 (io.BytesIO)
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        workers: 平行提取的行程數（None 或 1 表示單行程逐頁提取）
+        chunk_size: 平行模式下每個工作分配的頁數（None 表示自動計算）
+        extraction: 提取設定（見 iter_pages()）
     
     Returns:
         str: 提取出的原始文字內容（包含所有頁面）
     """
-    # 使用 PyMuPDF (fitz) 開啟 PDF 文件
-    doc = fitz.open(stream=pdf_bytes.read(), filetype="pdf")
+    pages = iter_pages(pdf_bytes, workers=workers, chunk_size=chunk_size, extraction=extraction)
+    return "".join(text + "\n" for text in pages if text)
+
+
+def count_pages(pdf_bytes) -> int:
+    """回傳 PDF 的頁數（不提取文字）
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+
+    Returns:
+        int: 頁數（文字輸入為分頁字元分隔的頁數）
+    """
+    if is_text_input(pdf_bytes):
+        return sum(1 for _ in iter_text_pages(pdf_bytes))
+    return _count_pages(as_source(pdf_bytes))
+
+
+def page_fingerprints(pdf_bytes) -> list:
+    """回傳各頁內容串流的雜湊（只讀取內容串流，不提取文字）
+
+    內容串流相同的頁面提取出的文字也相同，可用來判斷改版後哪些頁面需要重新提取。
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+
+    Returns:
+        list[str]: 依頁序排列的十六進位雜湊字串
+    """
+    doc = _open_document(as_source(pdf_bytes))
+    try:
+        return [hashlib.blake2b(page.read_contents(), digest_size=16).hexdigest() for page in doc]
+    finally:
+        doc.close()
+
+
+def extract_pages(pdf_bytes, page_numbers, extraction=None) -> dict:
+    """只提取指定頁面的文字
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        page_numbers: 要提取的頁碼（從 0 開始）
+        extraction: 提取設定（見 iter_pages()）
+
+    Returns:
+        dict[int, str]: 頁碼 → 原始文字
+    """
+    extraction = get_extraction(extraction)
+    doc = _open_document(as_source(pdf_bytes))
+    try:
+        return {i: extraction.extract(doc[i]) for i in sorted(page_numbers)}
+    finally:
+        doc.close()
+
+
+def iter_page_range(pdf_bytes, start: int, end: int, extraction=None):
+    """逐頁提取 [start, end) 範圍的文字，單頁失敗時回報錯誤而不中斷
+
+    無法開啟整份文件時仍會直接拋出例外。
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap）
+        start: 起始頁碼（從 0 開始）
+        end: 結束頁碼（不含）
+        extraction: 提取設定（見 iter_pages()）
+
+    Yields:
+        tuple: (頁碼, 文字, 錯誤)；成功時錯誤為 None，失敗時文字為 None、錯誤為例外說明
+    """
+    extraction = get_extraction(extraction)
+    doc = _open_document(as_source(pdf_bytes))
+    try:
+        for i in range(start, min(end, doc.page_count)):
+            try:
+                text = extraction.extract(doc[i])
+            except Exception as e:
+                yield i, None, f"{type(e).__name__}: {e}"
+            else:
+                yield i, text, None
+    finally:
+        doc.close()
+
+
+def is_text_input(pdf_input) -> bool:
+    """是否為已提取文字的輸入：.txt 檔案路徑或 "-"（標準輸入）"""
+    if not isinstance(pdf_input, (str, os.PathLike)):
+        return False
+    path = os.fspath(pdf_input)
+    return path == "-" or path.lower().endswith(TEXT_EXTENSIONS)
+
+
+def iter_text_pages(source):
+    """逐頁讀取已提取的文字（例如 pdftotext 的輸出），不需要 PyMuPDF
+
+    頁面以分頁字元 \\f 分隔；檔案結尾的分頁字元不會產生多餘的空白頁。
+
+    Args:
+        source: .txt 檔案路徑、"-"（標準輸入）或文字模式的檔案物件
+
+    Yields:
+        str: 單頁的原始文字
+    """
+    if isinstance(source, (str, os.PathLike)) and os.fspath(source) != "-":
+        with open(source, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = (sys.stdin if not hasattr(source, "read") else source).read()
+
+    pages = text.split(PAGE_SEPARATOR)
+    if len(pages) > 1 and not pages[-1].strip():
+        pages.pop()
+    yield from pages
+
+
+def as_source(pdf_input):
+    """將各種 PDF 輸入轉為 PyMuPDF 可直接開啟的來源，過程中不複製檔案內容
+
+    - str / PathLike：回傳路徑字串，由 PyMuPDF 直接讀檔
+    - io.BytesIO：回傳底層緩衝區的 memoryview（整個緩衝區，不受目前讀取位置影響）
+    - mmap / bytearray：包成 memoryview
+    - bytes / memoryview：原樣回傳
+    - 其他具 read() 的檔案物件：讀出全部內容
+
+    Args:
+        pdf_input: PDF 輸入
+
+    Returns:
+        str | bytes | memoryview: 檔案路徑或 PDF 內容緩衝區
+    """
+    if isinstance(pdf_input, (str, os.PathLike)):
+        return os.fspath(pdf_input)
+    if isinstance(pdf_input, io.BytesIO):
+        return pdf_input.getbuffer()
+    if isinstance(pdf_input, (mmap.mmap, bytearray)):
+        return memoryview(pdf_input)
+    if isinstance(pdf_input, (bytes, memoryview)):
+        return pdf_input
+    if hasattr(pdf_input, "read"):
+        return pdf_input.read()
+    raise TypeError(f"不支援的 PDF 輸入型別：{type(pdf_input).__name__}")
+
+
+def _iter_pages_parallel(source, workers: int, chunk_size: int | None,
+                         extraction: ExtractionProfile = DEFAULT_EXTRACTION):
+    """將頁碼範圍切塊後交給行程池平行提取，並依頁序產出結果
+
+    每個 worker 自行開啟文件（來源為檔案路徑或 PDF bytes），只提取分配到的頁面。
+    同時進行中的工作數有上限，避免結果在記憶體中無限堆積。
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if isinstance(source, memoryview) and multiprocessing.get_start_method() != "fork":
+        # 非 fork 模式下 worker 無法共用父行程記憶體，memoryview 也無法序列化
+        source = bytes(source)
+
+    page_count = _count_pages(source)
+    if page_count == 0:
+        return
+
+    if not chunk_size or chunk_size < 1:
+        # 預設讓每個 worker 約分到 4 個工作，兼顧負載平衡與排程成本
+        chunk_size = max(1, -(-page_count // (workers * 4)))
+
+    ranges = [(start, min(start + chunk_size, page_count))
+              for start in range(0, page_count, chunk_size)]
+    workers = min(workers, len(ranges))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(source, extraction)) as pool:
+        pending = deque()
+        ranges_iter = iter(ranges)
+
+        # 先送出 2 倍 worker 數量的工作，之後每取回一塊再補送一塊
+        for start, end in ranges_iter:
+            pending.append(pool.submit(_extract_range, start, end))
+            if len(pending) >= workers * 2:
+                break
+
+        while pending:
+            texts = pending.popleft().result()
+            next_range = next(ranges_iter, None)
+            if next_range is not None:
+                pending.append(pool.submit(_extract_range, *next_range))
+            yield from texts
+
+
+def _open_document(source):
+    """依來源類型開啟 PDF：字串視為檔案路徑，其餘視為 PDF bytes"""
+    import fitz  # PyMuPDF 套件
+
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _count_pages(source) -> int:
+    """回傳 PDF 頁數"""
+    doc = _open_document(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def _init_worker(source, extraction: ExtractionProfile = DEFAULT_EXTRACTION) -> None:
+    """worker 行程初始化：保存 PDF 來源與提取設定，文件在第一次需要時才開啟"""
+    global _worker_source, _worker_extraction, _worker_doc
+    _worker_source = source
+    _worker_extraction = extraction
+    _worker_doc = None
 
-    raw_text = ""
-    # 逐頁提取文字
-    for page in doc:
-        text = page.get_text()
-        if text:
-            raw_text += text + "\n"
 
-    return raw_text
+def _extract_range(start: int, end: int) -> list:
+    """在 worker 行程中提取 [start, end) 範圍內各頁的文字"""
+    global _worker_doc
+    if _worker_doc is None:
+        _worker_doc = _open_document(_worker_source)
+    return [_worker_extraction.extract(_worker_doc[i]) for i in range(start, end)]
@@ -1,34 +1,192 @@
 # pipeline.py - PDF 資料清洗流程協調器
-from src.pdf_reader import read_pdf
-from src.cleaner import clean_text
-from src.parser import parse_questions
-from src.formatter import format_questions_to_rows
+import os
+from contextlib import nullcontext
 
+from src.pdf_reader import is_text_input, iter_pages
+from src.cleaner import iter_clean_pages
+from src.parser import parse_questions, iter_questions
+from src.formatter import format_questions_to_rows, iter_format_rows
+from src.cache import iter_cached_pages
+from src.textbuffer import PageBuffer
 
-def run_pipeline(pdf_bytes, verbose: bool = False, format_output: bool = True):
+
+def run_pipeline(pdf_bytes, verbose: bool = False, format_output: bool = True,
+                 stream: bool = False, workers: int | None = None,
+                 chunk_size: int | None = None, cache=None, rules=None,
+                 collector=None, dedup=None, extraction=None, counts=None,
+                 parse_workers: int | None = None):
     """執行完整的 PDF 處理流程：讀取 → 清洗 → 解析 → 格式化
     
     Args:
-        pdf_bytes: PDF 檔案的二進位流（io.BytesIO）
+        pdf_bytes: PDF 來源：檔案路徑（建議，由 PyMuPDF 直接開啟）、
+            io.BytesIO、bytes、memoryview 或 mmap。
+            .txt 路徑或 "-"（標準輸入）視為已提取的文字（頁面以 \\f 分隔），
+            直接從清洗步驟開始，不會載入 PyMuPDF，也不使用快取
         verbose: 是否顯示清洗過程的詳細資訊
         format_output: 是否將結果轉換為扁平化格式（預設 True）
+        stream: 是否以串流模式逐頁處理（預設 False）。
+            啟用時回傳 generator，記憶體用量只與單頁大小相關，
+            且第一筆結果在整份 PDF 提取完成前就會產出。
+        workers: PDF 文字提取的平行行程數（None 或 1 表示單行程）
+        chunk_size: 平行提取時每個工作分配的頁數（None 表示自動計算）
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        collector: 效能指標收集器（src.instrument.Collector）。指定時分別量測提取、清洗、
+            解析、去重與格式化各階段（與未量測時走同一條處理路徑），結束時呼叫 collector.stop()
+        dedup: 近似重複索引（src.dedup.DedupIndex）。指定時略過與索引中既有題目
+            （或同一份 PDF 中較前面的題目）重複的題目，並將本次的題目加入索引
+        extraction: PyMuPDF 提取設定（src.pdf_reader.ExtractionProfile 或
+            EXTRACTION_PROFILES 中的名稱，如 "blocks"），None 表示預設設定
+        counts: 指定 dict 時將處理過的頁數記錄在 counts["pages"]（頁數取自流經流程的頁面，
+            快取命中時不需再開啟 PDF 計算頁數）
+        parse_workers: 題目解析的平行行程數（None 或 1 表示單行程，預設；僅非串流模式）。
+            行程池的啟動與結果還原成本高，清洗後的文字遠大於 1 MB 時才可能比單行程快，
+            需依實際資料量測後再開啟（見 benchmarks/bench_parser.py --workers）
     
     Returns:
-        list[dict]: 處理後的題目列表
+        list[dict]: 處理後的題目列表（stream=True 時為 generator）
             - 若 format_output=True：扁平化格式 (Topic, question_id, A~F, answer)
-            - 若 format_output=False：原始格式 (id, question, choices, answer)
+            - 若 format_output=False：原始格式 (id, question, choices, answer)；
+              非串流模式下為 LazyQuestion，另有來源頁範圍 pages
     """
-    # 步驟 1: 從 PDF 提取原始文字
-    raw_text = read_pdf(pdf_bytes)
-    
-    # 步驟 2: 清洗文字（移除雜訊、標準化空白等）
-    cleaned_text = clean_text(raw_text, verbose=verbose)
-    
-    # 步驟 3: 解析成結構化的題目資料
-    questions = parse_questions(cleaned_text)
-    
+    if stream:
+        return iter_pipeline(pdf_bytes, verbose=verbose, format_output=format_output,
+                             workers=workers, chunk_size=chunk_size, cache=cache,
+                             rules=rules, collector=collector, dedup=dedup,
+                             extraction=extraction, counts=counts)
+
+    try:
+        # 步驟 1: 從 PDF 逐頁提取原始文字（文字輸入直接讀取）
+        if cache is None or is_text_input(pdf_bytes):
+            pages = iter_pages(pdf_bytes, workers=workers, chunk_size=chunk_size,
+                               extraction=extraction)
+        else:
+            pages = iter_cached_pages(pdf_bytes, cache, workers=workers, chunk_size=chunk_size,
+                                      extraction=extraction)
+        if counts is not None:
+            pages = _count_pages(pages, counts)
+        if collector is not None:
+            pages = collector.wrap("extract", pages, count="pages", size="chars_out")
+
+        # 步驟 2: 逐頁清洗文字（移除雜訊、標準化空白等），接成單一的頁索引緩衝區
+        cleaned_pages = iter_clean_pages(pages, verbose=verbose, rules=rules)
+        if collector is not None:
+            cleaned_pages = collector.wrap("clean", cleaned_pages, count="pages", size="chars_out")
+        with _stage(collector, "clean"):
+            buffer = PageBuffer.from_pages(cleaned_pages)
+
+        # 步驟 3: 解析成結構化的題目資料（只記錄位移範圍，欄位讀取時才組出文字）
+        with _stage(collector, "parse"):
+            questions = parse_questions(buffer, workers=parse_workers)
+        if collector is not None:
+            collector.add("parse", lines_in=buffer.text.count("\n"), questions_out=len(questions))
+        if dedup is not None:
+            with _stage(collector, "dedup"):
+                questions = list(dedup.iter_unique(questions, source=_source_name(pdf_bytes)))
+            if collector is not None:
+                collector.add("dedup", questions_out=len(questions))
+
+        # 步驟 4: 轉換為扁平化格式（可選；LazyQuestion 的文字在此時才組出）
+        if format_output:
+            with _stage(collector, "format"):
+                questions = format_questions_to_rows(questions)
+            if collector is not None:
+                collector.add("format", rows_out=len(questions))
+        return questions
+    finally:
+        if collector is not None:
+            collector.stop()
+
+
+def iter_pipeline(pdf_bytes, verbose: bool = False, format_output: bool = True,
+                  workers: int | None = None, chunk_size: int | None = None,
+                  cache=None, rules=None, collector=None, dedup=None, extraction=None,
+                  counts=None):
+    """串流版處理流程：逐頁讀取、清洗、解析，完成一題就產出一題
+
+    Args:
+        pdf_bytes: PDF 來源（檔案路徑、io.BytesIO、bytes、memoryview 或 mmap；
+            .txt 路徑或 "-" 為已提取的文字，見 run_pipeline()）
+        verbose: 是否在處理完成後顯示清洗統計資訊
+        format_output: 是否將結果轉換為扁平化格式（預設 True）
+        workers: PDF 文字提取的平行行程數（None 或 1 表示單行程）
+        chunk_size: 平行提取時每個工作分配的頁數（None 表示自動計算）
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        collector: 效能指標收集器（src.instrument.Collector），None 表示不量測
+        dedup: 近似重複索引（src.dedup.DedupIndex），None 表示不去重
+        extraction: PyMuPDF 提取設定（見 run_pipeline()）
+        counts: 指定 dict 時將處理過的頁數記錄在 counts["pages"]（見 run_pipeline()）
+
+    Yields:
+        dict: 處理後的題目（格式同 run_pipeline()）
+    """
+    # 步驟 1: 逐頁提取（文字輸入直接逐頁讀取）
+    if cache is None or is_text_input(pdf_bytes):
+        pages = iter_pages(pdf_bytes, workers=workers, chunk_size=chunk_size, extraction=extraction)
+    else:
+        pages = iter_cached_pages(pdf_bytes, cache, workers=workers, chunk_size=chunk_size,
+                                  extraction=extraction)
+    if counts is not None:
+        pages = _count_pages(pages, counts)
+    if collector is not None:
+        pages = collector.wrap("extract", pages, count="pages", size="chars_out")
+
+    # 步驟 2: 逐頁清洗
+    cleaned_pages = iter_clean_pages(pages, verbose=verbose, rules=rules)
+    if collector is not None:
+        cleaned_pages = collector.wrap("clean", cleaned_pages, count="pages", size="chars_out")
+
+    # 步驟 3: 將各頁拆成文字行後交給解析器，跨頁的題目狀態會延續
+    questions = iter_questions(_iter_lines(cleaned_pages, collector))
+    if collector is not None:
+        questions = collector.wrap("parse", questions, count="questions_out")
+
+    # 步驟 3.5: 去除重複題目（可選）
+    if dedup is not None:
+        questions = dedup.iter_unique(questions, source=_source_name(pdf_bytes))
+        if collector is not None:
+            questions = collector.wrap("dedup", questions, count="questions_out")
+
     # 步驟 4: 轉換為扁平化格式（可選）
-    if format_output:
-        return format_questions_to_rows(questions)
-    
-    return questions
+    try:
+        if format_output:
+            rows = iter_format_rows(questions)
+            if collector is not None:
+                rows = collector.wrap("format", rows, count="rows_out")
+            yield from rows
+        else:
+            yield from questions
+    finally:
+        # 呼叫端提早停止迭代或發生例外時也要關閉 tracemalloc
+        if collector is not None:
+            collector.stop()
+
+
+def _stage(collector, name: str):
+    """collector 為 None 時不量測的 collector.stage()"""
+    return nullcontext() if collector is None else collector.stage(name)
+
+
+def _count_pages(pages, counts: dict):
+    """原樣轉交頁面，並將頁數累計到 counts["pages"]"""
+    counts["pages"] = 0
+    for page in pages:
+        counts["pages"] += 1
+        yield page
+
+
+def _iter_lines(pages, collector=None):
+    """將逐頁文字拆成連續的文字行（有 collector 時順便累計解析階段的輸入行數）"""
+    for page in pages:
+        lines = page.splitlines()
+        if collector is not None:
+            collector.add("parse", lines_in=len(lines))
+        yield from lines
+
+
+def _source_name(pdf_bytes) -> str:
+    """去重索引中記錄的來源名稱（檔案路徑時為檔名，其餘為空字串）"""
+    if isinstance(pdf_bytes, (str, os.PathLike)):
+        return os.path.basename(os.fspath(pdf_bytes))
+    return ""
@@ -0,0 +1,226 @@
+# question.py - 題目資料結構：以 __slots__ 實作的精簡題目紀錄
+import re
+
+CHOICE_KEYS = ("A", "B", "C", "D", "E", "F")
+CHOICE_INDEX = {key: i for i, key in enumerate(CHOICE_KEYS)}
+
+# dict 相容介面的欄位，與 to_dict() 相同（id 由 topic 與 number 推導）
+_FIELDS = ("id", "question", "choices", "answer")
+_ID_PATTERN = re.compile(r"^Topic\s+(\d+|NaN)\s+Question #(\d+)")
+
+
+def format_id(topic, number: int) -> str:
+    """組出題目編號字串，例如 "Topic 1 Question #5"（topic 為 None 時為 "Topic NaN"）"""
+    return f"Topic {'NaN' if topic is None else topic} Question #{number}"
+
+
+def parse_id(question_id: str):
+    """解析題目編號字串
+
+    Returns:
+        tuple | None: (topic, number)，topic 為 int 或 None（NaN 主題）；格式不符時回傳 None
+    """
+    m = _ID_PATTERN.match(question_id)
+    if not m:
+        return None
+    topic = m.group(1)
+    return (None if topic == "NaN" else int(topic)), int(m.group(2))
+
+
+class Question:
+    """解析後的單一題目
+
+    以 __slots__ 儲存，選項固定為六格的 tuple（依 A–F 排列，不存在的選項為 None），
+    避免每題各自配置一個 dict 與內層的 choices dict。
+
+    為了相容舊程式，也支援唯讀的 dict 式存取：q["id"]、q["choices"]（回傳新的 dict）、
+    q.get(...)、"id" in q、keys() 與 dict(q)；可存取的鍵與 to_dict() 相同
+    （id、question、choices、answer），topic / number 只以屬性提供。
+    需要真正的 dict 時請用 to_dict()。
+
+    主題與題號以整數欄位 topic / number 保存（NaN 主題為 None），排序、合併或去重
+    時可直接使用 (topic, number)；id 字串僅在需要時才由這兩個欄位組出。
+
+    Args:
+        topic: 主題編號（int，NaN 主題為 None）
+        number: 題目編號（int）
+        question: 題目文字
+        choices: 六格選項 tuple（A–F，不存在為 None）
+        answer: 正確答案（如 'A'）
+    """
+
+    __slots__ = ("topic", "number", "question", "choices", "answer")
+
+    def __init__(self, topic, number: int, question: str = "", choices: tuple = (None,) * 6,
+                 answer: str = ""):
+        self.topic = topic
+        self.number = number
+        self.question = question
+        self.choices = choices
+        self.answer = answer
+
+    @property
+    def id(self) -> str:
+        """題目編號字串（如 "Topic 1 Question #1"）"""
+        return format_id(self.topic, self.number)
+
+    @property
+    def key(self) -> tuple:
+        """(topic, number) 排序鍵；NaN 主題排在最前面"""
+        return (-1 if self.topic is None else self.topic, self.number)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Question":
+        """由舊格式的 dict 建立題目
+
+        dict 若有 topic / number 欄位則直接使用，否則由 id 字串解析。
+        """
+        if "number" in data:
+            topic, number = data.get("topic"), data["number"]
+        else:
+            parsed = parse_id(data["id"])
+            if parsed is None:
+                raise ValueError(f"無法解析題目編號：{data['id']!r}")
+            topic, number = parsed
+        choices = [None] * 6
+        for key, value in data.get("choices", {}).items():
+            choices[CHOICE_INDEX[key]] = value
+        return cls(topic, number, data.get("question", ""), tuple(choices), data.get("answer", ""))
+
+    def choice_dict(self) -> dict:
+        """回傳存在的選項 {'A': ..., 'B': ...}"""
+        return {key: value for key, value in zip(CHOICE_KEYS, self.choices) if value is not None}
+
+    def to_dict(self) -> dict:
+        """轉為舊格式的 dict：{id, question, choices, answer}"""
+        return {
+            "id": self.id,
+            "question": self.question,
+            "choices": self.choice_dict(),
+            "answer": self.answer,
+        }
+
+    # --- dict 相容介面 ---
+
+    def __getitem__(self, key: str):
+        if key == "choices":
+            return self.choice_dict()
+        if key in _FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        return key in _FIELDS
+
+    def keys(self):
+        return _FIELDS
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Question):
+            return (self.topic, self.number, self.question, self.choices, self.answer) == \
+                (other.topic, other.number, other.question, other.choices, other.answer)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Question(topic={self.topic!r}, number={self.number!r}, question={self.question!r}, "
+                f"choices={self.choice_dict()!r}, answer={self.answer!r})")
+
+
+# Question 的 question / choices 欄位存放位置，LazyQuestion 組出文字後存回同一欄位
+_QUESTION_SLOT = Question.__dict__["question"]
+_CHOICES_SLOT = Question.__dict__["choices"]
+
+
+class LazyQuestion(Question):
+    """以位移範圍參照文字緩衝區（src.textbuffer.PageBuffer）的題目
+
+    解析時只記錄題目與各選項在緩衝區中的位移範圍，question 與 choices
+    在第一次讀取時才由緩衝區切出並接合（之後沿用同一個字串），
+    只讀取 id 或答案的流程（例如計數、依題號合併）不需要組出任何文字。
+
+    來源頁範圍 pages 由題目的起訖位移二分搜尋緩衝區的頁首位移取得。
+
+    pickle 與 copy 會轉成一般的 Question（組出文字，不帶整份緩衝區），
+    送往其他行程時不會連同整份文件一起序列化。
+
+    Args:
+        buffer: 文字緩衝區
+        topic: 主題編號（int，NaN 主題為 None）
+        number: 題目編號（int）
+        spans: 題目文字的位移範圍序列 [start, end, start, end, ...]，每個範圍可包含多行
+        choice_spans: 六格選項（A–F），每格為選項文字的位移範圍序列，不存在為 None
+        answer: 正確答案
+        start: 題目範圍的起始位移（Topic 行或 Question 行）
+        end: 題目範圍的結束位移（最後一行內容的結尾）
+    """
+
+    __slots__ = ("_buffer", "_spans", "_choice_spans", "_start", "_end")
+
+    def __init__(self, buffer, topic, number: int, spans, choice_spans,
+                 answer: str, start: int, end: int):
+        self.topic = topic
+        self.number = number
+        self.answer = answer
+        _QUESTION_SLOT.__set__(self, None)   # None 表示尚未組出
+        _CHOICES_SLOT.__set__(self, None)
+        self._buffer = buffer
+        self._spans = spans
+        self._choice_spans = choice_spans
+        self._start = start
+        self._end = end
+
+    @property
+    def question(self) -> str:
+        value = _QUESTION_SLOT.__get__(self)
+        if value is None:
+            spans = self._spans
+            value = self._buffer.join_lines(spans) + " " if spans else ""
+            _QUESTION_SLOT.__set__(self, value)
+        return value
+
+    @question.setter
+    def question(self, value: str) -> None:
+        _QUESTION_SLOT.__set__(self, value)
+
+    @property
+    def choices(self) -> tuple:
+        value = _CHOICES_SLOT.__get__(self)
+        if value is None:
+            buffer = self._buffer
+            if buffer.simple_lines:
+                # 同 PageBuffer.join_lines()，多數選項只有一個範圍，直接切片以省去每格一次方法呼叫
+                text = buffer.text
+                value = tuple([
+                    None if spans is None
+                    else text[spans[0]:spans[1]].replace("\n", " ") if len(spans) == 2
+                    else buffer.join_lines(spans)
+                    for spans in self._choice_spans
+                ])
+            else:
+                join = buffer.join_lines
+                value = tuple([None if spans is None else join(spans) for spans in self._choice_spans])
+            _CHOICES_SLOT.__set__(self, value)
+        return value
+
+    @choices.setter
+    def choices(self, value: tuple) -> None:
+        _CHOICES_SLOT.__set__(self, value)
+
+    @property
+    def pages(self) -> tuple:
+        """來源頁範圍 (first_page, last_page)，頁碼從 0 開始"""
+        return self._buffer.page_at(self._start), self._buffer.page_at(self._end - 1)
+
+    def __reduce__(self):
+        return Question, (self.topic, self.number, self.question, self.choices, self.answer)
+
@@ -0,0 +1,290 @@
+# search.py - 全文檢索模組：以 SQLite FTS5 建立可持續累加的題目索引，依關鍵字或服務名稱查詢
+import os
+import re
+import sqlite3
+
+from src.formatter import iter_format_rows
+from src.question import CHOICE_KEYS
+from src.sinks import source_key
+
+# 查詢結果的欄位順序（snippet 與 score 之外皆與扁平化資料列相同）
+RESULT_COLUMNS = ["source", "Topic", "question_id", "question", *CHOICE_KEYS, "answer", "snippet", "score"]
+
+_TERM = re.compile(r'"[^"]*"|[^\s"]+')
+_TOKEN_CHARS = re.compile(r"\w+\*?")
+
+
+class SearchIndex:
+    """磁碟上的題目全文索引（SQLite FTS5）
+
+    questions 表保存扁平化資料列與來源，questions_fts 為其外部內容（external content）
+    FTS5 索引，涵蓋題目與 A–F 選項文字；查詢以 bm25 排序並只取前 limit 筆，
+    不需掃描整個題庫。
+
+    同一個來源重新加入時，會先移除該來源先前的題目，
+    因此重新處理改版的 PDF 不會留下重複或過期的資料列。來源以 sinks.source_key()
+    識別（既有檔案為解析後的絕對路徑），a/exam.pdf 與 b/exam.pdf 是不同來源；
+    查詢結果的 source 欄位只顯示檔名。
+
+    Args:
+        path: SQLite 檔案路徑（":memory:" 表示只在記憶體中）
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._init_schema()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def add(self, rows, source: str = "", replace: bool = True) -> int:
+        """將資料列加入索引
+
+        Args:
+            rows: format_questions_to_rows() 的資料列（也接受 Question 紀錄）
+            source: 來源 PDF 路徑或名稱
+            replace: 是否先移除同一來源先前加入的資料列
+
+        Returns:
+            int: 加入的資料列數
+        """
+        head = _source_columns(source)
+        values = [(*head, *values) for values in map(_row_values, rows) if values is not None]
+        with self._conn:
+            if replace:
+                self._remove(source)
+            return self._insert(values)
+
+    def iter_add(self, rows, source: str = "", batch_size: int = 5000):
+        """邊產出資料列邊加入索引（串流模式），取代同一來源先前的資料列
+
+        移除舊資料列與寫入新資料列在同一個交易中，全部產出完畢才提交；
+        處理途中失敗或提早停止迭代時整個回復，索引仍保留該來源先前的資料列。
+
+        Args:
+            rows: 可迭代的資料列
+            source: 來源 PDF 路徑或名稱
+            batch_size: 每批寫入的資料列數
+
+        Yields:
+            dict: 原本的資料列（不修改）
+        """
+        head = _source_columns(source)
+        committed = False
+        try:
+            self._remove(source)
+            batch = []
+            for row in rows:
+                values = _row_values(row)
+                if values is not None:
+                    batch.append((*head, *values))
+                yield row
+                if len(batch) >= batch_size:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+            self._conn.commit()
+            committed = True
+        finally:
+            if not committed:
+                self._conn.rollback()
+
+    def remove(self, source: str) -> int:
+        """移除某個來源的所有資料列
+
+        Returns:
+            int: 移除的資料列數
+        """
+        with self._conn:
+            return self._remove(source)
+
+    def search(self, query: str, limit: int = 20, source: str | None = None,
+               topic: str | None = None, raw: bool = False,
+               max_ranked: int | None = None) -> list:
+        """查詢題目
+
+        一般模式下，查詢字串中的每個詞都必須出現（不分大小寫），
+        以雙引號括住的部分視為片語，詞尾加 * 表示前綴比對（例如 kines*）。
+        raw=True 時直接使用 FTS5 查詢語法（OR、NOT、NEAR、欄位篩選如 a:lambda）。
+
+        預設對所有符合的資料列以 bm25 排序。幾乎每題都出現的詞（例如 "aws"）在百萬筆的題庫中
+        會花上秒等級的時間；需要固定延遲時可指定 max_ranked，符合筆數超過時只對最近加入的
+        max_ranked 筆排序（較舊但更相關的題目可能不會出現在結果中）。
+
+        Args:
+            query: 查詢字串
+            limit: 最多回傳筆數
+            source: 只查詢此來源（路徑，或查詢結果中顯示的檔名）
+            topic: 只查詢此 Topic（"1"、"NaN"...）
+            raw: 是否直接使用 FTS5 查詢語法
+            max_ranked: 參與排序的符合筆數上限（None 表示全部排序，預設）
+
+        Returns:
+            list[dict]: 依相關度排序的資料列，欄位見 RESULT_COLUMNS；
+                snippet 為命中處的摘要（以 [ ] 標示），score 越小越相關
+        """
+        match = query if raw else match_expression(query)
+        if not match:
+            return []
+
+        where = "questions_fts MATCH ?"
+        params = [match]
+        if source is not None:
+            # 同一來源的資料列是整批寫入的，以其 rowid 範圍限制 FTS5 走訪的區段
+            keys = [source_key(source), source]
+            first, last = self._conn.execute(
+                "SELECT MIN(id), MAX(id) FROM questions WHERE source_key = ? OR source = ?", keys
+            ).fetchone()
+            if first is None:
+                return []
+            where += " AND f.rowid BETWEEN ? AND ? AND (q.source_key = ? OR q.source = ?)"
+            params += [first, last, *keys]
+        if topic is not None:
+            where += " AND q.topic = ?"
+            params.append(str(topic))
+        # CROSS JOIN 固定由 FTS5 驅動，避免規劃器改從 source 索引逐列回查 MATCH
+        base = f"FROM questions_fts AS f CROSS JOIN questions AS q ON q.id = f.rowid WHERE {where}"
+
+        try:
+            if max_ranked is not None:
+                # 依 rowid 由新到舊走訪不需計分，找到第 max_ranked 筆即停止
+                cutoff = self._conn.execute(
+                    f"SELECT f.rowid {base} ORDER BY f.rowid DESC LIMIT 1 OFFSET ?",
+                    (*params, max_ranked),
+                ).fetchone()
+                if cutoff is not None:
+                    base += " AND f.rowid > ?"
+                    params.append(cutoff[0])
+            ranked = self._conn.execute(
+                f"SELECT f.rowid, f.rank {base} ORDER BY f.rank LIMIT ?", (*params, limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"無效的查詢：{query}（{e}）") from e
+
+        # 摘要只為回傳的資料列產生；rowid 等值條件會交給 FTS5 處理，不會重新掃描整個索引
+        results = []
+        for rowid, score in ranked:
+            row = self._conn.execute("""
+                SELECT q.source, q.topic, q.qid, q.question, q.a, q.b, q.c, q.d, q.e, q.f, q.answer,
+                       snippet(questions_fts, -1, '[', ']', '…', 12)
+                FROM questions_fts AS f JOIN questions AS q ON q.id = f.rowid
+                WHERE questions_fts MATCH ? AND f.rowid = ?
+            """, (match, rowid)).fetchone()
+            results.append(dict(zip(RESULT_COLUMNS, (*row, score))))
+        return results
+
+    def sources(self) -> dict:
+        """已索引的來源（source_key()）與各自的資料列數"""
+        return dict(self._conn.execute(
+            "SELECT source_key, COUNT(*) FROM questions GROUP BY source_key ORDER BY source_key"
+        ))
+
+    def optimize(self) -> None:
+        """合併 FTS5 的索引片段；大量加入後執行可讓查詢更快"""
+        with self._conn:
+            self._conn.execute("INSERT INTO questions_fts (questions_fts) VALUES ('optimize')")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _init_schema(self) -> None:
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    source_key TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    qid TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    a TEXT, b TEXT, c TEXT, d TEXT, e TEXT, f TEXT,
+                    answer TEXT
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                    question, a, b, c, d, e, f,
+                    content='questions', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                );
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(questions)")}
+            if "source_key" not in columns:   # 舊版以檔名為鍵建立的索引
+                self._conn.execute("ALTER TABLE questions ADD COLUMN source_key TEXT NOT NULL DEFAULT ''")
+                self._conn.execute("UPDATE questions SET source_key = source")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS questions_source_key ON questions (source_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS questions_source ON questions (source)")
+
+    def _insert(self, values: list) -> int:
+        """寫入資料列並同步 FTS 索引（需在交易中呼叫）"""
+        if not values:
+            return 0
+        conn = self._conn
+        first_id = (conn.execute("SELECT MAX(id) FROM questions").fetchone()[0] or 0) + 1
+        conn.executemany(
+            "INSERT INTO questions (id, source_key, source, topic, qid, question, a, b, c, d, e, f, answer) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(doc_id, *row) for doc_id, row in enumerate(values, first_id)],
+        )
+        conn.execute("""
+            INSERT INTO questions_fts (rowid, question, a, b, c, d, e, f)
+            SELECT id, question, a, b, c, d, e, f FROM questions WHERE id >= ?
+        """, (first_id,))
+        return len(values)
+
+    def _remove(self, source: str) -> int:
+        """移除來源的資料列並同步 FTS 索引（需在交易中呼叫）"""
+        conn = self._conn
+        # 外部內容表需以原本的欄位值送出 'delete' 指令，FTS5 才能移除對應的詞
+        conn.execute("""
+            INSERT INTO questions_fts (questions_fts, rowid, question, a, b, c, d, e, f)
+            SELECT 'delete', id, question, a, b, c, d, e, f FROM questions WHERE source_key = ?
+        """, (source_key(source),))
+        return conn.execute("DELETE FROM questions WHERE source_key = ?", (source_key(source),)).rowcount
+
+
+def match_expression(query: str) -> str:
+    """將一般查詢字串轉成 FTS5 MATCH 運算式：每個詞都必須出現，片語與前綴比對保留
+
+    詞會以雙引號括起，因此 AND、OR、連字號等不會被當成 FTS5 運算子。
+    例如 'aws glue "data catalog" kines*' → '"aws" "glue" "data catalog" "kines"*'
+
+    Returns:
+        str: MATCH 運算式；沒有可查詢的詞時為空字串
+    """
+    terms = []
+    for term in _TERM.findall(query):
+        if term.startswith('"'):
+            phrase = " ".join(_TOKEN_CHARS.findall(term))
+            if phrase:
+                terms.append(f'"{phrase.replace("*", "")}"')
+            continue
+        for word in _TOKEN_CHARS.findall(term):
+            prefix = word.endswith("*")
+            terms.append(f'"{word.rstrip("*")}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _source_columns(source) -> tuple:
+    """(來源鍵, 顯示用的檔名)"""
+    return source_key(source), os.path.basename(os.fspath(source)) if source else ""
+
+
+def _row_values(row):
+    """取出 (Topic, question_id, question, A–F, answer)
+
+    Question 紀錄與巢狀格式的 dict 先轉成扁平化資料列；無法解析 id 的題目回傳 None
+    （與 format_questions_to_rows() 相同，略過不索引）。
+    """
+    if not isinstance(row, dict) or "question_id" not in row:
+        row = next(iter_format_rows([row]), None)
+        if row is None:
+            return None
+    return (row["Topic"], row["question_id"], row["question"],
+            *(row[key] for key in CHOICE_KEYS), row["answer"])
@@ -0,0 +1,410 @@
+# server.py - HTTP 服務模組：以 asyncio 常駐提供 PDF 清洗 API，CPU 密集的工作交給行程池
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from src.batch import process_file
+from src.sinks import EXTENSIONS, FORMATS
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "sqlite": "application/vnd.sqlite3",
+}
+DEFAULT_MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+
+_IO_CHUNK = 1 << 16       # 上傳與回應每次讀寫的位元組數
+_POLL_INTERVAL = 0.05     # 串流回應時檢查結果檔新內容的間隔秒數
+# 可在處理途中就送出已寫出部分的格式（逐列附加的文字格式；Parquet 與 SQLite 需整個檔案完成）
+STREAMING_FORMATS = ("jsonl", "csv")
+_STAT_HEADERS = ("X-Pages", "X-Questions", "X-Seconds")
+_HEADER_LIMIT = 1 << 16   # 請求行與標頭的長度上限
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large", 503: "Service Unavailable",
+}
+
+
+class IngestServer:
+    """常駐的 PDF 清洗 HTTP 服務
+
+    端點：
+        POST /parse?format=jsonl|csv|parquet&raw=1   請求本文為 PDF，回傳清洗後的資料列
+        GET  /health                                 回傳服務狀態與目前負載
+
+    上傳的 PDF 先串流寫入暫存檔（磁碟寫入在執行緒中進行，不會卡住其他連線），
+    再交給行程池以 batch.process_file() 處理，伺服器端不需把整份 PDF 或結果留在記憶體中。
+
+    jsonl / csv 結果在 worker 寫出的同時就以 chunked 編碼送回（第一批資料列寫出後即開始回應），
+    頁數、題數與耗時放在 chunked 結尾的 trailer（X-Pages、X-Questions、X-Seconds）；
+    回應開始後才發生錯誤時直接中斷連線，呼叫端會收到不完整的 chunked 本文。
+    parquet / sqlite 必須等整個檔案完成，處理結束後才以 chunked 編碼送出，統計值放在標頭。
+
+    同時執行的工作數受 jobs 限制，超過的請求在佇列中等待；
+    執行中加上等待中的請求達到 max_pending 時，新請求立即回應 503（附 Retry-After），
+    讓呼叫端自行退避，而不是無限制地堆積上傳檔。
+
+    Args:
+        jobs: 同時處理的 PDF 數（行程池大小，None 表示 CPU 核心數）
+        max_pending: 執行中與等待中請求數的上限（None 表示 jobs 的 4 倍）
+        max_upload_bytes: 單一上傳檔的大小上限
+        workers: 單檔內平行提取頁面的行程數
+        chunk_size: 平行提取時每個工作分配的頁數
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        tmp_dir: 暫存上傳檔與結果檔的目錄（None 表示系統暫存目錄）
+    """
+
+    def __init__(self, jobs: int | None = None, max_pending: int | None = None,
+                 max_upload_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+                 workers: int | None = None, chunk_size: int | None = None,
+                 cache=None, rules=None, tmp_dir: str | None = None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_pending = max_pending or self.jobs * 4
+        self.max_upload_bytes = max_upload_bytes
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.rules = rules
+        self.tmp_dir = tmp_dir
+
+        self.pending = 0     # 執行中與等待中的請求數
+        self.active = 0      # 正在行程池中執行的請求數
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._pool = None
+        self._slots = None
+        self._server = None
+
+    @property
+    def port(self) -> int | None:
+        """實際監聽的埠號（以 port=0 啟動時由系統指派）"""
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        """建立行程池並開始監聽"""
+        # 行程池依需求才建立子行程；若以 fork 建立，子行程會繼承當下已接受的連線 socket，
+        # 使連線在伺服器關閉後仍保持開啟，因此改用不繼承檔案描述子的 forkserver / spawn
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=context)
+        self._slots = asyncio.Semaphore(self.jobs)
+        self._server = await asyncio.start_server(self._handle, host, port, limit=_HEADER_LIMIT)
+
+    async def close(self) -> None:
+        """停止監聽並關閉行程池"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    def stats(self) -> dict:
+        """目前的負載與累計計數"""
+        return {
+            "status": "ok",
+            "jobs": self.jobs,
+            "active": self.active,
+            "queued": self.pending - self.active,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def _handle(self, reader, writer) -> None:
+        """處理單一連線（每個連線一個請求，回應後關閉）"""
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.LimitOverrunError:
+                await _send_json(writer, 431, {"error": "請求標頭過長"})
+                return
+            except asyncio.IncompleteReadError:
+                return
+
+            request = _parse_head(head)
+            if request is None:
+                await _send_json(writer, 400, {"error": "無法解析 HTTP 請求"})
+                return
+            method, path, query, headers = request
+
+            if path == "/health":
+                if method != "GET":
+                    await _send_json(writer, 405, {"error": "只接受 GET"})
+                    return
+                await _send_json(writer, 200, self.stats())
+            elif path == "/parse":
+                if method != "POST":
+                    await _send_json(writer, 405, {"error": "只接受 POST"})
+                    return
+                await self._parse(reader, writer, query, headers)
+            else:
+                await _send_json(writer, 404, {"error": f"找不到路徑：{path}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _parse(self, reader, writer, query: dict, headers: dict) -> None:
+        """POST /parse：接收 PDF、交給行程池處理並串流回傳結果"""
+        fmt = query.get("format", "jsonl")
+        if fmt not in FORMATS:
+            await _send_json(writer, 400, {"error": f"不支援的輸出格式：{fmt}（可用值：{', '.join(FORMATS)}）"})
+            return
+        format_output = query.get("raw", "0") in ("0", "false", "")
+        if not format_output and fmt != "jsonl":
+            await _send_json(writer, 400, {"error": "raw 的巢狀格式只能輸出為 jsonl"})
+            return
+
+        length = headers.get("content-length")
+        if length is None or not length.isdigit():
+            await _send_json(writer, 411, {"error": "需要 Content-Length 標頭"})
+            return
+        length = int(length)
+        if length > self.max_upload_bytes:
+            await _send_json(writer, 413, {"error": f"上傳檔超過上限 {self.max_upload_bytes} bytes"})
+            return
+
+        # 背壓：佇列已滿時立即拒絕，不讀取請求本文
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            await _send_json(writer, 503, {"error": "服務忙碌中，請稍後再試"},
+                             extra_headers={"Retry-After": "1"})
+            return
+
+        self.pending += 1
+        workdir = tempfile.mkdtemp(prefix="pdf-cleaning-", dir=self.tmp_dir)
+        try:
+            pdf_path = os.path.join(workdir, "upload.pdf")
+            out_path = os.path.join(workdir, "result" + EXTENSIONS[fmt])
+            if not await _receive_body(reader, pdf_path, length):
+                return
+
+            async with self._slots:
+                self.active += 1
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(
+                    self._pool, process_file, pdf_path, out_path, format_output,
+                    self.workers, self.chunk_size, self.cache, self.rules, fmt,
+                )
+                try:
+                    if fmt in STREAMING_FORMATS:
+                        result = await self._stream_result(writer, future, out_path, fmt)
+                    else:
+                        result = await self._send_result(writer, future, out_path, fmt)
+                finally:
+                    if not future.done():
+                        # 連線中斷時仍等 worker 結束，才釋放名額並刪除暫存目錄
+                        await asyncio.wait({future})
+                    self.active -= 1
+
+            if result["error"]:
+                self.failed += 1
+            else:
+                self.completed += 1
+        finally:
+            self.pending -= 1
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    async def _send_result(self, writer, future, out_path: str, fmt: str) -> dict:
+        """等處理完成後送出整個結果檔（統計值放在標頭）"""
+        result = await future
+        if result["error"]:
+            await _send_json(writer, 422, {"error": result["error"]})
+            return result
+        await _send_file(writer, out_path, CONTENT_TYPES[fmt], _stat_headers(result))
+        return result
+
+    async def _stream_result(self, writer, future, out_path: str, fmt: str) -> dict:
+        """在 worker 寫出結果檔的同時，把已寫出的部分以 chunked 編碼送出
+
+        process_file() 先寫入 out_path + ".tmp"，完成後改名；開啟的檔案在改名或刪除後仍可讀取。
+        """
+        f = None
+        started = False
+        try:
+            while True:
+                # 先記下是否已完成再讀取，完成後的最後一輪一定會讀到檔案結尾
+                done = future.done()
+                if f is None:
+                    f = await asyncio.to_thread(_open_existing, out_path + ".tmp", out_path)
+                if f is not None:
+                    while chunk := await asyncio.to_thread(f.read, _IO_CHUNK):
+                        if not started:
+                            _write_head(writer, 200, {
+                                "Content-Type": CONTENT_TYPES[fmt],
+                                "Transfer-Encoding": "chunked",
+                                "Trailer": ", ".join(_STAT_HEADERS),
+                            })
+                            started = True
+                        writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+                        await writer.drain()
+                if done:
+                    break
+                await asyncio.wait({future}, timeout=_POLL_INTERVAL)
+        finally:
+            if f is not None:
+                f.close()
+
+        result = future.result()
+        if result["error"]:
+            if started:
+                # 已送出 200 與部分資料，只能中斷連線讓呼叫端知道本文不完整
+                writer.transport.abort()
+            else:
+                await _send_json(writer, 422, {"error": result["error"]})
+            return result
+
+        if not started:
+            # 沒有任何資料列（結果檔為空）
+            _write_head(writer, 200, {"Content-Type": CONTENT_TYPES[fmt],
+                                      "Transfer-Encoding": "chunked",
+                                      "Trailer": ", ".join(_STAT_HEADERS)})
+        trailers = "".join(f"{name}: {value}\r\n" for name, value in _stat_headers(result).items())
+        writer.write(b"0\r\n" + trailers.encode("latin-1") + b"\r\n")
+        await writer.drain()
+        return result
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, **options) -> None:
+    """啟動服務直到中斷（Ctrl+C）
+
+    Args:
+        host: 監聽位址（預設只接受本機連線）
+        port: 監聽埠號
+        **options: 傳給 IngestServer 的設定（jobs、max_pending、cache、rules...）
+    """
+    import sys
+
+    async def main():
+        server = IngestServer(**options)
+        await server.start(host, port)
+        print(f"[serve] 監聽 http://{host}:{server.port}（jobs={server.jobs}, "
+              f"max_pending={server.max_pending}）", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def _parse_head(head: bytes):
+    """解析請求行與標頭
+
+    Returns:
+        tuple | None: (method, path, query, headers)，query 只保留每個參數的第一個值，
+            headers 的名稱轉為小寫；格式錯誤時回傳 None
+    """
+    try:
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _version = lines[0].split(" ", 2)
+    except ValueError:
+        return None
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            return None
+        headers[name.strip().lower()] = value.strip()
+
+    url = urlsplit(target)
+    query = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+    return method.upper(), url.path, query, headers
+
+
+async def _receive_body(reader, path: str, length: int) -> bool:
+    """將請求本文分段寫入檔案；連線提早中斷時回傳 False
+
+    磁碟寫入交給執行緒，事件迴圈在等待磁碟時仍可服務其他連線。
+    """
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        remaining = length
+        while remaining:
+            chunk = await reader.read(min(_IO_CHUNK, remaining))
+            if not chunk:
+                return False
+            await asyncio.to_thread(f.write, chunk)
+            remaining -= len(chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+    return True
+
+
+def _open_existing(*paths):
+    """以二進位模式開啟第一個存在的檔案，都不存在時回傳 None"""
+    for path in paths:
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def _stat_headers(result: dict) -> dict:
+    """process_file() 結果的統計標頭"""
+    return dict(zip(_STAT_HEADERS, (str(result["pages"]), str(result["questions"]),
+                                    f"{result['seconds']:.3f}")))
+
+
+def _write_head(writer, status: int, headers: dict) -> None:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append("Connection: close")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+async def _send_json(writer, status: int, body: dict, extra_headers: dict | None = None) -> None:
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    _write_head(writer, status, {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(data)),
+        **(extra_headers or {}),
+    })
+    writer.write(data)
+    await writer.drain()
+
+
+async def _send_file(writer, path: str, content_type: str, extra_headers: dict) -> None:
+    """以 chunked 編碼分段送出檔案內容，每段都等待對方接收（drain）以免緩衝區無限成長"""
+    _write_head(writer, 200, {
+        "Content-Type": content_type,
+        "Transfer-Encoding": "chunked",
+        **extra_headers,
+    })
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, _IO_CHUNK):
+            writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+            await writer.drain()
+    finally:
+        f.close()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
@@ -0,0 +1,356 @@
+# sinks.py - 輸出模組：將資料列以串流方式寫成 CSV、JSON Lines、Parquet 或 SQLite
+import csv
+import hashlib
+import json
+import os
+import sys
+
+from src.formatter import COLUMNS
+
+FORMATS = ("csv", "jsonl", "parquet", "sqlite")
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet", "sqlite": ".sqlite"}
+
+_BUFFER_SIZE = 1 << 20  # 檔案寫入緩衝區 1 MB
+
+
+class RowSink:
+    """資料列輸出的共同介面：累積一批資料列後一次寫出
+
+    可作為 context manager 使用，離開時自動 flush 並關閉。
+
+    Args:
+        path: 輸出路徑（"-" 表示標準輸出，Parquet 不支援）
+        batch_size: 每批累積的資料列數
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+
+    def write(self, row: dict) -> None:
+        """寫入一筆資料列（累積滿一批才實際寫出）"""
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, rows) -> int:
+        """寫入所有資料列
+
+        Returns:
+            int: 本次寫入的資料列數
+        """
+        n = 0
+        for row in rows:
+            self.write(row)
+            n += 1
+        return n
+
+    def flush(self) -> None:
+        """寫出目前累積的資料列"""
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._write_batch(batch)
+            self.count += len(batch)
+
+    def close(self) -> None:
+        """寫出剩餘資料列並關閉輸出"""
+        self.flush()
+        self._close()
+
+    def _write_batch(self, batch: list) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _TextSink(RowSink):
+    """以文字模式寫入的輸出（CSV / JSON Lines）
+
+    每批資料列寫出後即 flush 檔案緩衝區，讀取端（例如 HTTP 服務串流回應）能隨即讀到完整的一批。
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        super().__init__(path, batch_size)
+        if path == "-":
+            self._file = sys.stdout
+            self._owns_file = False
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="", buffering=_BUFFER_SIZE)
+            self._owns_file = True
+
+    def flush(self) -> None:
+        if self._batch:
+            super().flush()
+            self._file.flush()
+
+    def _close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class JsonlSink(_TextSink):
+    """JSON Lines 輸出：每筆資料列一行 JSON"""
+
+    def _write_batch(self, batch: list) -> None:
+        self._file.write("".join(
+            json.dumps(row, ensure_ascii=False, default=_to_json) + "\n" for row in batch
+        ))
+
+
+class CsvSink(_TextSink):
+    """CSV 輸出：欄位順序同 format_questions_to_rows()"""
+
+    def __init__(self, path: str, batch_size: int = 1000, fieldnames: list | None = None):
+        super().__init__(path, batch_size)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames or COLUMNS)
+        self._writer.writeheader()
+
+    def _write_batch(self, batch: list) -> None:
+        self._writer.writerows(batch)
+
+
+class ParquetSink(RowSink):
+    """Parquet 輸出：每批資料列寫成一個 row group（需要 pyarrow）
+
+    Args:
+        path: 輸出路徑
+        batch_size: 每個 row group 的資料列數
+        fieldnames: 欄位名稱（皆為字串欄位）
+    """
+
+    def __init__(self, path: str, batch_size: int = 50_000, fieldnames: list | None = None):
+        if path == "-":
+            raise ValueError("Parquet 輸出不支援標準輸出，請指定檔案路徑")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, batch_size)
+        self._pa = pa
+        self._fieldnames = fieldnames or COLUMNS
+        self._schema = pa.schema([(name, pa.string()) for name in self._fieldnames])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write_batch(self, batch: list) -> None:
+        columns = [[row[name] for row in batch] for name in self._fieldnames]
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(values, type=self._pa.string()) for values in columns],
+            schema=self._schema,
+        )
+        self._writer.write_table(table, row_group_size=len(batch))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+class SqliteSink(RowSink):
+    """SQLite 輸出：以 (來源雜湊, Topic, question_id) 為鍵 upsert 資料列
+
+    同一份 PDF（以解析後的絕對路徑識別，不同目錄中的同名檔案是不同來源）重新載入時，
+    既有的題目就地更新，改版後不再出現的題目會在
+    正常關閉時刪除，因此資料庫中每個來源的內容永遠與最近一次載入相同；
+    不同來源的資料列互不影響。每次載入記錄在 loads 表（來源、內容雜湊、資料列數）。
+
+    寫入使用 WAL 模式，每批資料列以一次 executemany 在單一交易中寫出；
+    查詢用的次要索引在載入結束時才建立，大量載入時不必逐列維護。
+    欄位皆為字串，與其他輸出格式相同。
+
+    Args:
+        path: 資料庫路徑（不支援標準輸出）
+        batch_size: 每個交易寫入的資料列數
+        source: 來源 PDF 路徑或名稱；檔案存在時以 os.path.realpath() 解析後的路徑為鍵，
+            並一併記錄內容雜湊
+        table: 資料表名稱
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000, source: str | None = None,
+                 table: str = "questions"):
+        if path == "-":
+            raise ValueError("SQLite 輸出不支援標準輸出，請指定檔案路徑")
+        if not table.isidentifier():
+            raise ValueError(f"無效的資料表名稱：{table}")
+        import sqlite3
+
+        super().__init__(path, batch_size)
+        self.table = table
+        self.source = source_key(source)
+        self.source_id = _source_id(self.source)
+        self._complete = True
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f'"{name}" TEXT NOT NULL' for name in COLUMNS)
+        with self._conn:
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS loads (
+                    load_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    content_hash TEXT,
+                    rows INTEGER,
+                    loaded_at TEXT NOT NULL DEFAULT (datetime('now'))
+                );
+                CREATE TABLE IF NOT EXISTS {table} (
+                    source_id INTEGER NOT NULL,
+                    {columns},
+                    source TEXT NOT NULL,
+                    load_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (source_id, "Topic", question_id)
+                ) WITHOUT ROWID;
+            """)
+            self.load_id = self._conn.execute(
+                "INSERT INTO loads (source, content_hash) VALUES (?, ?)",
+                (self.source, _content_hash(source)),
+            ).lastrowid
+
+        names = ", ".join(f'"{name}"' for name in COLUMNS)
+        updates = ", ".join(f'"{name}" = excluded."{name}"'
+                            for name in (*COLUMNS, "source", "load_id", "position")
+                            if name not in ("Topic", "question_id"))
+        self._upsert = (
+            f"INSERT INTO {table} (source_id, {names}, source, load_id, position) "
+            f"VALUES (?, {', '.join('?' * len(COLUMNS))}, ?, ?, ?) "
+            f'ON CONFLICT (source_id, "Topic", question_id) DO UPDATE SET {updates}'
+        )
+
+    def _write_batch(self, batch: list) -> None:
+        head = (self.source_id,)
+        tail = (self.source, self.load_id)
+        with self._conn:
+            self._conn.executemany(self._upsert, [
+                head + tuple(row[name] for name in COLUMNS) + tail + (position,)
+                for position, row in enumerate(batch, self.count)
+            ])
+
+    def _close(self) -> None:
+        try:
+            if self._complete:
+                with self._conn:
+                    # 這次載入沒有寫到的舊題目（改版後被刪除）一併移除
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE source_id = ? AND load_id <> ?",
+                                       (self.source_id, self.load_id))
+                    self._conn.execute("UPDATE loads SET rows = ? WHERE load_id = ?",
+                                       (self.count, self.load_id))
+                    self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_source "
+                                       f"ON {self.table} (source, position)")
+                    self._conn.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_question '
+                                       f'ON {self.table} ("Topic", question_id)')
+        finally:
+            self._conn.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        # 載入中途失敗時保留既有資料，不刪除尚未重新寫入的題目
+        if exc_type is not None:
+            self._complete = False
+        return super().__exit__(exc_type, exc, tb)
+
+
+def source_key(source) -> str:
+    """識別來源的鍵（SQLite 輸出與全文檢索索引共用）：既有檔案為解析後的絕對路徑
+    （a/exam.pdf 與 b/exam.pdf 不會互相覆寫），其餘原樣使用"""
+    if not source:
+        return ""
+    if os.path.isfile(source):
+        return os.path.realpath(source)
+    return os.fspath(source)
+
+
+def _source_id(source: str) -> int:
+    """來源名稱的 64 位元雜湊（有號整數，作為主鍵的一部分）"""
+    digest = hashlib.blake2b(source.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _content_hash(source) -> str | None:
+    """來源檔案內容的 sha256；不是既有檔案時回傳 None"""
+    if not source or not os.path.isfile(source):
+        return None
+    with open(source, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _to_json(obj):
+    """讓 json.dumps 能序列化 Question 等提供 to_dict() 的紀錄"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def open_sink(fmt: str, path: str, batch_size: int | None = None,
+              source: str | None = None) -> RowSink:
+    """依格式建立輸出
+
+    Args:
+        fmt: "csv"、"jsonl"、"parquet" 或 "sqlite"
+        path: 輸出路徑（"-" 表示標準輸出）
+        batch_size: 每批資料列數（None 表示使用各格式的預設值）
+        source: 來源 PDF 路徑（僅 SQLite 使用，作為 upsert 的鍵）
+
+    Returns:
+        RowSink: 對應格式的輸出物件
+    """
+    sinks = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink, "sqlite": SqliteSink}
+    if fmt not in sinks:
+        raise ValueError(f"不支援的輸出格式：{fmt}（可用值：{', '.join(FORMATS)}）")
+    options = {"source": source} if fmt == "sqlite" else {}
+    if batch_size is not None:
+        options["batch_size"] = batch_size
+    return sinks[fmt](path, **options)
+
+
+def read_rows(fmt: str, path: str):
+    """逐筆讀回 open_sink() 寫出的資料列
+
+    Args:
+        fmt: "csv"、"jsonl"、"parquet" 或 "sqlite"
+        path: 檔案路徑
+
+    Yields:
+        dict: 資料列（JSON Lines 的巢狀格式維持原樣）
+    """
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    elif fmt == "sqlite":
+        import sqlite3
+
+        conn = sqlite3.connect(path)
+        try:
+            names = ", ".join(f'"{name}"' for name in COLUMNS)
+            for values in conn.execute(f"SELECT {names} FROM questions ORDER BY source, position"):
+                yield dict(zip(COLUMNS, values))
+        finally:
+            conn.close()
+    else:
+        raise ValueError(f"不支援的輸出格式：{fmt}（可用值：{', '.join(FORMATS)}）")
+
+
+def guess_format(path: str) -> str | None:
+    """依副檔名推測輸出格式，無法判斷時回傳 None"""
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, known in EXTENSIONS.items():
+        if ext == known:
+            return fmt
+    return None
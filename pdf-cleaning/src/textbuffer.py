@@ -0,0 +1,111 @@
+# textbuffer.py - 文字緩衝區：整份文件存成單一字串並記錄每頁起始位移，以位移範圍參照其中的文字
+import re
+from bisect import bisect_right
+
+# str.splitlines() 除了 \n 之外還會斷行的字元；文字中沒有這些字元時可直接以 \n 切行
+_OTHER_BREAKS = "\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+# 連續的非換行字元即為一行（空行不會出現）
+_LINE = re.compile(r"[^\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]+")
+
+
+class PageBuffer:
+    """整份文件的頁索引文字緩衝區
+
+    各頁文字依序接成一個字串（每頁後面接一個換行，行不會跨頁相連），
+    page_starts 記錄每頁在字串中的起始位移。解析器只記錄題目與選項的 (start, end) 範圍，
+    需要時才由緩衝區切出文字；任一位移所在的頁碼以二分搜尋 page_starts 取得。
+
+    Args:
+        text: 整份文件的文字
+        page_starts: 每頁的起始位移（遞增；空白頁與下一頁的起始位移相同）
+    """
+
+    __slots__ = ("text", "page_starts", "simple_lines")
+
+    def __init__(self, text: str = "", page_starts=(0,)):
+        self.text = text
+        self.page_starts = list(page_starts)
+        # 是否只以 \n 斷行（沒有 \r、\f 等 str.splitlines() 也視為換行的字元）；
+        # 逐一以 in 搜尋單一字元比正規表示式的字元集合快得多
+        self.simple_lines = not any(ch in text for ch in _OTHER_BREAKS)
+
+    @classmethod
+    def from_pages(cls, pages) -> "PageBuffer":
+        """由逐頁文字建立緩衝區（頁面只在最後接合時複製一次）
+
+        Args:
+            pages: 可迭代的頁面文字（例如 iter_clean_pages() 的輸出）
+
+        Returns:
+            PageBuffer: 頁數與輸入相同的緩衝區
+        """
+        parts = []
+        starts = []
+        offset = 0
+        for page in pages:
+            starts.append(offset)
+            parts.append(page)
+            parts.append("\n")
+            offset += len(page) + 1
+        return cls("".join(parts), starts)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @property
+    def pages(self) -> int:
+        """頁數"""
+        return len(self.page_starts)
+
+    def page_at(self, offset: int) -> int:
+        """位移所在的頁碼（從 0 開始）"""
+        return max(bisect_right(self.page_starts, offset) - 1, 0)
+
+    def join_lines(self, spans) -> str:
+        """將位移範圍內的文字行以空白接合
+
+        範圍由解析器產生：範圍的頭尾不是空白，範圍內的行之間恰好以一個換行字元分隔，
+        且行首行尾沒有空白，因此只需把換行換成空白。
+
+        Args:
+            spans: 位移範圍序列 [start, end, start, end, ...]
+
+        Returns:
+            str: 接合後的文字
+        """
+        text = self.text
+        if self.simple_lines:
+            # 沒有換行時 replace() 回傳同一個字串，不另外複製
+            if len(spans) == 2:
+                return text[spans[0]:spans[1]].replace("\n", " ")
+            return " ".join([text[spans[i]:spans[i + 1]].replace("\n", " ")
+                             for i in range(0, len(spans), 2)])
+        return " ".join([line for i in range(0, len(spans), 2)
+                         for line in text[spans[i]:spans[i + 1]].splitlines()])
+
+    def iter_lines(self, start: int = 0, end: int | None = None):
+        """依序產出非空白的文字行
+
+        Args:
+            start: 起始位移（須為行首）
+            end: 結束位移（須為行首或文字結尾；None 表示到文字結尾）
+
+        Yields:
+            tuple: (去除前後空白的行, 該行在緩衝區中的起始位移)
+        """
+        text = self.text
+        if self.simple_lines:
+            offset = start
+            for line in text[start:end].split("\n"):
+                stripped = line.strip()
+                if stripped:
+                    # strip() 沒有去掉任何字元時回傳同一個物件
+                    yield stripped, offset if stripped is line else offset + line.find(stripped)
+                offset += len(line) + 1
+            return
+
+        for m in _LINE.finditer(text, start, len(text) if end is None else end):
+            line = m.group()
+            stripped = line.strip()
+            if stripped:
+                yield stripped, m.start() + line.find(stripped)
@@ -0,0 +1,443 @@
+# watch.py - 監看資料夾模式：常駐掃描投放目錄，將寫入完成的新檔案依大小排入佇列交給行程池處理
+import hashlib
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from src.batch import process_file
+from src.pdf_reader import TEXT_EXTENSIONS
+from src.sinks import EXTENSIONS
+
+WATCH_EXTENSIONS = (".pdf", *TEXT_EXTENSIONS)
+DEFAULT_SETTLE = 2.0
+DEFAULT_INTERVAL = 1.0
+
+_STATE_FILE = ".watch-state.jsonl"
+_LATENCY_SAMPLES = 1000   # 延遲統計保留的最近樣本數
+
+
+class WatchDaemon:
+    """監看投放目錄並自動處理新檔案的常駐程式
+
+    每次掃描（step()）依序執行：
+        1. 發現：列出目錄中的 PDF 與 .txt（略過隱藏檔與 .tmp/.part 等寫入中的暫存檔）。
+        2. 防彈跳：至少連續兩次掃描的大小與修改時間相同（不論檔案的修改時間多舊），
+           且最後修改已超過 settle 秒，才視為寫入完成；仍在複製中的檔案留到下一次掃描再判斷。
+        3. 去重：計算內容 sha256，已成功處理過（記錄在狀態檔）或正在處理的內容直接略過，
+           因此同一份 PDF 以不同檔名再次投放不會重複處理。
+        4. 排程：寫入完成的檔案放入依檔案大小排序的優先佇列（預設小檔優先，
+           讓大檔不會擋住大量小檔），最多 jobs 個同時交給行程池以 batch.process_file() 處理。
+
+    子行程異常結束（例如 PyMuPDF 崩潰或被 OOM killer 終止）時行程池無法再使用，
+    會重建行程池；當時處理中的檔案無法得知是哪一個造成的，之後逐一單獨重試，
+    單獨執行仍使行程池中止的檔案才記為失敗（與 batch.run_batch() 相同）。
+
+    有安裝 watchdog 時以檔案系統事件立即喚醒掃描，否則每 interval 秒輪詢一次；
+    事件只用來提早掃描，輪詢仍會持續，漏掉的事件不會讓檔案遺失。
+
+    輸出寫到 output_dir/<完整檔名><副檔名>（例如 exam.pdf.jsonl），保留原本的副檔名，
+    exam.pdf 與 exam.txt 不會寫到同一個輸出；同一個檔名再次投放（例如改版的 PDF）會覆寫先前的輸出。
+    成功處理的檔案以一行 JSON 附加到狀態檔，重新啟動後不會重複處理；
+    處理失敗的檔案在修改或重新投放之前不會重試。
+
+    Args:
+        watch_dir: 監看的投放目錄
+        output_dir: 輸出目錄（不存在時自動建立）
+        jobs: 同時處理的檔案數（行程池大小，None 表示 CPU 核心數）
+        output_format: 輸出格式（"csv"、"jsonl"、"parquet" 或 "sqlite"）
+        format_output: 是否輸出扁平化格式
+        settle: 檔案最後修改後需靜止的秒數
+        interval: 輪詢間隔秒數
+        largest_first: 是否改為大檔優先
+        state_path: 已處理內容雜湊的狀態檔（None 表示 output_dir/.watch-state.jsonl）
+        workers: 單檔內平行提取頁面的行程數
+        chunk_size: 平行提取時每個工作分配的頁數
+        cache: 頁面文字快取（src.cache.PageCache），None 表示不使用快取
+        rules: 清洗規則集（src.cleaner.RuleSet），None 表示使用預設規則
+        on_event: 事件回呼函式，參數為 (事件種類, 資訊 dict)；種類為
+            "queued"、"duplicate"、"completed"、"failed"
+    """
+
+    def __init__(self, watch_dir: str, output_dir: str, jobs: int | None = None,
+                 output_format: str = "jsonl", format_output: bool = True,
+                 settle: float = DEFAULT_SETTLE, interval: float = DEFAULT_INTERVAL,
+                 largest_first: bool = False, state_path: str | None = None,
+                 workers: int | None = None, chunk_size: int | None = None,
+                 cache=None, rules=None, on_event=None):
+        if output_format not in EXTENSIONS:
+            raise ValueError(f"不支援的輸出格式：{output_format}")
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.jobs = jobs or os.cpu_count() or 1
+        self.output_format = output_format
+        self.format_output = format_output
+        self.settle = settle
+        self.interval = interval
+        self.largest_first = largest_first
+        self.state_path = state_path or os.path.join(output_dir, _STATE_FILE)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.rules = rules
+        self.on_event = on_event
+        self.mode = "polling"
+
+        self.arrivals = 0      # 發現的新檔案數（含內容重複者）
+        self.completed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.max_queued = 0
+
+        self._started = None
+        self._pool = None
+        self._observer = None
+        self._wake = threading.Event()
+        self._seen = {}        # 路徑 → 上一次掃描的 (大小, 修改時間 ns)
+        self._first_seen = {}  # 等待寫入完成的路徑 → 發現時間
+        self._handled = {}     # 已排入佇列或略過的路徑 → 當時的 (大小, 修改時間 ns)
+        self._done = self._load_state()  # 已成功處理的內容雜湊
+        self._claimed = set()  # 佇列中與處理中的內容雜湊
+        self._queue = []       # (優先序, 序號, 工作)
+        self._seq = 0
+        self._running = {}     # future → 工作
+        self._suspects = deque()  # 行程池中止時處理中的工作，等待逐一單獨重試
+        self._generation = 0   # 行程池重建的次數，用來判斷中止的是不是目前的行程池
+        self._latency = deque(maxlen=_LATENCY_SAMPLES)
+        self._wait = deque(maxlen=_LATENCY_SAMPLES)
+
+    def start(self) -> None:
+        """建立輸出目錄、行程池與檔案系統事件監看"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._pool = self._new_pool()
+        self._observer = _start_observer(self.watch_dir, self._wake)
+        self.mode = "polling" if self._observer is None else "watchdog"
+        self._started = time.monotonic()
+
+    def close(self) -> None:
+        """停止監看並等待處理中的檔案完成（佇列中尚未開始的檔案不處理）"""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._reap()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def idle(self) -> bool:
+        """沒有等待寫入完成、排隊或處理中的檔案"""
+        return not (self._first_seen or self._queue or self._running or self._suspects)
+
+    def run_forever(self) -> None:
+        """持續掃描與處理直到中斷"""
+        while True:
+            self.step()
+
+    def step(self, timeout: float | None = None) -> None:
+        """掃描一次、分派工作，並等待有檔案完成、檔案系統事件或逾時（預設 interval 秒）"""
+        self.scan()
+        self._dispatch()
+        self._wake.wait(self.interval if timeout is None else timeout)
+        self._wake.clear()
+        self._reap()
+        self._dispatch()
+
+    def scan(self) -> None:
+        """掃描投放目錄，將寫入完成的新檔案排入佇列"""
+        now = time.time()
+        current = {}
+        for entry in _list_inputs(self.watch_dir):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            current[entry.path] = signature
+            if self._handled.get(entry.path) == signature:
+                continue
+
+            # 第一次看到的檔案一律等下一次掃描確認；保留原修改時間的複製（cp -p、rsync -t）
+            # 寫入中 mtime 可能早已超過 settle，只看檔案年齡會把寫到一半的檔案排入佇列
+            previous = self._seen.get(entry.path)
+            if entry.path not in self._first_seen:
+                self._first_seen[entry.path] = time.monotonic()
+            if previous != signature or now - stat.st_mtime < self.settle:
+                continue   # 仍在寫入中
+            self._accept(entry.path, stat.st_size, signature)
+
+        # 已被移走或刪除的檔案不再追蹤
+        for path in self._seen.keys() - current.keys():
+            self._first_seen.pop(path, None)
+            self._handled.pop(path, None)
+        self._seen = current
+
+    def stats(self) -> dict:
+        """目前的佇列深度、處理量與延遲統計
+
+        latency 為發現檔案到處理完成的秒數，queue_wait 為寫入完成到開始處理的秒數，
+        兩者皆取最近的樣本；arrival_rate 與 completion_rate 為每分鐘的檔案數，
+        後者持續低於前者表示處理速度跟不上投放速度。
+        """
+        uptime = time.monotonic() - self._started if self._started is not None else 0.0
+        minutes = uptime / 60
+        return {
+            "status": "ok",
+            "mode": self.mode,
+            "jobs": self.jobs,
+            "settling": len(self._first_seen),
+            "queued": len(self._queue) + len(self._suspects),
+            "max_queued": self.max_queued,
+            "active": len(self._running),
+            "arrivals": self.arrivals,
+            "completed": self.completed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "uptime": uptime,
+            "arrival_rate": self.arrivals / minutes if minutes > 0 else 0.0,
+            "completion_rate": (self.completed + self.failed) / minutes if minutes > 0 else 0.0,
+            "latency": _summarize(self._latency),
+            "queue_wait": _summarize(self._wait),
+        }
+
+    def _accept(self, path: str, size: int, signature: tuple) -> None:
+        """寫入完成的檔案：內容重複則略過，否則排入佇列"""
+        detected = self._first_seen.pop(path)
+        self._handled[path] = signature
+        self.arrivals += 1
+        try:
+            digest = _file_hash(path)
+        except FileNotFoundError:
+            return
+
+        if digest in self._done or digest in self._claimed:
+            self.duplicates += 1
+            self._emit("duplicate", {"path": path, "sha256": digest})
+            return
+
+        self._claimed.add(digest)
+        task = {"path": path, "sha256": digest, "size": size,
+                "detected": detected, "ready": time.monotonic()}
+        priority = -size if self.largest_first else size
+        heapq.heappush(self._queue, (priority, self._seq, task))
+        self._seq += 1
+        self.max_queued = max(self.max_queued, len(self._queue))
+        self._emit("queued", {"path": path, "size": size, "queued": len(self._queue)})
+
+    def _dispatch(self) -> None:
+        """從佇列取出工作交給行程池，同時執行的檔案數不超過 jobs
+
+        有等待重試的工作時，先逐一單獨執行，找出使行程池中止的檔案後才恢復一般排程。
+        """
+        if self._suspects:
+            if not self._running:
+                self._submit(self._suspects.popleft(), isolated=True)
+            return
+        while self._queue and len(self._running) < self.jobs:
+            _, _, task = heapq.heappop(self._queue)
+            name = os.path.basename(task["path"]) + EXTENSIONS[self.output_format]
+            task["output"] = os.path.join(self.output_dir, name)
+            task["started"] = time.monotonic()
+            self._wait.append(task["started"] - task["ready"])
+            self._submit(task)
+
+    def _submit(self, task: dict, isolated: bool = False) -> None:
+        from concurrent.futures.process import BrokenProcessPool
+
+        args = (task["path"], task["output"], self.format_output, self.workers,
+                self.chunk_size, self.cache, self.rules, self.output_format)
+        try:
+            future = self._pool.submit(process_file, *args)
+        except BrokenProcessPool:
+            # 行程池已中止但處理中的工作還沒收回：先重建，這個工作從未執行，直接交給新的行程池
+            self._restart_pool()
+            future = self._pool.submit(process_file, *args)
+        task["isolated"] = isolated
+        task["generation"] = self._generation
+        future.add_done_callback(lambda _: self._wake.set())
+        self._running[future] = task
+
+    def _reap(self) -> None:
+        """收回已完成的工作，更新計數並記錄成功處理的內容雜湊"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        for future in [f for f in self._running if f.done()]:
+            task = self._running.pop(future)
+            if future.cancelled():
+                self._claimed.discard(task["sha256"])
+                continue
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                if task["generation"] == self._generation:
+                    self._restart_pool()
+                if not task["isolated"]:
+                    self._suspects.append(task)   # 可能只是被同一個行程池波及，稍後單獨重試
+                    continue
+                result = _failed_result(task, e)   # 單獨執行仍使行程池中止
+            except Exception as e:
+                result = _failed_result(task, e)
+            self._finish(task, result)
+
+    def _finish(self, task: dict, result: dict) -> None:
+        """記錄一個檔案的處理結果"""
+        self._claimed.discard(task["sha256"])
+        latency = time.monotonic() - task["detected"]
+        self._latency.append(latency)
+        info = {**result, "sha256": task["sha256"], "latency": latency, "queued": len(self._queue)}
+        if result["error"]:
+            self.failed += 1
+            self._emit("failed", info)
+            return
+
+        self.completed += 1
+        self._done.add(task["sha256"])
+        with open(self.state_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"sha256": task["sha256"], "path": task["path"],
+                                "output": task["output"], "questions": result["questions"],
+                                "finished_at": time.time()}, ensure_ascii=False) + "\n")
+        self._emit("completed", info)
+
+    def _new_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=_ignore_sigint)
+
+    def _restart_pool(self) -> None:
+        """以新的行程池取代已中止的行程池（close() 之後不再建立）"""
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._new_pool()
+        self._generation += 1
+
+    def _load_state(self) -> set:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return {json.loads(line)["sha256"] for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _emit(self, kind: str, info: dict) -> None:
+        if self.on_event is not None:
+            self.on_event(kind, info)
+
+
+def watch(watch_dir: str, output_dir: str, report_interval: float = 60.0, **options) -> None:
+    """監看投放目錄直到中斷（Ctrl+C），每個檔案完成時與每 report_interval 秒輸出狀態到 stderr
+
+    Args:
+        watch_dir: 監看的投放目錄
+        output_dir: 輸出目錄
+        report_interval: 定期輸出佇列與延遲統計的間隔秒數
+        **options: 傳給 WatchDaemon 的設定（jobs、output_format、settle...）
+    """
+    def log(kind, info):
+        if kind == "completed":
+            print(f"[watch] 完成 {info['path']} → {info['output']}（{info['questions']} 題，"
+                  f"延遲 {info['latency']:.1f} s，佇列 {info['queued']}）", file=sys.stderr)
+        elif kind == "failed":
+            print(f"[watch] 失敗 {info['path']}：{info['error']}", file=sys.stderr)
+        elif kind == "duplicate":
+            print(f"[watch] 略過 {info['path']}：內容已處理過", file=sys.stderr)
+
+    daemon = WatchDaemon(watch_dir, output_dir, on_event=log, **options)
+    daemon.start()
+    print(f"[watch] 監看 {watch_dir}（{daemon.mode}，jobs={daemon.jobs}）→ {output_dir}", file=sys.stderr)
+    last_report = time.monotonic()
+    try:
+        while True:
+            daemon.step()
+            if time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                print(f"[watch] {format_stats(daemon.stats())}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        print(f"[watch] {format_stats(daemon.stats())}", file=sys.stderr)
+
+
+def format_stats(stats: dict) -> str:
+    """將 stats() 整理成一行摘要"""
+    latency = stats["latency"]
+    return (f"佇列 {stats['queued']}（最多 {stats['max_queued']}）、處理中 {stats['active']}、"
+            f"寫入中 {stats['settling']}；完成 {stats['completed']}、失敗 {stats['failed']}、"
+            f"重複 {stats['duplicates']}；投放 {stats['arrival_rate']:.1f}/min、"
+            f"處理 {stats['completion_rate']:.1f}/min；延遲 p50 {latency['p50']:.1f} s、"
+            f"p95 {latency['p95']:.1f} s")
+
+
+def _failed_result(task: dict, error: Exception) -> dict:
+    """子行程異常結束時的處理結果（欄位同 batch.process_file()）"""
+    return {"path": task["path"], "output": task["output"], "pages": 0, "questions": 0,
+            "seconds": 0.0, "error": f"{type(error).__name__}: {error}"}
+
+
+def _ignore_sigint() -> None:
+    """子行程忽略 Ctrl+C，由主行程在 close() 中等待處理中的檔案完成後再結束"""
+    import signal
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _list_inputs(watch_dir: str) -> list:
+    """投放目錄第一層中可處理的檔案，依檔名排序（略過隱藏檔與寫入中的暫存檔）"""
+    try:
+        entries = list(os.scandir(watch_dir))
+    except FileNotFoundError:
+        return []
+    return sorted((entry for entry in entries
+                   if not entry.name.startswith(".")
+                   and entry.name.lower().endswith(WATCH_EXTENSIONS)
+                   and entry.is_file()), key=lambda entry: entry.name)
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _summarize(samples) -> dict:
+    """樣本的平均、中位數、p95 與最大值（沒有樣本時皆為 0）"""
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "count": n,
+        "mean": sum(ordered) / n,
+        "p50": ordered[(n - 1) // 2],
+        "p95": ordered[min(n - 1, int(n * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def _start_observer(watch_dir: str, wake: threading.Event):
+    """以 watchdog 監看檔案系統事件，事件發生時喚醒掃描；未安裝 watchdog 時回傳 None"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Wake(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    observer = Observer()
+    observer.schedule(_Wake(), watch_dir, recursive=False)
+    observer.start()
+    return observer
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import batch
+from src.batch import expand_inputs, output_paths, run_batch
+
+
+def write_pdf(path, text: str) -> None:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), text)
+    doc.save(str(path))
+
+
+def crash_on_marker(path, output_path, *args):
+    """模擬讓子行程直接結束的檔案（例如擷取時崩潰）"""
+    if os.path.basename(path).startswith("crash"):
+        os._exit(1)
+    return _process_file(path, output_path, *args)
+
+
+_process_file = batch.process_file
+
+
+def test_expand_inputs_files_dirs_and_globs(tmp_path):
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    a = tmp_path / "a.pdf"
+    b = sub / "b.pdf"
+    for p in (a, b):
+        write_pdf(p, "x")
+    (tmp_path / "notes.txt").write_text("not a pdf")
+
+    files, missing = expand_inputs([str(tmp_path), str(tmp_path / "**" / "*.pdf"), str(tmp_path / "nope.pdf")])
+
+    assert [os.path.abspath(f) for f in files] == [str(a), str(b)]
+    assert missing == [str(tmp_path / "nope.pdf")]
+
+
+def test_output_paths_avoid_name_collisions(tmp_path):
+    paths = output_paths(["x/q.pdf", "y/q.pdf", "z/r.pdf"], str(tmp_path))
+    assert [os.path.basename(p) for p in paths] == ["q.jsonl", "q-2.jsonl", "r.jsonl"]
+
+
+def test_run_batch_isolates_errors(tmp_path):
+    good = tmp_path / "good.pdf"
+    write_pdf(good, "Topic 1\nQuestion #1\nQ?\nA. a\nB. b\nCorrect Answer: B")
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"this is not a pdf")
+    out_dir = tmp_path / "out"
+
+    seen = []
+    summary = run_batch([str(good), str(bad)], str(out_dir), jobs=2, on_result=seen.append)
+
+    assert summary["files"] == 2
+    assert summary["failed"] == 1
+    assert summary["pages"] == 1
+    assert summary["questions"] == 1
+    assert len(seen) == 2
+
+    good_result, bad_result = summary["results"]
+    assert good_result["error"] is None
+    assert bad_result["error"]
+    assert not os.path.exists(bad_result["output"])
+
+    with open(good_result["output"], encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert rows[0]["answer"] == "B"
+
+
+def test_run_batch_survives_crashing_worker(tmp_path, monkeypatch):
+    files = []
+    for name in ("a.pdf", "crash.pdf", "b.pdf", "c.pdf"):
+        write_pdf(tmp_path / name, "Topic 1\nQuestion #1\nQ?\nA. a\nB. b\nCorrect Answer: B")
+        files.append(str(tmp_path / name))
+    monkeypatch.setattr(batch, "process_file", crash_on_marker)
+
+    seen = []
+    summary = run_batch(files, str(tmp_path / "out"), jobs=2, on_result=seen.append)
+
+    # 只有造成子行程結束的檔案記為失敗，同一個行程池中的其他檔案重試後完成
+    assert [r["error"] is not None for r in summary["results"]] == [False, True, False, False]
+    assert "BrokenProcessPool" in summary["results"][1]["error"]
+    assert (summary["failed"], summary["questions"]) == (1, 3)
+    assert len(seen) == 4
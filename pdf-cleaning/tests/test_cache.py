@@ -0,0 +1,101 @@
+import io
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import cache as cache_module
+from src.cache import PageCache, iter_cached_pages
+from src.pdf_reader import iter_pages
+from src.pipeline import run_pipeline
+
+
+def make_pdf_bytes(*pages: str) -> bytes:
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    return doc.write()
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = PageCache(str(tmp_path))
+    pages = ["第一頁\nline two", "", "page with \"quotes\" and \\ slashes"]
+    key = cache.key(b"pdf-bytes")
+
+    assert cache.get(key) is None
+    cache.put(key, pages)
+    assert key in cache
+    assert cache.get(key) == pages
+
+
+def test_key_depends_on_settings(tmp_path):
+    cache = PageCache(str(tmp_path))
+    assert cache.key(b"x", {"a": 1}) != cache.key(b"x", {"a": 2})
+    assert cache.key(b"x", {"a": 1}) != cache.key(b"y", {"a": 1})
+
+    # 提取設定納入快取鍵；預設設定的鍵不變
+    from src.cache import extractor_settings
+    assert extractor_settings("default") == extractor_settings()
+    assert cache.key(b"x", extractor_settings("blocks")) != cache.key(b"x")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10 ** 9)
+    keys = [cache.key(bytes([i])) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, [os.urandom(2000).hex()])
+        os.utime(cache.path(key), (1000 + i, 1000 + i))
+
+    # 讀取最舊的項目會更新使用時間，因此應淘汰第二舊的項目
+    cache.get(keys[0])
+    entry_size = os.path.getsize(cache.path(keys[1]))
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    cache.evict()
+
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert keys[2] in cache
+
+
+def test_warm_run_skips_pymupdf(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path))
+    pdf = make_pdf_bytes("Topic 1\nQuestion #1\nQ?\nA. a\nCorrect Answer: A", "tail page")
+
+    cold = list(iter_cached_pages(io.BytesIO(pdf), cache))
+    assert cold == list(iter_pages(io.BytesIO(pdf)))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PyMuPDF should not be called on a warm cache")
+
+    monkeypatch.setattr(cache_module, "iter_pages", fail)
+    assert list(iter_cached_pages(io.BytesIO(pdf), cache)) == cold
+    assert run_pipeline(io.BytesIO(pdf), cache=cache) == run_pipeline(io.BytesIO(pdf))
+
+
+def test_warm_batch_file_counts_pages_without_pymupdf(tmp_path, monkeypatch):
+    from src import pdf_reader
+    from src.batch import process_file
+
+    cache = PageCache(str(tmp_path / "cache"))
+    pdf = tmp_path / "exam.pdf"
+    pdf.write_bytes(make_pdf_bytes("Topic 1\nQuestion #1\nQ?\nA. a\nCorrect Answer: A", "tail page"))
+    cold = process_file(str(pdf), str(tmp_path / "cold.jsonl"), cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PyMuPDF should not be opened on a warm cache")
+
+    monkeypatch.setattr(pdf_reader, "_open_document", fail)
+    warm = process_file(str(pdf), str(tmp_path / "warm.jsonl"), cache=cache)
+    assert warm["error"] is None
+    assert (warm["pages"], warm["questions"]) == (cold["pages"], cold["questions"]) == (2, 1)
+
+
+def test_clear(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put(cache.key(b"a"), ["x"])
+    cache.put(cache.key(b"b"), ["y"])
+    assert cache.clear() == 2
+    assert cache.size() == 0
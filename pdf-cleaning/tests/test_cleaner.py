@@ -30,3 +30,66 @@ def test_clean_text_verbose_prints(capsys):
     assert "店长微信：wx1" in captured.out
     assert "店长微信：wx2" in captured.out
     assert "replaced_nbsp:" in captured.out
+
+
+def test_iter_clean_pages_accumulates_stats():
+    from src.cleaner import iter_clean_pages
+
+    pages = ["店长微信：wx1 a\xa0", "b\xa0\xa0 店长微信：wx2"]
+    stats = {}
+    cleaned = list(iter_clean_pages(pages, stats=stats))
+
+    assert cleaned == [clean_text(p) for p in pages]
+    assert stats["removed_wechat"] == 2
+    assert stats["removed_wechat_values"] == ["店长微信：wx1", "店长微信：wx2"]
+    assert stats["replaced_nbsp"] == 3
+
+
+def test_rule_set_counts_each_rule_in_one_pass():
+    from src.cleaner import CleaningRule, RuleSet
+
+    rules = RuleSet([
+        CleaningRule("removed_ad", r"AD\[\d+\]", keep_values=True),
+        CleaningRule("replaced_tab", "\t", " ", literal=True),
+        CleaningRule("removed_watermark", "examtopics", flags="i"),
+        CleaningRule("removed_dot", ".", literal=True),
+    ])
+    text, stats = rules.apply("AD[1] a\tb ExamTopics c.d AD[22]\t")
+
+    assert text == " a b  cd  "
+    assert stats == {
+        "removed_ad": 2,
+        "removed_ad_values": ["AD[1]", "AD[22]"],
+        "replaced_tab": 2,
+        "removed_watermark": 1,
+        "removed_dot": 1,
+    }
+
+
+def test_load_rules_from_config(tmp_path):
+    import json
+    from src.cleaner import load_rules
+
+    config = tmp_path / "rules.json"
+    config.write_text(json.dumps([
+        {"name": "removed_page_counter", "pattern": r"^\d+/\d+$", "flags": "m"},
+        {"name": "replaced_nbsp", "pattern": "\xa0", "replacement": " ", "literal": True},
+    ]), encoding="utf-8")
+
+    rules = load_rules(str(config))
+    cleaned, stats = clean_text_with_stats("2/164\nTopic\xa01\n3/164", rules=rules)
+
+    assert cleaned == "\nTopic 1\n"
+    assert stats == {"removed_page_counter": 2, "replaced_nbsp": 1}
+
+
+def test_example_rules_file_matches_defaults_for_builtin_rules():
+    from src.cleaner import load_rules
+
+    path = os.path.join(os.path.dirname(__file__), "..", "rules.example.json")
+    raw = "店长微信：wx1 hi\xa0there"
+    _, stats = clean_text_with_stats(raw, rules=load_rules(path))
+    _, default_stats = clean_text_with_stats(raw)
+
+    for key, value in default_stats.items():
+        assert stats[key] == value
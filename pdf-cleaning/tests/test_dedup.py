@@ -0,0 +1,104 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.dedup import DedupIndex, normalize_text
+from src.question import Question
+
+CHOICES = ("Use Amazon S3 Lifecycle rules", "Use AWS Glue crawlers", "Use Amazon EMR", None, None, None)
+TEXT = ("A company stores application logs in Amazon S3 and needs to reduce storage costs for logs "
+        "that are older than 90 days while keeping them available for compliance audits.")
+
+
+def make_question(topic, number, text=TEXT, choices=CHOICES):
+    return Question(topic, number, text, choices, "A")
+
+
+def test_normalize_text_ignores_case_and_punctuation():
+    a = make_question(1, 1, "Which  service, exactly?")
+    b = make_question(2, 7, "which service exactly")
+    assert normalize_text(a) == normalize_text(b)
+    assert normalize_text(make_question(1, 1, "哪一個服務", (None,) * 6)) == "哪 一 個 服 務"
+
+
+def test_exact_and_near_duplicates_across_batches(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    with DedupIndex(path) as index:
+        first = index.add([make_question(1, 1), make_question(1, 2, "An unrelated question about VPC peering.")],
+                          source="dump-a.pdf")
+    assert first == [None, None]
+
+    reworded = TEXT.replace("reduce storage costs", "lower storage costs")
+    with DedupIndex(path) as index:   # 重新開啟，與磁碟上的既有題庫比對
+        matches = index.add([make_question(3, 40), make_question(3, 41, reworded),
+                             make_question(3, 42, "What is the default TTL of a DNS record?")],
+                            source="dump-b.pdf")
+        assert len(index) == 5
+
+    exact, near, unique = matches
+    assert exact["exact"] and exact["similarity"] == 1.0
+    assert (exact["source"], exact["topic"], exact["number"]) == ("dump-a.pdf", 1, 1)
+    assert not near["exact"] and 0.8 <= near["similarity"] < 1.0
+    assert unique is None
+
+
+def test_iter_unique_drops_duplicates_within_batch():
+    index = DedupIndex()
+    seen = []
+    questions = [make_question(1, 1), make_question(None, 5), make_question(1, 2, "Something else entirely here.")]
+
+    kept = list(index.iter_unique(questions, on_duplicate=lambda q, m: seen.append((q.number, m["id"]))))
+
+    assert [q.number for q in kept] == [1, 2]
+    assert seen == [(5, 1)]
+    assert index.duplicates == 1 and index.exact_duplicates == 1
+
+
+def test_duplicates_are_not_added_to_bands():
+    index = DedupIndex()
+    index.add([make_question(1, 1)], source="dump-a.pdf")
+    bands = index._conn.execute("SELECT COUNT(*) FROM bands").fetchone()[0]
+
+    # 同一份題庫重複投放：重複的題目只記錄重複了哪一題，分桶不會變大，比對結果都指向原題
+    for source in ("dump-b.pdf", "dump-c.pdf"):
+        [match] = index.add([make_question(2, 1)], source=source)
+        assert match["id"] == 1
+    assert index._conn.execute("SELECT COUNT(*) FROM bands").fetchone()[0] == bands
+    assert index._conn.execute("SELECT duplicate_of FROM docs ORDER BY id").fetchall() == [(None,), (1,), (1,)]
+
+
+def test_dict_input_uses_explicit_topic_and_number():
+    index = DedupIndex()
+    choices = dict(zip("ABCDEF", CHOICES))
+    index.add([{"id": "Topic 1 Question #1", "topic": 3, "number": 40, "question": TEXT, "choices": choices}],
+              source="dump-a.pdf")
+
+    # 與 formatter 相同：有 number 欄位時以 topic / number 欄位為準，而非 id 字串
+    [match] = index.add([make_question(1, 1)], source="dump-b.pdf")
+    assert (match["topic"], match["number"]) == (3, 40)
+
+
+def test_questions_without_text_are_never_duplicates():
+    index = DedupIndex()
+    image_only = [make_question(1, n, "", (None,) * 6) for n in (1, 2)]
+
+    # 只有圖片的題目正規化後沒有文字，無從比對：一律保留，也不寫入索引
+    assert index.add([*image_only, make_question(1, 3)]) == [None, None, None]
+    assert len(list(index.iter_unique([make_question(2, 1, " ?! ", (None,) * 6)]))) == 1
+    assert len(index) == 1 and index.duplicates == 0
+
+
+def test_pipeline_dedup_against_existing_index(tmp_path):
+    import fitz
+    from src.pipeline import run_pipeline
+
+    pdf = tmp_path / "dump.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Topic 1\nQuestion #1\nWhat is S3 used for?\nA. storage\nCorrect Answer: A")
+    doc.save(str(pdf))
+
+    index = DedupIndex(str(tmp_path / "index.sqlite"))
+    assert len(run_pipeline(str(pdf), dedup=index)) == 1
+    assert run_pipeline(str(pdf), dedup=index) == []
+    assert list(run_pipeline(str(pdf), dedup=index, stream=True)) == []
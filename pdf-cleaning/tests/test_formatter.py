@@ -55,6 +55,21 @@ def test_format_questions_to_rows():
     assert rows[1]["answer"] == "A"
 
 
+def test_format_dict_with_explicit_topic_and_number():
+    """dict 有 topic / number 欄位時，與 Question.from_dict() 一樣優先於 id 字串"""
+    from src.question import Question
+
+    questions = [
+        {"id": "Topic 1 Question #1", "topic": 2, "number": 7, "question": "Q", "choices": {"A": "a"},
+         "answer": "A"},
+        {"number": 3, "question": "No id", "choices": {}, "answer": "B"},
+    ]
+    rows = format_questions_to_rows(questions)
+
+    assert [(r["Topic"], r["question_id"]) for r in rows] == [("2", "7"), ("NaN", "3")]
+    assert [(q.topic, q.number) for q in map(Question.from_dict, questions)] == [(2, 7), (None, 3)]
+
+
 def test_format_with_real_pipeline():
     """整合測試：從 data PDF 執行完整流程並轉換格式"""
     import glob
@@ -88,3 +103,57 @@ def test_format_with_real_pipeline():
         # 確保欄位都是字串（非 None）
         assert isinstance(row["A"], str)
         assert isinstance(row["answer"], str)
+
+
+SAMPLE_QUESTIONS = [
+    {"id": "Topic 1 Question #1", "question": "Q1", "choices": {"A": "a", "B": "b"}, "answer": "B"},
+    {"id": "Topic NaN Question #2", "question": "Q2", "choices": {"A": "x", "F": "f"}, "answer": "F"},
+    {"id": "garbage", "question": "skip me", "choices": {}, "answer": ""},
+]
+
+
+def test_format_questions_to_columns_pandas():
+    import pytest
+    pd = pytest.importorskip("pandas")
+    from src.formatter import COLUMNS, format_questions_to_columns
+
+    df = format_questions_to_columns(SAMPLE_QUESTIONS)
+
+    assert list(df.columns) == COLUMNS
+    assert len(df) == 2
+    assert str(df["Topic"].dtype) == "Int32"
+    assert df["Topic"].iloc[0] == 1
+    assert df["Topic"].isna().tolist() == [False, True]
+    assert df["question_id"].dtype == "int64"
+    assert df["question_id"].tolist() == [1, 2]
+    assert df["F"].tolist() == ["", "f"]
+
+    # 與 dict 資料列的內容一致（Topic/question_id 以外的欄位）
+    rows = format_questions_to_rows(SAMPLE_QUESTIONS)
+    for col in COLUMNS[2:]:
+        assert df[col].tolist() == [r[col] for r in rows]
+
+
+def test_format_questions_to_columns_arrow():
+    import pytest
+    pa = pytest.importorskip("pyarrow")
+    from src.formatter import format_questions_to_columns
+
+    table = format_questions_to_columns(iter(SAMPLE_QUESTIONS), backend="arrow")
+
+    assert table.num_rows == 2
+    assert table.schema.field("Topic").type == pa.int32()
+    assert table.schema.field("question_id").type == pa.int64()
+    assert table.column("Topic").to_pylist() == [1, None]
+    assert table.column("answer").to_pylist() == ["B", "F"]
+
+
+def test_format_questions_from_question_records():
+    from src.question import Question
+
+    questions = [Question(2, 7, "Q", ("a", "b", None, None, None, None), "B")]
+    rows = format_questions_to_rows(questions)
+    assert rows == [{
+        "Topic": "2", "question_id": "7", "question": "Q",
+        "A": "a", "B": "b", "C": "", "D": "", "E": "", "F": "", "answer": "B",
+    }]
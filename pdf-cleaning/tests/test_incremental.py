@@ -0,0 +1,178 @@
+import os
+import random
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.incremental import run_incremental
+from src.pipeline import run_pipeline
+
+
+def write_pdf(path, pages: list) -> None:
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((40, 40), text, fontsize=8)
+    doc.save(str(path))
+
+
+PAGES = [
+    "Topic 1\nQuestion #1\nFirst question\nA. a1\nB. b1\nCorrect Answer: A",
+    "Question #2\nSecond question spans\nA. a2",
+    "B. b2\nCorrect Answer: B\nQuestion #3\nThird\nA. a3\nCorrect Answer: A",
+    "Topic 2",
+    "Question #1\nFourth\nA. a4\nCorrect Answer: A",
+]
+
+
+def test_first_run_matches_full_pipeline(tmp_path):
+    pdf = tmp_path / "bank.pdf"
+    write_pdf(pdf, PAGES)
+
+    result = run_incremental(str(pdf), str(tmp_path / "state.json.gz"))
+
+    assert result["full"]
+    assert result["extracted"] == len(PAGES)
+    assert result["rows"] == run_pipeline(str(pdf))
+    assert len(result["diff"]["added"]) == 4
+
+
+def test_unchanged_pdf_skips_extraction(tmp_path):
+    pdf = tmp_path / "bank.pdf"
+    state = str(tmp_path / "state.json.gz")
+    write_pdf(pdf, PAGES)
+    first = run_incremental(str(pdf), state)
+
+    again = run_incremental(str(pdf), state)
+
+    assert not again["full"]
+    assert again["extracted"] == 0 and again["reparsed"] == 0
+    assert again["rows"] == first["rows"]
+    assert again["diff"] == {"added": [], "changed": [], "removed": []}
+
+
+def test_changed_page_reparses_only_affected_questions(tmp_path):
+    pdf = tmp_path / "bank.pdf"
+    state = str(tmp_path / "state.json.gz")
+    write_pdf(pdf, PAGES)
+    run_incremental(str(pdf), state)
+
+    revised = list(PAGES)
+    revised[2] = "B. b2 revised\nCorrect Answer: B"   # 第 2 題的後半頁改版、第 3 題被刪除
+    write_pdf(pdf, revised)
+    result = run_incremental(str(pdf), state)
+
+    assert result["extracted"] == 1
+    assert result["reparsed"] == 2          # 第 2 題橫跨的兩頁
+    assert result["rows"] == run_pipeline(str(pdf))
+
+    diff = result["diff"]
+    assert [(c["after"].topic, c["after"].number) for c in diff["changed"]] == [(None, 2)]
+    assert diff["changed"][0]["after"].choices[1] == "b2 revised"
+    assert [(q.topic, q.number) for q in diff["removed"]] == [(None, 3)]
+    assert diff["added"] == []
+
+
+def test_inserted_and_deleted_pages(tmp_path):
+    pdf = tmp_path / "bank.pdf"
+    state = str(tmp_path / "state.json.gz")
+    write_pdf(pdf, PAGES)
+    run_incremental(str(pdf), state)
+
+    revised = PAGES[:1] + ["Question #9\nInserted\nA. x\nCorrect Answer: A"] + PAGES[1:3] + PAGES[4:]
+    write_pdf(pdf, revised)
+    result = run_incremental(str(pdf), state)
+
+    assert result["extracted"] == 1
+    assert result["rows"] == run_pipeline(str(pdf))
+    # 刪除 "Topic 2" 頁後，原本的 Topic 2 Question #1 變成 NaN 主題
+    assert {(q.topic, q.number) for q in result["diff"]["added"]} == {(None, 9), (None, 1)}
+    assert [(q.topic, q.number) for q in result["diff"]["removed"]] == [(2, 1)]
+
+
+def test_random_revisions_match_full_pipeline(tmp_path):
+    rng = random.Random(0)
+
+    def random_page():
+        lines = []
+        for _ in range(rng.randint(0, 6)):
+            r = rng.random()
+            if r < 0.1:
+                lines.append(f"Topic {rng.randint(1, 3)}")
+            elif r < 0.3:
+                lines.append(f"Question #{rng.randint(1, 20)}")
+            elif r < 0.45:
+                lines.append(f"{rng.choice('ABCD')}. option {rng.randint(0, 9)}")
+            elif r < 0.55:
+                lines.append(f"Correct Answer: {rng.choice('ABCD')}")
+            else:
+                lines.append(f"text {rng.randint(0, 99)}")
+        return "\n".join(lines)
+
+    pdf = tmp_path / "bank.pdf"
+    for trial in range(15):
+        state = str(tmp_path / f"state{trial}.json.gz")
+        pages = [random_page() for _ in range(rng.randint(1, 6))]
+        write_pdf(pdf, pages)
+        run_incremental(str(pdf), state, format_output=False)
+
+        for _ in range(3):
+            op = rng.random()
+            if op < 0.4 or len(pages) < 2:
+                pages[rng.randrange(len(pages))] = random_page()
+            elif op < 0.7:
+                pages.insert(rng.randrange(len(pages) + 1), random_page())
+            else:
+                del pages[rng.randrange(len(pages))]
+            write_pdf(pdf, pages)
+
+            result = run_incremental(str(pdf), state, format_output=False)
+            assert result["rows"] == list(run_pipeline(str(pdf), format_output=False, stream=True))
+
+
+def test_changed_rules_force_full_run(tmp_path):
+    from src.cleaner import CleaningRule, RuleSet
+
+    pdf = tmp_path / "bank.pdf"
+    state = str(tmp_path / "state.json.gz")
+    write_pdf(pdf, PAGES)
+    run_incremental(str(pdf), state)
+
+    rules = RuleSet([CleaningRule("removed_first", "First ", "")])
+    result = run_incremental(str(pdf), state, rules=rules)
+
+    assert result["full"]
+    assert result["rows"][0]["question"].startswith("question")
+
+
+def test_extraction_profile_matches_full_pipeline(tmp_path):
+    from src.pdf_reader import with_margins
+
+    def write_with_footer(pages):
+        doc = fitz.open()
+        for text in pages:
+            page = doc.new_page()
+            page.insert_text((40, 100), text, fontsize=8)
+            page.insert_text((40, 830), "Exam dump footer", fontsize=8)
+        doc.save(str(pdf))
+
+    pdf = tmp_path / "bank.pdf"
+    state = str(tmp_path / "state.json.gz")
+    write_with_footer(PAGES)
+    margins = with_margins("default", 0, 0.05)
+
+    result = run_incremental(str(pdf), state, extraction=margins)
+    assert result["rows"] == run_pipeline(str(pdf), extraction=margins) != run_pipeline(str(pdf))
+
+    # 改版的頁面以同一個提取設定重新提取
+    write_with_footer(PAGES[:4] + ["Question #1\nFourth revised\nA. a4\nCorrect Answer: A"])
+    result = run_incremental(str(pdf), state, extraction=margins)
+    assert (result["full"], result["extracted"]) == (False, 1)
+    assert result["rows"] == run_pipeline(str(pdf), extraction=margins)
+    assert "footer" not in str(result["rows"])
+
+    # 提取設定變更時完整處理
+    assert run_incremental(str(pdf), state)["full"]
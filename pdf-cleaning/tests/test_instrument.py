@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.instrument import Collector
+
+
+def slow_source(n: int, delay: float):
+    for i in range(n):
+        time.sleep(delay)
+        yield "x" * (i + 1)
+
+
+def test_wrap_attributes_exclusive_time_per_stage():
+    collector = Collector(memory=False)
+    upstream = collector.wrap("extract", slow_source(3, 0.02), count="pages", size="chars_out")
+
+    def downstream(items):
+        for item in items:
+            time.sleep(0.01)
+            yield item.upper()
+
+    out = list(collector.wrap("clean", downstream(upstream), count="pages"))
+    report = collector.report()["stages"]
+
+    assert out == ["X", "XX", "XXX"]
+    assert list(report) == ["extract", "clean"]
+    assert report["extract"]["pages"] == 3
+    assert report["extract"]["chars_out"] == 6
+    # 上游的 sleep 只算在 extract，不會重複計入 clean
+    assert report["extract"]["wall_s"] >= 0.06
+    assert 0.03 <= report["clean"]["wall_s"] < 0.06
+    assert "peak_bytes" not in report["extract"]
+
+
+def test_stage_context_and_memory_peak():
+    collector = Collector(memory=True)
+    with collector.stage("alloc"):
+        data = [bytes(1024) for _ in range(1000)]
+    collector.add("alloc", items_out=len(data))
+    collector.stop()
+
+    stats = collector.report()["stages"]["alloc"]
+    assert stats["items_out"] == 1000
+    assert stats["peak_bytes"] >= 1000 * 1024
+
+
+def test_run_pipeline_with_collector_matches_plain_run():
+    import glob
+    import pytest
+    from src.pipeline import run_pipeline
+
+    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+    pdf_paths = glob.glob(os.path.join(data_dir, "*.pdf"))
+    if not pdf_paths:
+        pytest.skip("No PDF files found in data/")
+
+    collector = Collector()
+    rows = run_pipeline(pdf_paths[0], collector=collector)
+    assert rows == run_pipeline(pdf_paths[0])
+
+    stages = collector.report()["stages"]
+    assert list(stages) == ["extract", "clean", "parse", "format"]
+    assert stages["extract"]["pages"] > 0
+    assert stages["parse"]["lines_in"] > 0
+    assert stages["parse"]["questions_out"] == len(rows)
+    assert stages["format"]["rows_out"] == len(rows)
+
+
+def test_stream_collector_stops_when_consumer_stops_early(tmp_path):
+    import tracemalloc
+
+    from src.pipeline import run_pipeline
+
+    assert not Collector().memory   # 預設不啟用 tracemalloc
+    path = tmp_path / "exam.txt"
+    path.write_text("Question #1\nQ\nCorrect Answer: A\nQuestion #2\nQ\nCorrect Answer: B\n",
+                    encoding="utf-8")
+
+    collector = Collector(memory=True)
+    rows = run_pipeline(str(path), stream=True, collector=collector)
+    next(rows)
+    assert tracemalloc.is_tracing()
+    rows.close()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,129 @@
+import os
+import sys
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.jobs as jobs_module
+from src.jobs import run_job
+from src.parser import QuestionParser
+from src.pipeline import run_pipeline
+
+PAGES = [
+    "Topic 1\nQuestion #1\nFirst question\nA. a1\nB. b1\nCorrect Answer: A",
+    "Question #2\nSecond question spans",
+    "the chunk boundary\nA. a2\nB. b2\nCorrect Answer: B",
+    "Topic 2",
+    "Question #1\nFourth\nA. a4\nCorrect Answer: A",
+    "Question #2\nLast question without answer\nA. a5",
+]
+
+
+def write_pdf(path, pages: list) -> None:
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((40, 40), text, fontsize=8)
+    doc.save(str(path))
+
+
+def test_parser_state_roundtrip():
+    parser = QuestionParser()
+    for line in ["Topic 3", "Question #4", "Half a question"]:
+        parser.feed_line(line)
+
+    resumed = QuestionParser()
+    resumed.set_state(parser.get_state())
+    for p in (parser, resumed):
+        p.feed_line("A. choice")
+        p.close()
+
+    assert list(resumed) == list(parser)
+
+
+def test_chunks_match_full_pipeline_and_resume(tmp_path):
+    pdf = tmp_path / "bank.pdf"
+    write_pdf(pdf, PAGES)
+    ckpt = str(tmp_path / "ckpt")
+
+    first = run_job(str(pdf), ckpt, chunk_pages=2)
+    assert first["rows"] == run_pipeline(str(pdf))
+    assert (first["chunks"], first["resumed"], first["quarantine"]) == (3, 0, [])
+
+    again = run_job(str(pdf), ckpt, chunk_pages=2, format_output=False)
+    assert again["resumed"] == 3
+    assert again["rows"] == run_pipeline(str(pdf), format_output=False)
+
+    # 不同的分段設定會讓舊檢查點失效
+    assert run_job(str(pdf), ckpt, chunk_pages=4)["resumed"] == 0
+
+
+def test_extraction_profile_matches_full_pipeline(tmp_path):
+    from src.pdf_reader import with_margins
+
+    pdf = tmp_path / "bank.pdf"
+    doc = fitz.open()
+    for text in PAGES:
+        page = doc.new_page()
+        page.insert_text((40, 100), text, fontsize=8)
+        page.insert_text((40, 830), "Exam dump footer", fontsize=8)
+    doc.save(str(pdf))
+    ckpt = str(tmp_path / "ckpt")
+    margins = with_margins("blocks", 0, 0.05)
+
+    # 分段提取與單檔模式使用同一個提取設定
+    result = run_job(str(pdf), ckpt, chunk_pages=2, extraction=margins)
+    assert result["rows"] == run_pipeline(str(pdf), extraction=margins) != run_pipeline(str(pdf))
+    assert "footer" not in str(result["rows"])
+
+    # 提取設定不同時舊檢查點失效
+    assert run_job(str(pdf), ckpt, chunk_pages=2)["resumed"] == 0
+
+
+def test_failing_page_is_quarantined(tmp_path, monkeypatch):
+    pdf = tmp_path / "bank.pdf"
+    write_pdf(pdf, PAGES)
+    real = jobs_module.iter_page_range
+
+    def broken_page_4(source, start, end, extraction=None):
+        for page, text, error in real(source, start, end, extraction):
+            yield (page, None, "RuntimeError: bad page") if page == 4 else (page, text, error)
+
+    monkeypatch.setattr(jobs_module, "iter_page_range", broken_page_4)
+    result = run_job(str(pdf), str(tmp_path / "ckpt"), chunk_pages=2)
+
+    blank = tmp_path / "blank.pdf"
+    write_pdf(blank, PAGES[:4] + [""] + PAGES[5:])
+    assert result["quarantine"] == [{"page": 4, "error": "RuntimeError: bad page"}]
+    assert result["rows"] == run_pipeline(str(blank))
+
+
+def test_interrupted_run_resumes_and_isolates_crashing_page(tmp_path, monkeypatch):
+    """模擬行程在第 3 頁被終止：第二次逐頁記錄進度，第三次隔離該頁並完成"""
+    pdf = tmp_path / "bank.pdf"
+    write_pdf(pdf, PAGES)
+    ckpt = str(tmp_path / "ckpt")
+    real = jobs_module.iter_page_range
+
+    def crash_on_page_3(source, start, end, extraction=None):
+        for page, text, error in real(source, start, end, extraction):
+            if page == 3:
+                raise KeyboardInterrupt   # 無法攔截的中斷（例如被 OOM killer 終止）
+            yield page, text, error
+
+    monkeypatch.setattr(jobs_module, "iter_page_range", crash_on_page_3)
+    for _ in range(2):
+        with pytest.raises(KeyboardInterrupt):
+            run_job(str(pdf), ckpt, chunk_pages=2)
+
+    chunks = []
+    result = run_job(str(pdf), ckpt, chunk_pages=2, on_chunk=chunks.append)
+
+    assert [c["resumed"] for c in chunks] == [True, False, False]
+    assert [q["page"] for q in result["quarantine"]] == [3]
+    blank = tmp_path / "blank.pdf"
+    write_pdf(blank, PAGES[:3] + [""] + PAGES[4:])
+    assert result["rows"] == run_pipeline(str(blank))   # 隔離的 "Topic 2" 頁視為空白頁
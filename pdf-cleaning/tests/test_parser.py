@@ -206,3 +206,200 @@ Correct Answer: A
 
     if os.getenv("DEBUG_PARSER"):
         print_parsed(parsed)
+
+
+def test_iter_questions_yields_incrementally():
+    from src.parser import iter_questions
+
+    lines = iter("Topic 1\nQuestion #1\nQ one\nA. a\nCorrect Answer: A\nQuestion #2\nQ two\nA. b".splitlines())
+    gen = iter_questions(lines)
+
+    first = next(gen)
+    assert first["id"] == "Topic 1 Question #1"
+    assert first["answer"] == "A"
+
+    rest = list(gen)
+    assert [q["id"] for q in rest] == ["Topic NaN Question #2"]
+
+
+def test_question_parser_chunks_split_mid_line():
+    from src.parser import QuestionParser
+
+    text = """Topic 4
+Question #9
+Which option is right across
+a chunk boundary?
+A. Alpha Most Voted
+B. Beta that wraps
+onto a second line
+Correct Answer: B
+Question #10
+Next
+A. x
+Correct Answer: A
+"""
+    expected = parse_questions(text)
+
+    for size in (1, 3, 7, 50):
+        parser = QuestionParser()
+        got = []
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+            got.extend(parser)
+        parser.close()
+        got.extend(parser)
+        assert got == expected
+
+
+def test_question_parser_emits_on_correct_answer():
+    from src.parser import QuestionParser
+
+    parser = QuestionParser()
+    parser.feed("Topic 1\nQuestion #1\nQ text\nA. a\nB. b\n")
+    assert list(parser) == []
+
+    parser.feed("Correct Answer: B\n")
+    done = list(parser)
+    assert len(done) == 1
+    assert done[0]["answer"] == "B"
+    assert done[0]["choices"] == {"A": "a", "B": "b"}
+
+    parser.close()
+    assert list(parser) == []
+
+
+def test_classify_line_kinds():
+    from src.parser import classify_line, TOPIC, QUESTION, ANSWER, OPTION, TEXT
+
+    assert classify_line("Topic 2")[0] is TOPIC
+    assert classify_line("Question # 15")[0] is QUESTION
+    assert classify_line("Correct Answer: BD")[1].group("answer") == "BD"
+    kind, m = classify_line("C. Use a gateway endpoint Most Voted")
+    assert kind is OPTION and m.group("key") == "C"
+    assert classify_line("A data engineer must ...")[0] is TEXT
+    assert classify_line("Community vote distribution")[0] is TEXT
+
+
+def test_question_record_is_compact_and_dict_compatible():
+    from src.question import Question
+
+    q = parse_questions("Topic 1\nQuestion #3\nQ text\nA. a\nC. c\nCorrect Answer: C\n")[0]
+    assert isinstance(q, Question)
+    assert not hasattr(q, "__dict__")
+    assert q.choices == ("a", None, "c", None, None, None)
+
+    # 舊的 dict 式存取仍可使用
+    assert q["id"] == "Topic 1 Question #3"
+    assert q["choices"] == {"A": "a", "C": "c"}
+    assert q.get("missing") is None
+    # 可存取的鍵與 keys()、to_dict() 一致；topic / number 只是屬性
+    assert all(key in q for key in q.keys()) and list(q.keys()) == list(q.to_dict())
+    assert "topic" not in q and "number" not in q and q.get("topic") is None
+    assert dict(q) == q.to_dict()
+    assert q == {"id": "Topic 1 Question #3", "question": q.question,
+                 "choices": {"A": "a", "C": "c"}, "answer": "C"}
+    assert Question.from_dict(q.to_dict()) == q
+
+
+def test_parse_questions_as_dict():
+    parsed = parse_questions("Question #1\nQ\nA. a\nCorrect Answer: A\n", as_dict=True)
+    assert parsed == [{"id": "Topic NaN Question #1", "question": parsed[0]["question"],
+                       "choices": {"A": "a"}, "answer": "A"}]
+    assert type(parsed[0]) is dict
+
+
+def test_parse_structured_topic_and_number():
+    text = "Topic 3\nQuestion #12\nQ\nCorrect Answer: A\nQuestion #4\nQ\nCorrect Answer: B\n"
+    first, second = parse_questions(text)
+
+    assert (first.topic, first.number) == (3, 12)
+    assert first.id == "Topic 3 Question #12"
+    # 沒有 Topic 行的題目屬於 NaN 主題
+    assert (second.topic, second.number) == (None, 4)
+    assert second.id == "Topic NaN Question #4"
+    assert sorted([first, second], key=lambda q: q.key) == [second, first]
+
+
+def test_question_parser_tracks_source_pages():
+    from src.parser import QuestionParser
+
+    pages = ["Topic 1", "Question #1\nQ\nA. a", "B. b\nCorrect Answer: B\nQuestion #2\nQ2"]
+    parser = QuestionParser(track_pages=True)
+    for i, page in enumerate(pages):
+        parser.page = i
+        parser.feed(page + "\n")
+    assert parser.busy
+    parser.close()
+
+    result = [(q.number, span) for q, span in parser.iter_with_pages()]
+    # Topic 行所在頁算作題目的起始頁
+    assert result == [(1, (0, 2)), (2, (2, 2))]
+    assert not parser.busy
+
+
+def test_buffer_parse_matches_line_parser():
+    import pickle
+
+    from src.parser import QuestionParser
+    from src.question import LazyQuestion, Question
+
+    text = ("Topic 2\r\nQuestion #1\n  first line  \n\n second line\f"
+            "A. yes  Most Voted\n  still A\nB. no\nCorrect Answer: A\n"
+            "Question #2\nQ2\nTopic 3\nA. a\n")
+    parser = QuestionParser()
+    parser.feed(text)
+    parser.close()
+    expected = list(parser)
+
+    parsed = parse_questions(text)
+    assert all(type(q) is LazyQuestion for q in parsed)
+    assert parsed == expected
+    assert parsed[0].question == "first line second line "
+    assert parsed[0].choices[:2] == ("yes still A", "no")
+
+    # pickle 時組出文字，轉成不帶緩衝區的一般 Question
+    restored = pickle.loads(pickle.dumps(parsed[1]))
+    assert type(restored) is Question and restored == expected[1]
+
+
+def test_buffer_questions_know_their_pages():
+    from src.textbuffer import PageBuffer
+
+    pages = ["Topic 1", "Question #1\nQ\nA. a", "", "B. b\nCorrect Answer: B\nQuestion #2\nQ2"]
+    buffer = PageBuffer.from_pages(pages)
+    assert buffer.pages == 4 and buffer.page_at(len(buffer) - 1) == 3
+
+    first, second = parse_questions(buffer)
+    assert first.choices[:2] == ("a", "b")
+    assert (first.pages, second.pages) == ((0, 3), (3, 3))
+
+
+def test_parallel_parse_matches_serial_on_synthetic_corpora():
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+    from synth import make_exam_text
+
+    for seed in range(3):
+        text = make_exam_text(400, seed)
+        serial = parse_questions(text)
+        # 分片極小：幾乎每題都是一個分片，Topic 行常落在分片結尾
+        parallel = parse_questions(text, workers=2, shard_size=300)
+        assert parallel == serial
+        assert [q.key for q in parallel] == [q.key for q in serial]
+        assert [q.pages for q in parallel] == [q.pages for q in serial]
+
+    text = "Question #1\nQ1\nA. a\nTopic 4\n\nQuestion #2\nQ2\nCorrect Answer: A\nTopic 5\n"
+    parallel = parse_questions(text, workers=2, shard_size=1)
+    assert [q.id for q in parallel] == ["Topic NaN Question #1", "Topic 4 Question #2"]
+    assert parallel == parse_questions(text)
+
+
+def test_parallel_parse_leaves_gc_state_alone(monkeypatch):
+    import gc
+
+    # 嵌入在伺服器或監看程式中時，解析不應改變整個行程（其他執行緒也看得到）的垃圾回收狀態
+    calls = []
+    monkeypatch.setattr(gc, "disable", lambda: calls.append("disable"))
+    monkeypatch.setattr(gc, "freeze", lambda: calls.append("freeze"))
+    text = "Topic 1\nQuestion #1\nQ1\nA. a\nCorrect Answer: A\nQuestion #2\nQ2\nCorrect Answer: B\n"
+    assert len(parse_questions(text, workers=2, shard_size=1)) == 2
+    assert calls == [] and gc.isenabled()
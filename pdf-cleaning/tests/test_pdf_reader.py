@@ -1,3 +1,4 @@
+import glob
 import io
 import os
 import sys
@@ -65,3 +66,114 @@ def test_read_pdf_from_data_dir():
             print(f"\n--- {os.path.basename(p)} (first 500 chars) ---\n")
             print(extracted[:500])
             print('\n--- end ---\n')
+
+
+def test_read_pdf_parallel_preserves_page_order():
+    from src.pdf_reader import iter_pages
+
+    doc = fitz.open()
+    for i in range(7):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page marker {i}")
+    file_bytes = doc.write()
+
+    serial = list(iter_pages(io.BytesIO(file_bytes)))
+    parallel = list(iter_pages(io.BytesIO(file_bytes), workers=3, chunk_size=2))
+
+    assert parallel == serial
+    assert [f"Page marker {i}" in t for i, t in enumerate(parallel)] == [True] * 7
+    assert read_pdf(io.BytesIO(file_bytes), workers=2) == read_pdf(io.BytesIO(file_bytes))
+
+
+def test_read_pdf_accepts_path_memoryview_and_mmap(tmp_path):
+    import mmap
+
+    pdf_path = tmp_path / "sample.pdf"
+    pdf_path.write_bytes(make_pdf_bytes("Zero copy input").getvalue())
+    expected = read_pdf(io.BytesIO(pdf_path.read_bytes()))
+
+    assert read_pdf(str(pdf_path)) == expected
+    assert read_pdf(pdf_path) == expected
+    assert read_pdf(memoryview(pdf_path.read_bytes())) == expected
+
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert read_pdf(mm) == expected
+        assert read_pdf(mm, workers=2, chunk_size=1) == expected
+
+
+def test_as_source_does_not_copy_bytesio():
+    from src.pdf_reader import as_source
+
+    buf = make_pdf_bytes("x")
+    source = as_source(buf)
+    # BytesIO 應以 memoryview 直接共用底層緩衝區
+    assert isinstance(source, memoryview)
+    assert source.nbytes == len(buf.getvalue())
+    source.release()
+
+
+def test_iter_text_pages_splits_on_form_feed(tmp_path):
+    from src.pdf_reader import count_pages, is_text_input, iter_text_pages
+
+    path = tmp_path / "pages.txt"
+    path.write_text("page one\n\fpage two\n\f", encoding="utf-8")
+
+    assert is_text_input(str(path)) and is_text_input("-") and not is_text_input("exam.pdf")
+    assert list(iter_text_pages(str(path))) == ["page one\n", "page two\n"]
+    assert count_pages(path) == 2
+    assert list(iter_text_pages(io.StringIO("no separator"))) == ["no separator"]
+
+
+def test_extraction_profiles(tmp_path):
+    import pytest
+
+    from src.pdf_reader import (ExtractionProfile, extract_pages, get_extraction, iter_page_range, iter_pages,
+                                with_margins)
+
+    doc = fitz.open()
+    page = doc.new_page()   # 595 x 842
+    page.insert_text((72, 20), "HEADER exam dump")
+    page.insert_text((72, 400), "Question #1\nBody text\nA. yes")
+    page.insert_text((72, 830), "FOOTER page 1")
+    path = tmp_path / "page.pdf"
+    doc.save(str(path))
+
+    default = list(iter_pages(str(path)))
+    assert "HEADER" in default[0] and "FOOTER" in default[0]
+    assert list(iter_pages(str(path), extraction="blocks")) == default
+
+    body = list(iter_pages(str(path), extraction=with_margins("default", 0.06, 0.06)))
+    assert "HEADER" not in body[0] and "FOOTER" not in body[0]
+    assert "Question #1\nBody text\nA. yes" in body[0]
+
+    # 平行模式的 worker 使用同一個提取設定
+    top = ExtractionProfile("top", clip=(0, 0, 1, 0.1))
+    assert list(iter_pages(str(path), workers=2, extraction=top)) == ["HEADER exam dump\n"]
+    # 只提取部分頁面時也套用提取設定（增量處理與工作模式）
+    assert extract_pages(str(path), [0], extraction=top) == {0: "HEADER exam dump\n"}
+    assert list(iter_page_range(str(path), 0, 1, extraction=top)) == [(0, "HEADER exam dump\n", None)]
+
+    with pytest.raises(ValueError):
+        get_extraction("missing")
+    with pytest.raises(ValueError):
+        with_margins(None, 0.6, 0.5)
+
+
+def test_named_extraction_profiles_parse_like_default(tmp_path):
+    """具名的提取設定解析出的題目必須與預設設定相同（範例 PDF 與合成題庫）"""
+    from src.pdf_reader import EXTRACTION_PROFILES
+    from src.pipeline import run_pipeline
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks")))
+    from synth import write_exam_pdf
+
+    synthetic = tmp_path / "exam.pdf"
+    write_exam_pdf(str(synthetic), 300, seed=5)
+    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+    pdfs = [str(synthetic)] + sorted(glob.glob(os.path.join(data_dir, "*.pdf")))
+
+    for pdf in pdfs:
+        expected = run_pipeline(pdf)
+        assert expected
+        for name in EXTRACTION_PROFILES:
+            assert run_pipeline(pdf, extraction=name) == expected, (name, pdf)
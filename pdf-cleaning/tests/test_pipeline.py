@@ -0,0 +1,124 @@
+import glob
+import io
+import os
+import sys
+import types
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.pipeline import run_pipeline
+
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+
+def make_multipage_pdf(pages: list) -> bytes:
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    return doc.write()
+
+
+def test_stream_returns_generator():
+    pdf = make_multipage_pdf(["Topic 1\nQuestion #1\nQ?\nA. a\nCorrect Answer: A"])
+    result = run_pipeline(io.BytesIO(pdf), stream=True)
+    assert isinstance(result, types.GeneratorType)
+    rows = list(result)
+    assert len(rows) == 1
+    assert rows[0]["answer"] == "A"
+
+
+def test_stream_question_spanning_pages():
+    """題目跨頁時，串流模式仍需延續解析狀態"""
+    pdf = make_multipage_pdf([
+        "Topic 2\nQuestion #7\nFirst half of the question",
+        "second half\nA. yes\nB. no\nCorrect Answer: B",
+    ])
+    expected = run_pipeline(io.BytesIO(pdf), format_output=False)
+    streamed = list(run_pipeline(io.BytesIO(pdf), format_output=False, stream=True))
+
+    assert streamed == expected
+    assert streamed[0]["id"] == "Topic 2 Question #7"
+    assert "second half" in streamed[0]["question"]
+
+
+def test_stream_matches_batch_on_data_pdfs():
+    pdf_paths = glob.glob(os.path.join(DATA_DIR, "*.pdf"))
+    if not pdf_paths:
+        pytest.skip("No PDF files found in data/")
+
+    for p in pdf_paths:
+        with open(p, "rb") as f:
+            file_bytes = f.read()
+
+        expected = run_pipeline(io.BytesIO(file_bytes))
+        streamed = list(run_pipeline(io.BytesIO(file_bytes), stream=True))
+        assert streamed == expected
+
+
+def test_synthetic_exam_pdf_roundtrip(tmp_path):
+    """合成 PDF 經完整流程後，應與直接解析合成文字的結果相同"""
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks")))
+    from synth import make_exam_text, write_exam_pdf
+    from src.cleaner import clean_text
+    from src.parser import parse_questions
+
+    pdf_path = tmp_path / "exam.pdf"
+    pages = write_exam_pdf(str(pdf_path), 40, seed=3)
+    assert pages >= 2
+
+    expected = parse_questions(clean_text(make_exam_text(40, seed=3)))
+    assert len(expected) == 40
+    assert run_pipeline(str(pdf_path), format_output=False) == expected
+
+
+def test_text_input_matches_pdf_without_loading_pymupdf(tmp_path):
+    """已提取的文字（\\f 分頁）與 PDF 結果相同，且整個流程不會匯入 PyMuPDF"""
+    import subprocess
+    from src.pdf_reader import iter_pages
+
+    pdf = make_multipage_pdf([
+        "Topic 2\nQuestion #7\nFirst half of the question",
+        "second half\nA. yes\nB. no\nCorrect Answer: B",
+    ])
+    txt = tmp_path / "pages.txt"
+    txt.write_text("\f".join(iter_pages(pdf)), encoding="utf-8")
+
+    assert run_pipeline(str(txt)) == run_pipeline(io.BytesIO(pdf))
+    assert list(run_pipeline(str(txt), stream=True)) == run_pipeline(io.BytesIO(pdf))
+
+    script = (
+        "import sys\n"
+        "from src.pipeline import run_pipeline\n"
+        f"rows = run_pipeline({str(txt)!r})\n"
+        "assert rows and rows[0]['question_id'] == '7', rows\n"
+        "loaded = [m for m in ('fitz', 'pymupdf') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
+
+
+def test_parallel_parse_is_opt_in(monkeypatch):
+    import src.pipeline as pipeline
+
+    calls = []
+    real_parse = pipeline.parse_questions
+
+    def spy(buffer, workers=None):
+        calls.append(workers)
+        return real_parse(buffer, workers=workers, shard_size=1)
+
+    monkeypatch.setattr(pipeline, "parse_questions", spy)
+    pdf = make_multipage_pdf(["Topic 1\nQuestion #1\nQ1\nA. a\nCorrect Answer: A\n"
+                              "Question #2\nQ2\nA. b\nCorrect Answer: A"])
+
+    # --workers 只用於提取；題目解析需另外以 parse_workers 開啟
+    serial = run_pipeline(io.BytesIO(pdf), workers=2)
+    parallel = run_pipeline(io.BytesIO(pdf), parse_workers=2)
+    assert calls == [None, 2]
+    assert parallel == serial and len(serial) == 2
@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.question import Question
+from src.search import SearchIndex, match_expression
+
+
+def make_row(qid, question, a="", b="", topic="1"):
+    return {"Topic": topic, "question_id": str(qid), "question": question,
+            "A": a, "B": b, "C": "", "D": "", "E": "", "F": "", "answer": "A"}
+
+
+ROWS = [
+    make_row(1, "Which service catalogs data in Amazon S3?", "AWS Glue Data Catalog", "Amazon EMR"),
+    make_row(2, "How should the company ingest clickstream events?", "Amazon Kinesis Data Streams", "AWS Glue"),
+    make_row(3, "Which option reduces Redshift query cost?", "Use Redshift Spectrum", "Resize the cluster",
+             topic="NaN"),
+]
+
+
+def test_match_expression_quotes_terms():
+    assert match_expression('aws glue "data catalog" kines*') == '"aws" "glue" "data catalog" "kines"*'
+    assert match_expression("s3-bucket OR") == '"s3" "bucket" "OR"'
+    assert match_expression("  ") == ""
+
+
+def test_search_ranks_and_filters():
+    index = SearchIndex()
+    index.add(ROWS, source="dump-a.pdf")
+
+    hits = index.search("glue")
+    assert [h["question_id"] for h in hits] == ["1", "2"]   # 題目與選項都會比對
+    assert hits[0]["source"] == "dump-a.pdf" and "[Glue]" in hits[0]["snippet"]
+
+    assert [h["question_id"] for h in index.search("kines*")] == ["2"]
+    assert [h["question_id"] for h in index.search('"data catalog" s3')] == ["1"]
+    assert [h["question_id"] for h in index.search("redshift", topic="NaN")] == ["3"]
+    assert index.search("redshift", topic="1") == []
+    assert [h["question_id"] for h in index.search("a:glue", raw=True)] == ["1"]
+    with pytest.raises(ValueError):
+        index.search('"unbalanced', raw=True)
+
+
+def test_max_ranked_is_opt_in():
+    index = SearchIndex()
+    index.add(ROWS, source="dump-a.pdf")
+
+    # 預設所有符合的題目都參與排序；指定 max_ranked 時只排序最近加入的幾筆
+    assert [h["question_id"] for h in index.search("glue")] == ["1", "2"]
+    assert [h["question_id"] for h in index.search("glue", max_ranked=1)] == ["2"]
+
+
+def test_incremental_adds_replace_same_source(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    with SearchIndex(path) as index:
+        index.add(ROWS, source="dump-a.pdf")
+
+    with SearchIndex(path) as index:   # 重新開啟後繼續加入
+        index.add([make_row(7, "Which service streams logs to S3?", "Amazon Kinesis Data Firehose")],
+                  source="dump-b.pdf")
+        revised = [make_row(1, "Which service catalogs data?", "AWS Lake Formation")]
+        assert list(index.iter_add(iter(revised), source="dump-a.pdf", batch_size=1)) == revised
+
+        assert index.sources() == {"dump-a.pdf": 1, "dump-b.pdf": 1}
+        assert index.search("glue") == []
+        assert [(h["source"], h["question_id"]) for h in index.search("kinesis")] == [("dump-b.pdf", "7")]
+
+
+def test_accepts_question_records():
+    index = SearchIndex()
+    index.add([Question(None, 4, "What does Athena query?", ("Amazon S3", None, None, None, None, None), "A")])
+
+    [hit] = index.search("athena")
+    assert (hit["Topic"], hit["question_id"], hit["A"]) == ("NaN", "4", "Amazon S3")
+
+
+def test_same_file_name_in_different_folders_are_separate_sources(tmp_path):
+    first, second = tmp_path / "a" / "exam.pdf", tmp_path / "b" / "exam.pdf"
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_bytes(b"%PDF")
+
+    index = SearchIndex()
+    index.add(ROWS, source=str(first))
+    index.add([make_row(7, "Which service streams logs to S3?", "Amazon Kinesis Data Firehose")],
+              source=str(second))
+
+    # 以完整路徑識別來源：加入 b/exam.pdf 不會取代 a/exam.pdf 的題目
+    assert index.sources() == {os.path.realpath(first): 3, os.path.realpath(second): 1}
+    assert {h["source"] for h in index.search("glue")} == {"exam.pdf"}
+    assert [h["question_id"] for h in index.search("kinesis", source=str(second))] == ["7"]
+    assert index.remove(str(first)) == 3
+    assert len(index) == 1
+
+
+def test_interrupted_iter_add_keeps_previous_rows():
+    index = SearchIndex()
+    index.add(ROWS, source="dump-a.pdf")
+
+    def failing_rows():
+        yield make_row(9, "Which service catalogs data?", "AWS Lake Formation")
+        raise RuntimeError("parse failed")
+
+    with pytest.raises(RuntimeError):
+        for _ in index.iter_add(failing_rows(), source="dump-a.pdf", batch_size=1):
+            pass
+
+    # 移除與寫入在同一個交易中，失敗時整個回復，先前的題目仍在
+    assert index.sources() == {"dump-a.pdf": 3}
+    assert [h["question_id"] for h in index.search("glue")] == ["1", "2"]
+
+    rows = index.iter_add(iter([make_row(9, "Which service catalogs data?")]), source="dump-a.pdf")
+    next(rows)
+    rows.close()   # 提早停止迭代同樣不會留下部分資料
+    assert index.sources() == {"dump-a.pdf": 3}
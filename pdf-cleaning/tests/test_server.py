@@ -0,0 +1,127 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.server import IngestServer
+
+
+def make_pdf(text: str) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+async def request(port: int, method: str, path: str, body: bytes = b"") -> tuple:
+    """送出一個 HTTP 請求，回傳 (status, headers, body)；chunked 回應會先解碼，trailer 併入 headers"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+    if method == "POST":
+        head += f"Content-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+
+    head, _, payload = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {k.lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+    if headers.get("transfer-encoding") == "chunked":
+        decoded = b""
+        while True:
+            size, _, payload = payload.partition(b"\r\n")
+            size = int(size, 16)
+            if size == 0:
+                trailer, _, _ = payload.partition(b"\r\n\r\n")
+                for line in trailer.decode("latin-1").split("\r\n"):
+                    if line:
+                        k, _, v = line.partition(":")
+                        headers[k.lower()] = v.strip()
+                break
+            decoded += payload[:size]
+            payload = payload[size + 2:]
+        payload = decoded
+    return status, headers, payload
+
+
+def run_with_server(scenario, **options):
+    async def main():
+        server = IngestServer(jobs=1, **options)
+        await server.start("127.0.0.1", 0)
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+PDF_TEXT = "Topic 1\nQuestion #1\nQ?\nA. a\nB. b\nCorrect Answer: B"
+
+
+def test_parse_streams_jsonl_and_csv():
+    pdf = make_pdf(PDF_TEXT)
+
+    async def scenario(server):
+        jsonl = await request(server.port, "POST", "/parse", pdf)
+        csv_ = await request(server.port, "POST", "/parse?format=csv", pdf)
+        raw = await request(server.port, "POST", "/parse?raw=1", pdf)
+        return jsonl, csv_, raw, server.stats()
+
+    (status, headers, body), csv_resp, raw_resp, stats = run_with_server(scenario)
+
+    assert status == 200
+    assert headers["trailer"] == "X-Pages, X-Questions, X-Seconds"
+    assert headers["x-questions"] == "1" and headers["x-pages"] == "1"
+    rows = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert rows[0]["Topic"] == "1" and rows[0]["answer"] == "B"
+
+    assert csv_resp[0] == 200
+    assert list(csv.DictReader(io.StringIO(csv_resp[2].decode("utf-8"))))[0]["B"] == "b"
+
+    assert json.loads(raw_resp[2])["id"] == "Topic 1 Question #1"
+    assert stats["completed"] == 3 and stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_parse_errors_and_health():
+    async def scenario(server):
+        bad_pdf = await request(server.port, "POST", "/parse", b"not a pdf")
+        bad_format = await request(server.port, "POST", "/parse?format=xml", b"x")
+        missing = await request(server.port, "GET", "/nope")
+        health = await request(server.port, "GET", "/health")
+        return bad_pdf, bad_format, missing, health
+
+    bad_pdf, bad_format, missing, health = run_with_server(scenario)
+
+    assert bad_pdf[0] == 422 and json.loads(bad_pdf[2])["error"]
+    assert bad_format[0] == 400
+    assert missing[0] == 404
+    assert health[0] == 200
+    assert json.loads(health[2])["failed"] == 1
+
+
+def test_backpressure_rejects_when_full():
+    async def scenario(server):
+        server.pending = server.max_pending   # 模擬佇列已滿
+        return await request(server.port, "POST", "/parse", make_pdf(PDF_TEXT))
+
+    status, headers, _ = run_with_server(scenario, max_pending=2)
+
+    assert status == 503
+    assert headers["retry-after"] == "1"
+
+
+def test_upload_size_limit():
+    async def scenario(server):
+        return await request(server.port, "POST", "/parse", b"x" * 100)
+
+    status, _, _ = run_with_server(scenario, max_upload_bytes=10)
+    assert status == 413
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.formatter import COLUMNS
+from src.sinks import guess_format, open_sink, read_rows
+
+
+def make_rows(n: int) -> list:
+    return [
+        {"Topic": str(i % 3 + 1), "question_id": str(i), "question": f"問題 {i}, with \"quotes\"",
+         "A": "a", "B": "b", "C": "", "D": "", "E": "", "F": "", "answer": "A"}
+        for i in range(n)
+    ]
+
+
+def test_jsonl_sink_streams_in_batches(tmp_path):
+    path = tmp_path / "out.jsonl"
+    rows = make_rows(25)
+
+    with open_sink("jsonl", str(path), batch_size=10) as sink:
+        for row in rows[:15]:
+            sink.write(row)
+        # 已寫出一整批，第二批仍在緩衝中；寫出的一批在關閉前就能從檔案讀到
+        assert sink.count == 10
+        assert path.read_text(encoding="utf-8").count("\n") == 10
+        sink.write_all(rows[15:])
+
+    assert sink.count == 25
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == rows
+
+
+def test_csv_sink_roundtrip(tmp_path):
+    path = tmp_path / "out.csv"
+    rows = make_rows(7)
+
+    with open_sink("csv", str(path), batch_size=3) as sink:
+        assert sink.write_all(rows) == 7
+
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == COLUMNS
+        assert list(reader) == rows
+
+
+def test_parquet_sink_writes_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "out.parquet"
+    rows = make_rows(25)
+
+    with open_sink("parquet", str(path), batch_size=10) as sink:
+        sink.write_all(rows)
+
+    meta = pq.ParquetFile(str(path)).metadata
+    assert meta.num_row_groups == 3
+    assert pq.read_table(str(path)).to_pylist() == rows
+
+
+def test_guess_format():
+    assert guess_format("x/rows.CSV") == "csv"
+    assert guess_format("rows.jsonl") == "jsonl"
+    assert guess_format("rows.parquet") == "parquet"
+    assert guess_format("bank.sqlite") == "sqlite"
+    assert guess_format("rows.txt") is None
+
+
+def test_jsonl_sink_serializes_question_records(tmp_path):
+    from src.question import Question
+
+    path = tmp_path / "raw.jsonl"
+    with open_sink("jsonl", str(path)) as sink:
+        sink.write(Question(1, 1, "Q", ("a", None, None, None, None, None), "A"))
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {
+        "id": "Topic 1 Question #1", "question": "Q", "choices": {"A": "a"}, "answer": "A",
+    }
+
+
+def test_sqlite_sink_upserts_revised_source_in_place(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = str(tmp_path / "bank.sqlite")
+    exam, other = tmp_path / "a" / "exam.pdf", tmp_path / "b" / "exam.pdf"
+    for pdf in (exam, other):
+        pdf.parent.mkdir()
+        pdf.write_bytes(b"%PDF")
+    rows = make_rows(10)
+    with open_sink("sqlite", path, batch_size=4, source=str(exam)) as sink:
+        sink.write_all(rows)
+    # 不同目錄中的同名檔案是不同來源，不會覆寫彼此的題目
+    with open_sink("sqlite", path, source=str(other)) as sink:
+        sink.write_all(make_rows(2))
+
+    # 改版：第 3 題內容變更、第 8–9 題刪除；以相對路徑重新載入仍是同一來源
+    revised = rows[:8]
+    revised[3] = dict(revised[3], question="改寫後的題目", answer="B")
+    monkeypatch.chdir(tmp_path)
+    with open_sink("sqlite", path, batch_size=3, source=os.path.join("a", "exam.pdf")) as sink:
+        sink.write_all(revised)
+
+    exam, other = os.path.realpath(exam), os.path.realpath(other)
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    counts = dict(conn.execute("SELECT source, COUNT(*) FROM questions GROUP BY source"))
+    assert counts == {exam: 8, other: 2}
+    assert conn.execute("SELECT source, rows FROM loads ORDER BY load_id").fetchall() == [
+        (exam, 10), (other, 2), (exam, 8),
+    ]
+    conn.close()
+    assert list(read_rows("sqlite", path)) == revised + make_rows(2)   # 依來源與原本順序讀回
+
+
+def test_sqlite_sink_keeps_rows_when_load_fails(tmp_path):
+    path = str(tmp_path / "bank.sqlite")
+    with open_sink("sqlite", path, source="exam.pdf") as sink:
+        sink.write_all(make_rows(5))
+
+    with pytest.raises(RuntimeError):
+        with open_sink("sqlite", path, batch_size=2, source="exam.pdf") as sink:
+            sink.write_all(make_rows(3))
+            raise RuntimeError("中途失敗")
+
+    assert list(read_rows("sqlite", path)) == make_rows(5)
+    with pytest.raises(ValueError):
+        open_sink("sqlite", "-")
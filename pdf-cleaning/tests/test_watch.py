@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import watch
+from src.pipeline import run_pipeline
+from src.watch import WatchDaemon
+
+
+def write_exam(path, questions: int, mtime: float | None = None) -> None:
+    lines = ["Topic 1"]
+    for i in range(1, questions + 1):
+        lines += [f"Question #{i}", f"Question {i} text", "A. yes", "B. no", "Correct Answer: A"]
+    path.write_text("\n".join(lines), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def crash_on_marker(path, output_path, *args):
+    """模擬讓子行程直接結束的檔案（例如 PyMuPDF 崩潰或被 OOM killer 終止）"""
+    if os.path.basename(path).startswith("crash"):
+        os._exit(1)
+    return _process_file(path, output_path, *args)
+
+
+_process_file = watch.process_file
+
+
+def run_until_idle(daemon, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    daemon.step(timeout=0.05)
+    while not daemon.idle:
+        assert time.monotonic() < deadline, daemon.stats()
+        daemon.step(timeout=0.05)
+
+
+def test_processes_by_size_and_skips_seen_content(tmp_path):
+    inbox, out = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    old = time.time() - 60
+    write_exam(inbox / "big.txt", 30, old)
+    write_exam(inbox / "small.txt", 2, old)
+    write_exam(inbox / "small_copy.txt", 2, old)
+    (inbox / "notes.md").write_text("ignored")
+
+    events = []
+    with WatchDaemon(str(inbox), str(out), jobs=1, settle=0.5,
+                     on_event=lambda kind, info: events.append((kind, os.path.basename(info["path"])))) as daemon:
+        run_until_idle(daemon)
+        stats = daemon.stats()
+
+    completed = [name for kind, name in events if kind == "completed"]
+    assert completed == ["small.txt", "big.txt"]   # 小檔優先
+    assert ("duplicate", "small_copy.txt") in events
+    assert (stats["arrivals"], stats["completed"], stats["duplicates"], stats["failed"]) == (3, 2, 1, 0)
+    assert stats["latency"]["count"] == 2 and stats["queued"] == 0
+
+    with open(out / "big.txt.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == run_pipeline(str(inbox / "big.txt"))
+
+    # 重新啟動後沿用狀態檔，已處理的內容不再處理
+    write_exam(inbox / "renamed.txt", 30, old)
+    with WatchDaemon(str(inbox), str(out), jobs=1, settle=0.5) as daemon:
+        run_until_idle(daemon)
+        assert (daemon.completed, daemon.duplicates) == (0, 4)
+
+
+def test_waits_until_file_stops_changing(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    path = inbox / "exam.txt"
+    write_exam(path, 1)
+
+    daemon = WatchDaemon(str(inbox), str(tmp_path / "out"), settle=60)
+    daemon.scan()
+    assert (daemon.stats()["settling"], daemon.stats()["queued"]) == (1, 0)   # 剛寫入
+
+    write_exam(path, 3, time.time() - 120)
+    daemon.scan()
+    assert daemon.stats()["queued"] == 0   # 大小剛改變，再觀察一次
+
+    daemon.scan()
+    assert (daemon.stats()["settling"], daemon.stats()["queued"]) == (0, 1)
+
+
+def test_old_mtime_waits_for_a_second_scan(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    # 保留原修改時間的複製：檔案年齡早已超過 settle，但仍要兩次掃描的大小相同才處理
+    write_exam(inbox / "copied.txt", 2, time.time() - 3600)
+
+    daemon = WatchDaemon(str(inbox), str(tmp_path / "out"), settle=1)
+    daemon.scan()
+    assert (daemon.stats()["settling"], daemon.stats()["queued"]) == (1, 0)
+
+    daemon.scan()
+    assert (daemon.stats()["settling"], daemon.stats()["queued"]) == (0, 1)
+
+
+def test_recovers_when_a_worker_crashes(tmp_path, monkeypatch):
+    inbox, out = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    old = time.time() - 60
+    for i, name in enumerate(("a.txt", "crash.txt", "b.txt", "c.txt")):
+        write_exam(inbox / name, i + 1, old)
+    monkeypatch.setattr(watch, "process_file", crash_on_marker)
+
+    events = []
+    with WatchDaemon(str(inbox), str(out), jobs=2, settle=0.5,
+                     on_event=lambda kind, info: events.append((kind, os.path.basename(info["path"])))) as daemon:
+        run_until_idle(daemon)
+        # 重建後的行程池仍可處理新投放的檔案
+        write_exam(inbox / "d.txt", 5, old)
+        run_until_idle(daemon)
+        stats = daemon.stats()
+
+    # 只有造成子行程結束的檔案記為失敗，同時處理中的其他檔案單獨重試後完成
+    assert sorted(name for kind, name in events if kind == "completed") == ["a.txt", "b.txt", "c.txt", "d.txt"]
+    assert [name for kind, name in events if kind == "failed"] == ["crash.txt"]
+    assert (stats["completed"], stats["failed"], stats["queued"], stats["active"]) == (4, 1, 0, 0)
+
+
+def test_same_stem_inputs_get_separate_outputs(tmp_path):
+    import fitz
+
+    inbox, out = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    old = time.time() - 60
+    write_exam(inbox / "exam.txt", 2, old)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Topic 1\nQuestion #9\nPDF question\nA. a\nCorrect Answer: A")
+    doc.save(str(inbox / "exam.pdf"))
+    os.utime(inbox / "exam.pdf", (old, old))
+
+    with WatchDaemon(str(inbox), str(out), jobs=1, settle=0.5) as daemon:
+        run_until_idle(daemon)
+        assert (daemon.completed, daemon.failed) == (2, 0)
+
+    # exam.pdf 與 exam.txt 的輸出保留原本的副檔名，不會互相覆寫
+    assert sorted(name for name in os.listdir(out) if not name.startswith(".")) == [
+        "exam.pdf.jsonl", "exam.txt.jsonl"]
+    with open(out / "exam.pdf.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line)["question_id"] for line in f] == ["9"]